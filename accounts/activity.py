@@ -0,0 +1,120 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from accounts.models import ActivityCount, RecentActivity, User
+
+logger = logging.getLogger(__name__)
+
+# Activity events are appended to a Redis stream after the write commits and moved into the
+# Recent Activities table in batches by the flush_activity_log task; old months are dropped whole by
+# maintain_activity_partitions (accounts.partitions). A write request pays one XADD. Both jobs keep the
+# Activity Counts table in step, so the feed's total is a primary key lookup rather than a COUNT(*).
+STREAM_KEY = "activity:stream"
+FLUSH_LOCK_KEY = "activity:flush-lock"
+EVENT_FIELDS = ('user_id', 'action', 'model_name', 'object_id', 'object_name', 'timestamp')
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def related_label(instance, field, attribute):
+    """attribute of a related object if it is already loaded, '#<id>' otherwise; never queries"""
+    descriptor = getattr(type(instance), field)
+    if descriptor.is_cached(instance):
+        related = getattr(instance, field)
+        return getattr(related, attribute) if related is not None else "-"
+    related_id = getattr(instance, descriptor.field.attname)
+    return f"#{related_id}" if related_id is not None else "-"
+
+
+def describe(instance):
+    """object_name of an activity, built from fields the instance already has in memory"""
+    if instance._meta.label == 'products.PlantedProduct':
+        name = (f"Product name: {related_label(instance, 'product', 'name')}, "
+                f"Product owner: {related_label(instance, 'owner', 'first_name')}, "
+                f"Region: {related_label(instance, 'region', 'name')}")
+    else:
+        name = str(instance)
+    return name[:RecentActivity._meta.get_field('object_name').max_length]
+
+
+def add_counts(counts):
+    """Add {user_id: delta} to the users' activity counts with F() so concurrent writers add up"""
+    for user_id, delta in counts.items():
+        if not delta:
+            continue
+        rows = ActivityCount.objects.filter(user_id=user_id)
+        if rows.update(count=F('count') + delta) or delta < 0:
+            continue
+        ActivityCount.objects.get_or_create(user_id=user_id)
+        rows.update(count=F('count') + delta)
+
+
+def activity_total(user=None):
+    """Number of activities of the user, or of everyone when user is None"""
+    if user is None:
+        return ActivityCount.objects.aggregate(total=Sum('count'))['total'] or 0
+    return ActivityCount.objects.filter(user=user).values_list('count', flat=True).first() or 0
+
+
+def enqueue(event):
+    try:
+        _redis().xadd(STREAM_KEY, {field: str(event[field]) for field in EVENT_FIELDS},
+                      maxlen=settings.ACTIVITY_STREAM_MAXLEN, approximate=True)
+    except RedisError:
+        # Keep the event rather than the batching: one insert, trimmed later like the rest
+        logger.warning("Activity stream unavailable, writing the activity directly", exc_info=True)
+        with transaction.atomic():
+            RecentActivity.objects.create(**event)
+            add_counts({event['user_id']: 1})
+
+
+def record(event):
+    """Queue an activity event once the surrounding transaction commits"""
+    transaction.on_commit(lambda: enqueue(event))
+
+
+def _parse(fields):
+    event = {key.decode(): value.decode() for key, value in fields.items()}
+    event['user_id'] = int(event['user_id'])
+    event['object_id'] = int(event['object_id'])
+    event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+    return event
+
+
+def flush(batch_size=None):
+    """
+    Move buffered events into the database with bulk_create, oldest first; returns how many were stored.
+    One flusher at a time; events of users deleted in the meantime are dropped.
+    """
+    batch_size = batch_size or settings.ACTIVITY_FLUSH_BATCH_SIZE
+    conn = _redis()
+    stored = 0
+    lock = conn.lock(FLUSH_LOCK_KEY, timeout=300)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        while True:
+            entries = conn.xrange(STREAM_KEY, count=batch_size)
+            if not entries:
+                break
+            events = [_parse(fields) for _, fields in entries]
+            users = set(User.objects.filter(pk__in={event['user_id'] for event in events}).values_list('pk', flat=True))
+            activities = [RecentActivity(**event) for event in events if event['user_id'] in users]
+            with transaction.atomic():
+                RecentActivity.objects.bulk_create(activities)
+                add_counts(Counter(activity.user_id for activity in activities))
+            conn.xdel(STREAM_KEY, *[entry_id for entry_id, _ in entries])
+            stored += len(activities)
+            if len(entries) < batch_size:
+                break
+    finally:
+        lock.release()
+    return stored
+
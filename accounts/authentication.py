@@ -0,0 +1,117 @@
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis.exceptions import ConnectionInterrupted
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from accounts.models import TokenUser, User
+from accounts.roles import user_role
+
+logger = logging.getLogger(__name__)
+
+# Stateless mode (JWT_STATELESS_AUTH): tokens carry the user's role, staff flags and a version stamp, and
+# read-only requests whose token stamp matches the user's current one are authenticated from the token alone,
+# with one Redis read instead of loading the user row. Anything that changes what the token claims (groups,
+# password, active/staff flags, deletion) stamps the user anew, so older tokens fall back to the database.
+# The stamp is stored on the user row, in the same transaction as the change, and Redis only caches it for
+# JWT_VERSION_CACHE_TIMEOUT seconds: a stamp that could not be pushed to Redis is picked up once that expires.
+USER_VERSION_KEY = "auth:user-version:{user_id}"
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'ver'
+STAFF_CLAIM = 'staff'
+SUPERUSER_CLAIM = 'superuser'
+
+
+def _new_stamp():
+    return time.time_ns() // 1000
+
+
+def user_version(user_id):
+    """Current version stamp of the user, or None when the user does not exist"""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.JWT_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def bump_user_versions(user_ids):
+    """
+    Stamp the users anew, making their tokens stale. The row is updated in the current transaction;
+    the cached stamps are replaced once it commits. Returns the new stamp.
+    """
+    user_ids = list(user_ids)
+    stamp = _new_stamp()
+    if not user_ids:
+        return stamp
+    User.objects.filter(pk__in=user_ids).update(token_version=stamp)
+
+    def publish():
+        try:
+            cache.set_many({USER_VERSION_KEY.format(user_id=user_id): stamp for user_id in user_ids},
+                           settings.JWT_VERSION_CACHE_TIMEOUT)
+        except ConnectionInterrupted:
+            logger.warning("Could not cache the new stamp of %s users; the old one expires within %s seconds",
+                           len(user_ids), settings.JWT_VERSION_CACHE_TIMEOUT, exc_info=True)
+    transaction.on_commit(publish)
+    return stamp
+
+
+def add_user_claims(token, user):
+    """Claims a token needs for stateless authentication; returns the token"""
+    token[ROLE_CLAIM] = user_role(user)
+    token[STAFF_CLAIM] = user.is_staff
+    token[SUPERUSER_CLAIM] = user.is_superuser
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that, when JWT_STATELESS_AUTH is on, authenticates read-only requests from the token's
+    claims. Unsafe methods, tokens without the claims and stale tokens load the user as usual.
+    """
+
+    def authenticate(self, request):
+        if not settings.JWT_STATELESS_AUTH or request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_token_user(validated_token) or self.get_user(validated_token)
+        return user, validated_token
+
+    def get_token_user(self, validated_token):
+        """User built from the token, or None when the token is missing claims or stale"""
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+            version = validated_token[VERSION_CLAIM]
+            known = {
+                'id': user_id,
+                'is_active': True,
+                'is_staff': bool(validated_token[STAFF_CLAIM]),
+                'is_superuser': bool(validated_token[SUPERUSER_CLAIM]),
+            }
+            role = validated_token[ROLE_CLAIM]
+        except (KeyError, TypeError, ValueError):
+            return None
+        try:
+            if version != user_version(user_id):
+                return None
+        except ConnectionInterrupted:
+            return None
+
+        fields = [field.attname for field in TokenUser._meta.concrete_fields if field.attname in known]
+        user = TokenUser.from_db('default', fields, [known[field] for field in fields])
+        user._role = role
+        return user
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.partitions import drop_expired, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = 'Creates the monthly Recent Activities partitions ahead of time and drops the expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=settings.ACTIVITY_PARTITIONS_AHEAD,
+                            help='Months after the current one to create partitions for')
+        parser.add_argument('--drop-expired', action='store_true',
+                            help='Also drop the partitions older than ACTIVITY_RETENTION_MONTHS')
+
+    def handle(self, *args, **options):
+        for month in ensure_partitions(options['ahead']):
+            self.stdout.write(f"Created the partition of {month:%Y-%m}")
+        if options['drop_expired']:
+            for month in drop_expired():
+                self.stdout.write(f"Dropped the partition of {month:%Y-%m}")
+        self.stdout.write(self.style.SUCCESS("Activity partitions are up to date"))
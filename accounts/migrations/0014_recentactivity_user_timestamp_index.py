@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_alter_recentactivity_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_timestamp_idx'),
+        ),
+    ]
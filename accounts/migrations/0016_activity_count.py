@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counts(apps, schema_editor):
+    RecentActivity = apps.get_model('accounts', 'RecentActivity')
+    ActivityCount = apps.get_model('accounts', 'ActivityCount')
+    rows = RecentActivity.objects.values('user_id').annotate(count=Count('id')).order_by()
+    ActivityCount.objects.bulk_create([ActivityCount(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_user_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityCount',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity_count', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Activity Count',
+                'verbose_name_plural': 'Activity Counts',
+                'db_table': 'Activity Counts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_idx'),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
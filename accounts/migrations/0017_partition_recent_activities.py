@@ -0,0 +1,115 @@
+from datetime import date, timezone as dt_timezone
+from django.db import migrations
+from django.utils import timezone
+
+# Rebuilds "Recent Activities" as a table range-partitioned by month on timestamp. Postgres requires the
+# partition key in the primary key, so it becomes (id, timestamp); id keeps coming from a sequence and
+# stays unique. The model state is unchanged: Django keeps treating id as the primary key.
+PARTITION_SQL = [
+    'ALTER TABLE "Recent Activities" RENAME TO "Recent Activities unpartitioned"',
+    'DROP INDEX activity_user_timestamp_idx',
+    'DROP INDEX activity_timestamp_idx',
+    'CREATE SEQUENCE "Recent Activities_id_seq"',
+    '''
+    CREATE TABLE "Recent Activities" (
+        "id" bigint NOT NULL DEFAULT nextval('"Recent Activities_id_seq"'),
+        "action" varchar(10) NOT NULL,
+        "model_name" varchar(50) NOT NULL,
+        "object_id" integer NOT NULL CHECK ("object_id" >= 0),
+        "object_name" varchar(255) NOT NULL,
+        "timestamp" timestamp with time zone NOT NULL,
+        "user_id" bigint NOT NULL REFERENCES "Users" ("id") DEFERRABLE INITIALLY DEFERRED,
+        PRIMARY KEY ("id", "timestamp")
+    ) PARTITION BY RANGE ("timestamp")
+    ''',
+    'ALTER SEQUENCE "Recent Activities_id_seq" OWNED BY "Recent Activities"."id"',
+    'CREATE INDEX activity_user_timestamp_idx ON "Recent Activities" ("user_id", "timestamp" DESC, "id" DESC)',
+    'CREATE INDEX activity_timestamp_idx ON "Recent Activities" ("timestamp" DESC, "id" DESC)',
+    'CREATE TABLE "Recent Activities default" PARTITION OF "Recent Activities" DEFAULT',
+    '''
+    INSERT INTO "Recent Activities" ("id", "action", "model_name", "object_id", "object_name", "timestamp", "user_id")
+    SELECT "id", "action", "model_name", "object_id", "object_name", "timestamp", "user_id"
+    FROM "Recent Activities unpartitioned"
+    ''',
+    '''
+    SELECT setval('"Recent Activities_id_seq"', COALESCE(MAX("id"), 0) + 1, false)
+    FROM "Recent Activities unpartitioned"
+    ''',
+    'DROP TABLE "Recent Activities unpartitioned"',
+]
+
+# Back to a plain table with an identity id, as before this migration; dropping the partitioned table
+# drops every partition and the sequence with it.
+UNPARTITION_SQL = [
+    '''
+    CREATE TABLE "Recent Activities unpartitioned" (
+        "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+        "action" varchar(10) NOT NULL,
+        "model_name" varchar(50) NOT NULL,
+        "object_id" integer NOT NULL CHECK ("object_id" >= 0),
+        "object_name" varchar(255) NOT NULL,
+        "timestamp" timestamp with time zone NOT NULL,
+        "user_id" bigint NOT NULL
+    )
+    ''',
+    '''
+    INSERT INTO "Recent Activities unpartitioned" ("id", "action", "model_name", "object_id", "object_name",
+                                                   "timestamp", "user_id")
+    SELECT "id", "action", "model_name", "object_id", "object_name", "timestamp", "user_id"
+    FROM "Recent Activities"
+    ''',
+    '''
+    SELECT setval(pg_get_serial_sequence('"Recent Activities unpartitioned"', 'id'),
+                  COALESCE(MAX("id"), 0) + 1, false)
+    FROM "Recent Activities unpartitioned"
+    ''',
+    # Added after the copy: a deferred check per copied row would leave the table with pending trigger events
+    '''
+    ALTER TABLE "Recent Activities unpartitioned" ADD FOREIGN KEY ("user_id") REFERENCES "Users" ("id")
+    DEFERRABLE INITIALLY DEFERRED
+    ''',
+    'DROP TABLE "Recent Activities"',
+    'ALTER TABLE "Recent Activities unpartitioned" RENAME TO "Recent Activities"',
+    'CREATE INDEX "recent_activities_user_id_8e5e3f16" ON "Recent Activities" ("user_id")',
+    'CREATE INDEX activity_user_timestamp_idx ON "Recent Activities" ("user_id", "timestamp" DESC, "id" DESC)',
+    'CREATE INDEX activity_timestamp_idx ON "Recent Activities" ("timestamp" DESC, "id" DESC)',
+]
+
+# Monthly partitions created up front: the months kept by the default retention up to a few months ahead.
+# The daily maintain_activity_partitions task takes over from there with the configured settings.
+RETENTION_MONTHS = 12
+PARTITIONS_AHEAD = 3
+
+
+def create_partitions(apps, schema_editor):
+    """Attach a partition per month, moving the copied rows of each out of the default partition"""
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    current = today.year * 12 + today.month - 1
+    for index in range(current - RETENTION_MONTHS, current + PARTITIONS_AHEAD + 1):
+        month = date(index // 12, index % 12 + 1, 1)
+        next_month = date((index + 1) // 12, (index + 1) % 12 + 1, 1)
+        partition = f'"Recent Activities {month:%Y-%m}"'
+        start, end = f"'{month.isoformat()} 00:00:00+00'", f"'{next_month.isoformat()} 00:00:00+00'"
+        schema_editor.execute(
+            f'CREATE TABLE {partition} (LIKE "Recent Activities" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        schema_editor.execute(
+            f'WITH moved AS (DELETE FROM "Recent Activities default" '
+            f'WHERE "timestamp" >= {start} AND "timestamp" < {end} RETURNING *) '
+            f'INSERT INTO {partition} SELECT * FROM moved'
+        )
+        schema_editor.execute(
+            f'ALTER TABLE "Recent Activities" ATTACH PARTITION {partition} FOR VALUES FROM ({start}) TO ({end})'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_activity_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, reverse_sql=UNPARTITION_SQL),
+        migrations.RunPython(create_partitions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_token_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -38,6 +38,8 @@ class User(AbstractUser):
     )
     region = models.CharField(max_length=255, null=True, blank=True)
     google_id = models.CharField(max_length=50, unique=True, null=True, blank=True)
+    # Version stamp of the user's stateless access tokens (accounts.authentication); Redis caches it briefly
+    token_version = models.BigIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name']
@@ -46,6 +48,9 @@ class User(AbstractUser):
 
     class Meta:
         db_table = 'Users'
+        indexes = [
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+        ]
 
 
 def default_expire_date():
@@ -144,8 +149,39 @@ class RecentActivity(models.Model):
     class Meta:
         db_table = 'Recent Activities'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_timestamp_idx'),
+            models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_idx'),
+        ]
         verbose_name = 'Recent Activity'
         verbose_name_plural = 'Recent Activities'
 
     def __str__(self):
         return f"{self.user.email} {self.get_action_display().lower()} {self.model_name}: {self.object_name}"
+
+
+class ActivityCount(models.Model):
+    """Number of Recent Activities rows of a user, kept in step by the activity flush and trim jobs"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="activity_count")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'Activity Counts'
+        verbose_name = 'Activity Count'
+        verbose_name_plural = 'Activity Counts'
+
+
+class TokenUser(User):
+    """
+    User authenticated from the claims of its access token: id, role and flags come from the token and every
+    other field is deferred. Reading any of them loads all of them in one query.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
@@ -0,0 +1,5 @@
+from common.pagination import KeysetPagination
+
+class RecentActivityCursorPagination(KeysetPagination):
+    ordering_field = 'timestamp'
+    results_key = 'activities'
@@ -0,0 +1,137 @@
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from accounts.activity import add_counts
+
+# "Recent Activities" is range-partitioned by UTC month on timestamp, one "Recent Activities YYYY-MM" table
+# per month, plus a default partition that catches rows no monthly partition covers yet. Retention drops
+# whole partitions instead of deleting rows, and feed queries bounded by a timestamp skip older months.
+TABLE = 'Recent Activities'
+DEFAULT_PARTITION = f'{TABLE} default'
+PARTITION_NAME = re.compile(rf'^{TABLE} (\d{{4}})-(\d{{2}})$')
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month():
+    return timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def partition_name(month):
+    return f'{TABLE} {month:%Y-%m}'
+
+
+def month_start(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _bound(month):
+    """Literal of the month's first instant; partition bounds cannot be query parameters"""
+    return f"'{month_start(month).isoformat()}'"
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def monthly_partitions():
+    """{first day of the month: partition name} of the monthly partitions attached to the table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass", [_quote(TABLE)]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """
+    Attach the partition of the month, moving in any of its rows that landed in the default partition.
+    Built as a plain table and attached, because PARTITION OF refuses a range the default partition has rows in.
+    The table (and so every partition) is locked against writes throughout, so a row of the month written
+    after the move cannot land in the default partition and make the attach fail.
+    """
+    table, default, partition = _quote(TABLE), _quote(DEFAULT_PARTITION), _quote(partition_name(month))
+    start, end = _bound(month), _bound(add_months(month, 1))
+    in_range = f'"timestamp" >= {start} AND "timestamp" < {end}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(f'CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(f'WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) '
+                       f'INSERT INTO {partition} SELECT * FROM moved')
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM ({start}) TO ({end})')
+
+
+def ensure_partitions(ahead=None):
+    """
+    Create the missing partitions of every month from the retention cutoff to `ahead` months after the
+    current one, moving in rows of theirs that sit in the default partition. Returns the months created.
+    """
+    ahead = settings.ACTIVITY_PARTITIONS_AHEAD if ahead is None else ahead
+    existing = monthly_partitions()
+    created = []
+    month, last = retention_cutoff(), add_months(current_month(), ahead)
+    while month <= last:
+        if month not in existing:
+            create_partition(month)
+            created.append(month)
+        month = add_months(month, 1)
+    return created
+
+
+def retention_cutoff(months=None):
+    """First month kept: the current month and the `months` before it survive"""
+    months = settings.ACTIVITY_RETENTION_MONTHS if months is None else months
+    return add_months(current_month(), -months)
+
+
+def feed_window():
+    """
+    (start, end) of the timestamps the feeds show: the retained months up to the end of the current one.
+    Bounding the feed queries with it lets Postgres prune the expired months and the default partition,
+    so it reads the monthly partitions in order, newest first, and stops at the page's LIMIT.
+    """
+    return month_start(retention_cutoff()), month_start(add_months(current_month(), 1))
+
+
+def _forget(cursor, source, condition=''):
+    """Take the rows of source (a quoted table name) off their users' activity counts"""
+    cursor.execute(f'SELECT user_id, count(*) FROM {source} {condition} GROUP BY user_id')
+    add_counts({user_id: -count for user_id, count in cursor.fetchall()})
+
+
+def drop_expired(months=None):
+    """
+    Detach and drop the monthly partitions older than the retention cutoff, and delete the default
+    partition's rows older than it. Returns the months dropped.
+    """
+    cutoff = retention_cutoff(months)
+    table, default = _quote(TABLE), _quote(DEFAULT_PARTITION)
+    dropped = []
+    for month, name in sorted(monthly_partitions().items()):
+        if month >= cutoff:
+            continue
+        partition = _quote(name)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {partition}')
+            _forget(cursor, partition)
+            cursor.execute(f'DROP TABLE {partition}')
+        dropped.append(month)
+
+    expired = f'WHERE "timestamp" < {_bound(cutoff)}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE')
+        _forget(cursor, default, expired)
+        cursor.execute(f'DELETE FROM {default} {expired}')
+    return dropped
@@ -0,0 +1,69 @@
+import logging
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django_redis.exceptions import ConnectionInterrupted
+from common.cache import group_id
+
+logger = logging.getLogger(__name__)
+
+# A user's role is the name of their first group. It is resolved once per request (memoized on the user
+# object DRF keeps for the request) and cached per user in Redis; the accounts signals forget the cached
+# role whenever the user's group membership changes or one of their groups is renamed or deleted.
+ROLE_KEY = "role:user:{user_id}"
+ADMINS = 'Admins'
+FARMERS = 'Farmers'
+DEFAULT_ROLE = 'Users'
+SELF_SERVICE_ROLES = ('Farmers', 'Exporters', 'Analysts')
+
+
+def user_role(user):
+    """Name of the user's role, or None for anonymous users and users without a group"""
+    if not user or not user.is_authenticated:
+        return None
+    if '_role' in user.__dict__:
+        return user._role
+
+    key = ROLE_KEY.format(user_id=user.pk)
+    try:
+        role = cache.get(key)
+    except ConnectionInterrupted:
+        role = None
+    if role is None:
+        role = Group.objects.filter(user=user).order_by('pk').values_list('name', flat=True).first() or ""
+        try:
+            cache.set(key, role, settings.ROLE_CACHE_TIMEOUT)
+        except ConnectionInterrupted:
+            logger.warning("Could not cache the role of user %s", user.pk, exc_info=True)
+    user._role = role or None
+    return user._role
+
+
+def is_admin(user):
+    return bool(user and user.is_authenticated and (user.is_superuser or user.is_staff or user_role(user) == ADMINS))
+
+
+def forget_roles(user_ids):
+    """
+    Drop the cached roles of these users, now and again once the transaction commits, so a request that read
+    the old membership in the meantime cannot leave it cached
+    """
+    keys = [ROLE_KEY.format(user_id=user_id) for user_id in user_ids]
+    if not keys:
+        return
+
+    def delete():
+        try:
+            cache.delete_many(keys)
+        except ConnectionInterrupted:
+            logger.warning("Could not forget the cached roles of %s users", len(keys), exc_info=True)
+    delete()
+    transaction.on_commit(delete)
+
+
+def assign_role(user, role):
+    """Make a self-service role (anything else falls back to Users) the user's only group; returns its name"""
+    name = role if role in SELF_SERVICE_ROLES else DEFAULT_ROLE
+    user.groups.set([group_id(name)])
+    return name
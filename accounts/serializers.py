@@ -3,8 +3,12 @@ from django.core.validators import validate_email
 from django.utils import timezone
 from rest_framework import serializers
 from accounts.models import User, RecentActivity
+from accounts.roles import user_role
+from accounts.authentication import add_user_claims
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth.models import Group
 
 class UserSerializer(serializers.ModelSerializer):
@@ -15,10 +19,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'first_name', 'last_name', 'email', 'phone_number', 'date_joined', 'region', 'role']
 
     def get_role(self, obj):
-        groups = obj.groups.all()
-        if groups.exists:
-            return groups.first().name
-        return None
+        return user_role(obj)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -71,6 +72,10 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         self.fields['login_field'] = serializers.CharField()
         self.fields.pop('email', None)  # Remove email field if it exists
 
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         login_field = attrs.get('login_field')
         password = attrs.get('password')
@@ -117,6 +122,17 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        """Refresh the access token's role, flags and version stamp, which the refresh token has from login"""
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(pk=access[jwt_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is not None:
+            data['access'] = str(add_user_claims(access, user))
+        return data
+
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
@@ -192,4 +208,8 @@ class RecentActivitySerializer(serializers.ModelSerializer):
             minutes = diff.seconds // 60
             return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
         else:
-            return "Just now"
\ No newline at end of file
+            return "Just now"
+
+class UserRecentActivitySerializer(RecentActivitySerializer):
+    class Meta(RecentActivitySerializer.Meta):
+        fields = RecentActivitySerializer.Meta.fields + ['user']
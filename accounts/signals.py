@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
@@ -6,15 +6,71 @@ from accounts.models import RecentActivity
 from products.models import Product, PlantedProduct
 from regions.models import Region
 from accounts.utils import log_activity
+from accounts.authentication import bump_user_versions
+from accounts.roles import DEFAULT_ROLE, forget_roles
+from common.cache import reference_cache
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
 def assign_default_group(sender, instance, created, **kwargs):
     if created and not instance.groups.exists():
-        users_group, _ = Group.objects.get_or_create(name="Users")
+        users_group, _ = Group.objects.get_or_create(name=DEFAULT_ROLE)
         instance.groups.add(users_group)
 
+
+# Fields a stateless access token claims or relies on; changing them makes the user's tokens stale
+TOKEN_FIELDS = {'password', 'is_active', 'is_staff', 'is_superuser'}
+
+
+@receiver(post_save, sender=User)
+def stamp_changed_user(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or TOKEN_FIELDS & set(update_fields)):
+        instance.token_version = bump_user_versions([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def stamp_deleted_user(sender, instance, **kwargs):
+    bump_user_versions([instance.pk])
+
+
+def membership_changed(user_ids):
+    user_ids = list(user_ids)
+    forget_roles(user_ids)
+    return bump_user_versions(user_ids)
+
+
+reference_cache.register(Group)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cache(sender, **kwargs):
+    reference_cache.invalidate_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def forget_changed_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # instance is the user; drop the role resolved earlier in this request too
+        instance.__dict__.pop('_role', None)
+        instance.token_version = membership_changed([instance.pk])
+    elif action == 'pre_clear':
+        membership_changed(instance.user_set.values_list('pk', flat=True))
+    else:
+        membership_changed(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def forget_member_roles(sender, instance, created=False, **kwargs):
+    # A renamed group renames its members' role; a deleted one drops their membership without m2m_changed
+    if not created:
+        membership_changed(instance.user_set.values_list('pk', flat=True))
+
+
 @receiver(post_save, sender=Product)
 def log_product_activity(sender, instance, created, **kwargs):
     if hasattr(instance, '_current_user') and instance._current_user:
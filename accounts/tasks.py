@@ -0,0 +1,21 @@
+import logging
+from celery import shared_task
+from accounts import activity, partitions
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_activity_log():
+    """Store the activity events buffered in Redis"""
+    activity.flush()
+
+
+@shared_task(ignore_result=True)
+def maintain_activity_partitions():
+    """Create the coming months' activity partitions and drop the expired ones"""
+    created = partitions.ensure_partitions()
+    dropped = partitions.drop_expired()
+    if created or dropped:
+        logger.info("Activity partitions created: %s; dropped: %s",
+                    [f"{month:%Y-%m}" for month in created], [f"{month:%Y-%m}" for month in dropped])
@@ -1,3 +1,268 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+from django_redis.exceptions import ConnectionInterrupted
+from rest_framework.test import APIClient
+from accounts import activity, partitions, roles
+from django.contrib.auth.models import Group
+from accounts.models import ActivityCount, RecentActivity, User
+from accounts.authentication import USER_VERSION_KEY, user_version
+from accounts.serializers import CustomTokenObtainPairSerializer, UserSerializer
+from products.models import Product, PlantedProduct
+from regions.models import Region
+
+
+class ActivityLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="farmer@example.com", password="secret", first_name="Ali")
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.product = Product.objects.create(name="Cotton")
+
+    def setUp(self):
+        # The stream lives in Redis, which outlives the test database
+        get_redis_connection("default").delete(activity.STREAM_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_writes_only_enqueue(self):
+        payload = {"product": self.product.pk, "owner": self.user.pk, "region": self.region.pk,
+                   "planting_area": "2.000", "expecting_weight": "10.000"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/products/planted-products/", payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(RecentActivity.objects.exists())
+
+        self.assertEqual(activity.flush(), 1)
+        logged = RecentActivity.objects.get()
+        self.assertEqual((logged.action, logged.model_name, logged.object_id), ("CREATE", "PlantedProduct",
+                                                                               response.data["id"]))
+        self.assertEqual(logged.object_name, "Product name: Cotton, Product owner: Ali, Region: Tashkent")
+        self.assertEqual(get_redis_connection("default").xlen(activity.STREAM_KEY), 0)
+
+    def test_descriptor_does_not_query(self):
+        planted = PlantedProduct.objects.create(product=self.product, owner=self.user, region=self.region,
+                                                planting_area=Decimal(1), expecting_weight=Decimal(1))
+        planted = PlantedProduct.objects.get(pk=planted.pk)
+        with self.assertNumQueries(0):
+            name = activity.describe(planted)
+        self.assertEqual(name, f"Product name: #{self.product.pk}, Product owner: #{self.user.pk}, "
+                               f"Region: #{self.region.pk}")
+
+    def test_flush_drops_events_of_deleted_users(self):
+        gone = User.objects.create_user(email="gone@example.com", password="secret", first_name="Gone")
+        now = timezone.now()
+        for user in (self.user, gone):
+            activity.enqueue({"user_id": user.pk, "action": "CREATE", "model_name": "Region",
+                              "object_id": self.region.pk, "object_name": "Tashkent", "timestamp": now.isoformat()})
+        gone.delete()
+        self.assertEqual(activity.flush(batch_size=1), 1)
+        self.assertEqual(list(RecentActivity.objects.values_list("user_id", flat=True)), [self.user.pk])
+
+    def test_expired_months_are_dropped(self):
+        this_month = partitions.current_month()
+        old_month = partitions.add_months(this_month, -14)
+        older_month = partitions.add_months(this_month, -30)
+        self.assertIn(this_month, partitions.monthly_partitions())
+
+        self.enqueue(self.user, 2)
+        self.enqueue(self.user, 3, start=partitions.month_start(old_month) + timedelta(days=1))
+        self.enqueue(self.user, 1, start=partitions.month_start(older_month) + timedelta(days=1))
+        activity.flush()
+        self.assertEqual(ActivityCount.objects.get(user=self.user).count, 6)
+
+        partitions.create_partition(old_month)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{partitions.partition_name(old_month)}"')
+            self.assertEqual(cursor.fetchone()[0], 3)
+        response = self.client.get("/api/accounts/recent-activities/")
+        self.assertEqual(len(response.data["activities"]), 2)
+
+        self.assertEqual(partitions.drop_expired(12), [old_month])
+        self.assertNotIn(old_month, partitions.monthly_partitions())
+        self.assertEqual(RecentActivity.objects.count(), 2)
+        self.assertEqual(ActivityCount.objects.get(user=self.user).count, 2)
+
+    def test_partition_creation_locks_out_writes(self):
+        partitions.create_partition(partitions.add_months(partitions.current_month(), -14))
+        # Held until the (test) transaction ends; the attach alone leaves the table open to inserts
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT mode FROM pg_locks WHERE pid = pg_backend_pid() AND relation = %s::regclass",
+                           [f'"{partitions.TABLE}"'])
+            self.assertIn("ShareRowExclusiveLock", [row[0] for row in cursor.fetchall()])
+
+    def enqueue(self, user, count, start=None):
+        """count activities of the user, a minute apart, going back from start (default: now)"""
+        start = start or timezone.now()
+        for i in range(count):
+            activity.enqueue({"user_id": user.pk, "action": "UPDATE", "model_name": "Region",
+                              "object_id": i, "object_name": "Tashkent",
+                              "timestamp": (start - timedelta(minutes=i)).isoformat()})
+
+    def test_feed_is_counted_without_count_queries(self):
+        self.enqueue(self.user, 3)
+        activity.flush()
+        self.enqueue(self.user, 2)
+        activity.flush()
+        self.assertEqual(ActivityCount.objects.get(user=self.user).count, 5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/accounts/recent-activities/", {"page_size": 2})
+        self.assertEqual(response.data["total_count"], 5)
+        self.assertEqual(len(response.data["activities"]), 2)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["activities"]), 2)
+
+    def test_admins_see_everyone(self):
+        other = User.objects.create_user(email="other@example.com", password="secret", first_name="Other")
+        self.enqueue(self.user, 2)
+        self.enqueue(other, 1)
+        activity.flush()
+
+        self.assertEqual(self.client.get("/api/accounts/recent-activities/all/").status_code, 403)
+        admin = User.objects.create_user(email="admin@example.com", password="secret", first_name="Admin")
+        admin.groups.set([Group.objects.get_or_create(name="Admins")[0]])
+        self.client.force_authenticate(admin)
+        response = self.client.get("/api/accounts/recent-activities/all/")
+        self.assertEqual(response.data["total_count"], 3)
+        self.assertEqual(sorted(row["user"] for row in response.data["activities"]),
+                         sorted([self.user.pk, self.user.pk, other.pk]))
+
+
+class RoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Group.objects.create(name="Farmers")
+        cls.admins = Group.objects.create(name="Admins")
+        cls.user = User.objects.create_user(email="farmer@example.com", password="secret", first_name="Ali")
+
+    def setUp(self):
+        # Cached roles live in Redis, which keeps them across the rolled back test transactions
+        cache.delete_pattern(roles.ROLE_KEY.format(user_id="*"))
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_role_is_resolved_once_and_cached(self):
+        self.user.groups.set([self.farmers])
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(roles.user_role(user), "Farmers")
+            self.assertEqual(UserSerializer(user).data["role"], "Farmers")
+        # Another request, another user object: served from Redis
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.user_role(user), "Farmers")
+
+    def test_membership_changes_are_seen(self):
+        self.assertEqual(roles.user_role(self.fresh_user()), "Users")
+        self.user.groups.set([self.farmers])
+        self.assertEqual(roles.user_role(self.fresh_user()), "Farmers")
+        self.farmers.user_set.remove(self.user)
+        self.assertIsNone(roles.user_role(self.fresh_user()))
+        self.admins.user_set.add(self.user)
+        self.assertEqual(roles.user_role(self.fresh_user()), "Admins")
+        self.admins.user_set.clear()
+        self.assertIsNone(roles.user_role(self.fresh_user()))
+        self.user.groups.add(self.farmers)
+        self.assertEqual(roles.user_role(self.fresh_user()), "Farmers")
+        self.farmers.delete()
+        self.assertIsNone(roles.user_role(self.fresh_user()))
+
+    def test_renamed_group_renames_the_role(self):
+        self.user.groups.set([self.farmers])
+        self.assertEqual(roles.user_role(self.fresh_user()), "Farmers")
+        self.farmers.name = "Growers"
+        self.farmers.save()
+        self.assertEqual(roles.user_role(self.fresh_user()), "Growers")
+
+    def test_admin_permission(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get("/api/accounts/recent-activities/all/").status_code, 403)
+        self.user.groups.set([self.admins])
+        self.assertEqual(client.get("/api/accounts/recent-activities/all/").status_code, 200)
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class StatelessAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Group.objects.create(name="Farmers")
+        cls.user = User.objects.create_user(email="farmer@example.com", password="secret", first_name="Ali")
+        cls.user.groups.set([cls.farmers])
+
+    def setUp(self):
+        # Roles and version stamps live in Redis, which outlives the test database
+        cache.delete_pattern(roles.ROLE_KEY.format(user_id="*"))
+        cache.delete_pattern(USER_VERSION_KEY.format(user_id="*"))
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        # The stamp is cached after a user's first request
+        user_version(self.user.pk)
+        self.client = APIClient()
+        self.authorize(self.refresh.access_token)
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_reads_do_not_load_the_user(self):
+        # The activity feed and the counter; no user row
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/accounts/recent-activities/")
+        self.assertEqual(response.status_code, 200)
+
+        with override_settings(JWT_STATELESS_AUTH=False), self.assertNumQueries(3):
+            self.client.get("/api/accounts/recent-activities/")
+
+    def test_profile_loads_the_user_once(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/accounts/profile/")
+        self.assertEqual((response.data["email"], response.data["role"]), ("farmer@example.com", "Farmers"))
+
+    def test_stale_token_falls_back_to_the_database(self):
+        admins = Group.objects.create(name="Admins")
+        self.assertEqual(self.client.get("/api/accounts/recent-activities/all/").status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([admins])
+        with self.assertNumQueries(4):
+            # The user, their role, then the feed and the total
+            response = self.client.get("/api/accounts/recent-activities/all/")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post("/api/accounts/token/refresh/", {"refresh": str(self.refresh)})
+        self.authorize(response.data["access"])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/accounts/recent-activities/all/").status_code, 200)
+
+    def test_deactivated_user_is_refused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=["is_active"])
+        self.assertEqual(self.client.get("/api/accounts/recent-activities/").status_code, 401)
+
+    def test_stamp_redis_missed_expires_into_the_database_one(self):
+        admins = Group.objects.create(name="Admins")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([admins])
+        self.authorize(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.assertEqual(self.client.get("/api/accounts/recent-activities/all/").status_code, 200)
+        key = USER_VERSION_KEY.format(user_id=self.user.pk)
+        self.assertLessEqual(cache.ttl(key), settings.JWT_VERSION_CACHE_TIMEOUT)
+
+        # Demoted while Redis is unreachable: only the user row gets the new stamp
+        with mock.patch.object(cache, "set_many", side_effect=ConnectionInterrupted("down")), \
+                self.assertLogs("accounts.authentication", "WARNING"), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([self.farmers])
+        self.assertNotEqual(User.objects.get(pk=self.user.pk).token_version, cache.get(key))
+
+        # Once the cached stamp expires the token is stale, and the user's real role is loaded
+        cache.delete(key)
+        self.assertEqual(self.client.get("/api/accounts/recent-activities/all/").status_code, 403)
 
-# Create your tests here.
@@ -19,4 +19,5 @@ urlpatterns = [
     path('login/google/callback/', GoogleCallBackView.as_view(), name='google_callback'),
     path('login/google/complete-profile/', CompleteGoogleRegistration.as_view(), name='complete_google_registration'),
     path('recent-activities/', RecentActivities.as_view(), name="recent_activities"),
+    path('recent-activities/all/', AllRecentActivities.as_view(), name="all_recent_activities"),
 ]
@@ -1,5 +1,6 @@
 import random
-from .models import RecentActivity
+from django.utils import timezone
+from accounts import activity
 
 def generate_random_code():
     return random.randint(1000, 9999)
@@ -12,22 +13,17 @@ def log_activity(user, action, instance):
         user: User instance
         action: 'CREATE', 'UPDATE', or 'DELETE'
         instance: Model instance (Product, PlantedProduct, Region)
+    The event is queued after commit and stored by the flush_activity_log task.
     """
     model_name = instance._meta.model_name.title()
     if model_name == 'Plantedproduct':
         model_name = 'PlantedProduct'
 
-    recent_count = RecentActivity.objects.filter(user=user).count()
-    if recent_count >= 500:
-        oldest_activities = RecentActivity.objects.filter(user=user).order_by('timestamp')[:10]
-        RecentActivity.objects.filter(
-            id__in=[activity.id for activity in oldest_activities]
-        ).delete()
-
-    RecentActivity.objects.create(
-        user=user,
-        action=action,
-        model_name=model_name,
-        object_id=instance.id,
-        object_name=str(instance)
-    )
+    activity.record({
+        'user_id': user.pk,
+        'action': action,
+        'model_name': model_name,
+        'object_id': instance.pk,
+        'object_name': activity.describe(instance),
+        'timestamp': timezone.now().isoformat(),
+    })
@@ -1,6 +1,5 @@
 import requests
 from decouple import config
-from django.core.paginator import Paginator
 from django.db import transaction
 from django.shortcuts import redirect
 from django.utils.decorators import method_decorator
@@ -15,6 +14,11 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.utils import timezone
 from accounts.utils import generate_random_code
+from accounts.pagination import RecentActivityCursorPagination
+from accounts.activity import activity_total
+from accounts.partitions import feed_window
+from accounts.permissions import IsAdminUser
+from accounts.roles import assign_role
 from accounts.service import send_email_verification, send_password_verification, send_email_to_verify_email
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -101,7 +105,7 @@ class VerifyRegistration(APIView):
                 # Clean up
                 code_db.delete()
 
-                refresh = RefreshToken.for_user(user)
+                refresh = CustomTokenObtainPairSerializer.get_token(user)
                 return Response({
                     "message": "Registration completed successfully",
                     "user": UserSerializer(user).data,
@@ -344,6 +348,8 @@ class ConfirmEmailChange(APIView):
 
 
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         if response.status_code == 200:
@@ -416,7 +422,7 @@ class GoogleCallBackView(APIView):
             }
         )
 
-        refresh = RefreshToken.for_user(user)
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
         access = refresh.access_token
         if created:
             user.set_unusable_password()
@@ -449,16 +455,7 @@ class CompleteGoogleRegistration(APIView):
 
         user.region = region
         user.phone_number = phone_number
-        if role and role == 'Farmers':
-            user_group, _ = Group.objects.get_or_create(name='Farmers')
-        elif role and role == 'Exporters':
-            user_group, _ = Group.objects.get_or_create(name='Exporters')
-        elif role and role == 'Analysts':
-            user_group, _ = Group.objects.get_or_create(name='Analysts')
-        else:
-            user_group, _ = Group.objects.get_or_create(name="Users")
-        user.groups.clear()
-        user.groups.add(user_group)
+        assign_role(user, role)
         user.save()
         return Response({"message": "User profile updated successfully",
                          "role": role,
@@ -468,24 +465,17 @@ class CompleteGoogleRegistration(APIView):
 class RecentActivities(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        """Get user's recent activities with pagination"""
-        activities = RecentActivity.objects.filter(user=request.user)
-
-        page_size = request.GET.get('page_size', 20)
-        page = request.GET.get('page', 1)
-
-        try:
-            paginator = Paginator(activities, page_size)
-            activities_page = paginator.page(page)
-        except:
-            activities_page = activities[:20]
+        """Get user's recent activities, newest first, a cursor page at a time"""
+        start, end = feed_window()
+        activities = RecentActivity.objects.filter(user=request.user, timestamp__gte=start, timestamp__lt=end)
 
+        paginator = RecentActivityCursorPagination()
+        activities_page = paginator.paginate_queryset(activities, request, view=self)
         serializer = RecentActivitySerializer(activities_page, many=True)
 
-        return Response({
-            'activities': serializer.data,
-            'total_count': activities.count()
-        })
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['total_count'] = activity_total(request.user)
+        return response
 
     # def post(self, request):
     #     """Manually log an activity (optional - mainly for testing)"""
@@ -496,3 +486,18 @@ class RecentActivities(APIView):
     #         return Response(serializer.data, status=status.HTTP_201_CREATED)
     #     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class AllRecentActivities(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    def get(self, request):
+        """Get everyone's recent activities, newest first, a cursor page at a time"""
+        start, end = feed_window()
+        activities = RecentActivity.objects.filter(timestamp__gte=start, timestamp__lt=end)
+
+        paginator = RecentActivityCursorPagination()
+        activities_page = paginator.paginate_queryset(activities, request, view=self)
+        serializer = UserRecentActivitySerializer(activities_page, many=True)
+
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['total_count'] = activity_total()
+        return response
@@ -0,0 +1,275 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import translation
+from django_redis import get_redis_connection
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "reference:invalidate"
+VERSION_KEY = "reference:version:{label}"
+ENTRY_KEY = "reference:{label}:{version}:{language}:{key}"
+REFERENCE_STATS_KEY = "reference:stats:{group}:{field}"
+REFERENCE_STATS_FIELDS = ('local_hits', 'redis_hits', 'misses', 'invalidations')
+
+
+class BatchedCounters:
+    """
+    Integer counters per group (an encoding, a model, ...). Counted in process and added to the cache
+    every flush_every records or flush_seconds, so requests do not each pay a Redis round trip.
+    """
+
+    def __init__(self, key_format, fields, flush_every=100, flush_seconds=30):
+        self.key_format = key_format
+        self.fields = fields
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._count = 0
+        self._flushed_at = time.monotonic()
+
+    def record(self, group, **increments):
+        with self._lock:
+            totals = self._pending.setdefault(group, dict.fromkeys(self.fields, 0))
+            for field, value in increments.items():
+                totals[field] += value
+            self._count += 1
+            if self._count < self.flush_every and time.monotonic() - self._flushed_at < self.flush_seconds:
+                return
+            pending, self._pending, self._count = self._pending, {}, 0
+            self._flushed_at = time.monotonic()
+        self._flush(pending)
+
+    def _flush(self, pending):
+        try:
+            for group, totals in pending.items():
+                for field, value in totals.items():
+                    if value:
+                        key = self.key_format.format(group=group, field=field)
+                        cache.add(key, 0, timeout=None)
+                        cache.incr(key, value)
+        except Exception:
+            logger.warning("Could not store counters", exc_info=True)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending, self._count = self._pending, {}, 0
+        self._flush(pending)
+
+    def totals(self, groups):
+        keys = {(group, field): self.key_format.format(group=group, field=field)
+                for group in groups for field in self.fields}
+        values = cache.get_many(list(keys.values()))
+        return {
+            group: {field: values.get(keys[group, field], 0) for field in self.fields}
+            for group in groups
+        }
+
+
+class ReferenceCache:
+    """
+    Cache for reference data (regions, products, groups) that is read on most requests and rarely written.
+    Two tiers: a per-process LRU in front of Redis. Redis entries are keyed per model version and language;
+    invalidate() bumps the model's version and publishes its label, and every process drops its local entries
+    for that model when the message arrives. The local tier is only used while this process is subscribed,
+    so a worker that lost its Redis connection cannot serve entries it may have missed invalidations for.
+    """
+
+    def __init__(self, max_local_entries=None):
+        self.max_local_entries = max_local_entries
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._versions = {}
+        # Bumped by every local drop, so a version read from Redis across an invalidation is not kept
+        self._generation = 0
+        self._listening = False
+        self._listener_pid = None
+        self.stats = BatchedCounters(REFERENCE_STATS_KEY, REFERENCE_STATS_FIELDS)
+        self.models = set()
+
+    # Local tier
+
+    def _local_size(self):
+        return self.max_local_entries or settings.REFERENCE_CACHE_LOCAL_SIZE
+
+    def _local_get(self, entry):
+        with self._lock:
+            if entry not in self._local:
+                return None
+            self._local.move_to_end(entry)
+            return self._local[entry]
+
+    def _local_set(self, entry, value):
+        with self._lock:
+            self._local[entry] = value
+            self._local.move_to_end(entry)
+            while len(self._local) > self._local_size():
+                self._local.popitem(last=False)
+
+    def _drop_local(self, label):
+        with self._lock:
+            self._generation += 1
+            self._versions.pop(label, None)
+            for entry in [entry for entry in self._local if entry[0] == label]:
+                del self._local[entry]
+
+    def clear_local(self):
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._local.clear()
+
+    # Invalidation broadcast
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            # A forked worker inherits the parent's entries but not its listener thread
+            self._listener_pid = pid
+            self._listening = False
+            self._local.clear()
+            self._versions.clear()
+        threading.Thread(target=self._listen, name="reference-cache-listener", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while this process was not subscribed is lost; start over
+                self.clear_local()
+                self._listening = True
+                for message in pubsub.listen():
+                    self._drop_local(message['data'].decode())
+            except RedisError:
+                logger.warning("Reference cache lost its invalidation channel, retrying", exc_info=True)
+            self._listening = False
+            self.clear_local()
+            time.sleep(settings.REFERENCE_CACHE_RETRY_SECONDS)
+
+    # Shared tier
+
+    def _version(self, label):
+        version = self._versions.get(label) if self._listening else None
+        if version is None:
+            generation = self._generation
+            key = VERSION_KEY.format(label=label)
+            version = cache.get(key)
+            if version is None:
+                cache.add(key, 1, timeout=None)
+                version = cache.get(key, 1)
+            with self._lock:
+                if self._listening and generation == self._generation:
+                    self._versions[label] = version
+        return version
+
+    def get(self, model, key, loader, localized=True):
+        """Value cached for (model, key) in the active language, calling loader() on a miss"""
+        self._ensure_listener()
+        label = model._meta.label_lower
+        language = translation.get_language() if localized else ""
+        try:
+            version = self._version(label)
+        except ConnectionInterrupted:
+            logger.warning("Reference cache unavailable, loading %s from the database", label, exc_info=True)
+            return loader()
+
+        entry = (label, version, language, key)
+        if self._listening:
+            value = self._local_get(entry)
+            if value is not None:
+                self.stats.record(label, local_hits=1)
+                return value
+
+        redis_key = ENTRY_KEY.format(label=label, version=version, language=language, key=key)
+        try:
+            value = cache.get(redis_key)
+        except ConnectionInterrupted:
+            value = None
+        if value is not None:
+            self.stats.record(label, redis_hits=1)
+        else:
+            self.stats.record(label, misses=1)
+            value = loader()
+            try:
+                cache.set(redis_key, value, settings.REFERENCE_CACHE_TIMEOUT)
+            except ConnectionInterrupted:
+                logger.warning("Could not store %s in the reference cache", label, exc_info=True)
+        if self._listening:
+            self._local_set(entry, value)
+        return value
+
+    def invalidate(self, model):
+        """Retire every cached entry of the model, here and in every other process"""
+        label = model._meta.label_lower
+        key = VERSION_KEY.format(label=label)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, timeout=None)
+                cache.incr(key)
+            get_redis_connection("default").publish(INVALIDATION_CHANNEL, label)
+        except (ConnectionInterrupted, RedisError):
+            logger.warning("Could not invalidate %s in the reference cache", label, exc_info=True)
+        self._drop_local(label)
+        self.stats.record(label, invalidations=1)
+
+    def invalidate_all(self):
+        for label in self.models:
+            self.invalidate(apps.get_model(label))
+
+    def invalidate_on_commit(self, model):
+        transaction.on_commit(lambda: self.invalidate(model))
+
+    def register(self, *models):
+        """Models listed by stats_summary() and retired by invalidate_all()"""
+        self.models.update(model._meta.label_lower for model in models)
+
+    def stats_summary(self):
+        self.stats.flush()
+        totals = self.stats.totals(sorted(self.models))
+        for counts in totals.values():
+            lookups = counts['local_hits'] + counts['redis_hits'] + counts['misses']
+            counts['hit_ratio'] = (counts['local_hits'] + counts['redis_hits']) / lookups if lookups else 0.0
+        return {
+            "models": totals,
+            "local_entries": len(self._local),
+            "listening": self._listening,
+        }
+
+
+reference_cache = ReferenceCache()
+
+
+def reference_names(model):
+    """{pk: name} of every row of a reference model, in the active language"""
+    return reference_cache.get(model, "names", lambda: dict(model.objects.values_list('id', 'name')))
+
+
+def reference_name(model, pk):
+    """Name of the row with this primary key, or None when the key is not a valid, existing id"""
+    try:
+        return reference_names(model).get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def group_id(name):
+    """Primary key of the auth group with this name, created on first use"""
+    return reference_cache.get(Group, f"id:{name}", lambda: Group.objects.get_or_create(name=name)[0].pk,
+                               localized=False)
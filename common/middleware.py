@@ -0,0 +1,182 @@
+import re
+import secrets
+import struct
+import zlib
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from common.cache import BatchedCounters
+
+ENCODINGS = ('br', 'gzip')
+DEFAULT_LEVELS = {'br': 5, 'gzip': 6}
+# Formats that are compressed already; running them through brotli or gzip again only costs CPU
+INCOMPRESSIBLE_TYPES = re.compile(r'^(image/(?!svg)|video/|audio/|application/(zip|gzip|x-brotli|octet-stream|pdf))')
+STATS_KEY = "compression:stats:{group}:{field}"
+STATS_FIELDS = ('responses', 'original_bytes', 'compressed_bytes')
+
+
+def accepted_encoding(header):
+    """Best of br/gzip the client accepts according to Accept-Encoding (q-values honoured), or None"""
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name] = quality
+
+    wildcard = weights.get('*', 0.0)
+    candidates = [(weights.get(encoding, wildcard), -index, encoding) for index, encoding in enumerate(ENCODINGS)]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def levels_for(path):
+    """Compression levels of the longest COMPRESSION_LEVELS prefix matching the path"""
+    levels = dict(DEFAULT_LEVELS)
+    configured = getattr(settings, 'COMPRESSION_LEVELS', {})
+    for prefix in sorted((prefix for prefix in configured if path.startswith(prefix)), key=len):
+        levels.update(configured[prefix])
+    return levels
+
+
+class Compressor:
+    """
+    Incremental brotli or gzip compressor: compress() each chunk, then finish().
+    Gzip output carries a random file name of 1 to max_random_bytes characters, like Django's
+    compress_string(..., max_random_bytes=...), so its length does not give away guesses about a secret (BREACH).
+    """
+
+    def __init__(self, encoding, level, max_random_bytes=0):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=level)
+            self.compress, self.finish = compressor.process, compressor.finish
+        elif not max_random_bytes:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self.compress, self.finish = compressor.compress, compressor.flush
+        else:
+            self._deflate = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._crc = self._size = 0
+            filename = get_random_string(secrets.randbelow(max_random_bytes) + 1)
+            # Magic, deflate, FNAME flag, no mtime, no extra flags, unknown OS
+            self._header = b'\x1f\x8b\x08\x08\x00\x00\x00\x00\x00\xff' + filename.encode() + b'\x00'
+            self.compress, self.finish = self._gzip_compress, self._gzip_finish
+
+    def _take_header(self):
+        header, self._header = self._header, b''
+        return header
+
+    def _gzip_compress(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        return self._take_header() + self._deflate.compress(data)
+
+    def _gzip_finish(self):
+        return self._take_header() + self._deflate.flush() + struct.pack('<II', self._crc, self._size & 0xffffffff)
+
+
+class CompressionStats(BatchedCounters):
+    """Bytes before and after compression, per encoding"""
+
+    def __init__(self):
+        super().__init__(STATS_KEY, STATS_FIELDS)
+
+    def record(self, encoding, original, compressed):
+        super().record(encoding, responses=1, original_bytes=original, compressed_bytes=compressed)
+
+    def totals(self, groups=ENCODINGS):
+        result = super().totals(groups)
+        for totals in result.values():
+            totals['saved_bytes'] = totals['original_bytes'] - totals['compressed_bytes']
+        return result
+
+
+stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip response compression negotiated from Accept-Encoding.
+    Bodies under COMPRESSION_MIN_SIZE bytes, already compressed formats and COMPRESSION_EXCLUDED_PATHS
+    (responses with tokens, which brotli has no header to pad for) go out as they are;
+    streaming responses are compressed chunk by chunk as they are sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if request.path.startswith(tuple(settings.COMPRESSION_EXCLUDED_PATHS)):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        # Whatever we decide, caches must key on the request's Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding') or INCOMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+
+        encoding = accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        level = levels_for(request.path)[encoding]
+        padding = settings.COMPRESSION_MAX_RANDOM_BYTES
+
+        if response.streaming:
+            compress = self.compress_async if response.is_async else self.compress_stream
+            response.streaming_content = compress(response.streaming_content, encoding, level, padding)
+            del response['Content-Length']
+        else:
+            original = response.content
+            body = Compressor(encoding, level, padding)
+            compressed = body.compress(original) + body.finish()
+            if len(compressed) >= len(original):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+            stats.record(encoding, len(original), len(compressed))
+
+        # A strong ETag describes the uncompressed bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compress_stream(chunks, encoding, level, max_random_bytes=0):
+        body = Compressor(encoding, level, max_random_bytes)
+        original = compressed = 0
+        for chunk in chunks:
+            original += len(chunk)
+            data = body.compress(chunk)
+            if data:
+                compressed += len(data)
+                yield data
+        data = body.finish()
+        compressed += len(data)
+        stats.record(encoding, original, compressed)
+        yield data
+
+    @staticmethod
+    async def compress_async(chunks, encoding, level, max_random_bytes=0):
+        body = Compressor(encoding, level, max_random_bytes)
+        original = compressed = 0
+        async for chunk in chunks:
+            original += len(chunk)
+            data = body.compress(chunk)
+            if data:
+                compressed += len(data)
+                yield data
+        data = body.finish()
+        compressed += len(data)
+        stats.record(encoding, original, compressed)
+        yield data
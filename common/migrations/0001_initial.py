@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.IntegerField()),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('seeded_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'Catalog Seeds',
+            },
+        ),
+    ]
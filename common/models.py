@@ -5,4 +5,17 @@ class BaseModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class CatalogSeed(models.Model):
+    """Fingerprint of the last fixture a seeding command applied (see common.seeding)"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.IntegerField()
+    fingerprint = models.CharField(max_length=64)
+    seeded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "Catalog Seeds"
+
+    def __str__(self):
+        return f"{self.name} v{self.version} ({self.fingerprint[:12]})"
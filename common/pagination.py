@@ -0,0 +1,90 @@
+from base64 import b64decode, b64encode
+from collections.abc import Mapping
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering_field, id), newest first, for querysets backed by a matching
+    (..., -ordering_field, -id) index. Every page is one range scan of that index followed by LIMIT,
+    so deep pages cost the same as the first one, and no COUNT(*) is issued.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_field = 'created_at'
+    results_key = 'results'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = b64decode(encoded.encode(), altchars=b'-_').decode().rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        """Cursor of the page that starts right after instance (a model instance or a values() row)"""
+        if isinstance(instance, Mapping):
+            value, pk = instance[self.ordering_field], instance['id']
+        else:
+            value, pk = getattr(instance, self.ordering_field), instance.pk
+        position = f"{value.isoformat()}|{pk}"
+        return b64encode(position.encode(), altchars=b'-_').decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+
+        cursor = self.decode_cursor(request)
+        if cursor:
+            value, pk = cursor
+            # (field, id) < (value, pk). The redundant field <= value bounds the index scan on the field and
+            # lets Postgres skip partitions of a table partitioned on it.
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__lt': value}) | Q(**{self.ordering_field: value, 'id__lt': pk}),
+                **{f'{self.ordering_field}__lte': value}
+            )
+
+        page = list(queryset[:page_size + 1])
+        self.next_instance = page[page_size - 1] if len(page) > page_size else None
+        return page[:page_size]
+
+    def get_next_link(self):
+        if self.next_instance is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param,
+                                   self.encode_cursor(self.next_instance))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            self.results_key: data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': [self.results_key],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                self.results_key: schema,
+            },
+        }
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import zlib
+from django.db import connection, transaction
+from common.models import CatalogSeed
+
+
+def load_fixture(path):
+    """(fixture data, sha256 of the file) of a versioned catalog fixture"""
+    with open(path, 'rb') as fixture:
+        content = fixture.read()
+    return json.loads(content), hashlib.sha256(content).hexdigest()
+
+
+def _seeded_fingerprint(name):
+    return CatalogSeed.objects.filter(name=name).values_list('fingerprint', flat=True).first()
+
+
+def seed_catalog(name, path, model, build, force=False):
+    """
+    Create the rows of a versioned fixture ({"version": n, "rows": [{"name": ...}, ...]}) that are missing
+    from model, matched by name. Returns the created instances, or None when the stored fingerprint shows
+    this exact fixture was applied already and force is not set; that check is the only query then.
+
+    Seeding takes a transaction-level advisory lock, so containers starting together apply a fixture once
+    and never create the same name twice.
+    """
+    data, fingerprint = load_fixture(path)
+    if not force and _seeded_fingerprint(name) == fingerprint:
+        return None
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [zlib.crc32(f"seed:{name}".encode())])
+        # Another process may have finished the same fixture while we waited for the lock
+        if not force and _seeded_fingerprint(name) == fingerprint:
+            return None
+
+        names = [row['name'] for row in data['rows']]
+        existing = set(model.objects.filter(name__in=names).values_list('name', flat=True))
+        created = model.objects.bulk_create([build(row) for row in data['rows'] if row['name'] not in existing])
+        CatalogSeed.objects.update_or_create(name=name, defaults={'version': data['version'],
+                                                                  'fingerprint': fingerprint})
+    return created
@@ -0,0 +1,114 @@
+from collections.abc import Mapping
+from decimal import Decimal
+from django.core.exceptions import FieldDoesNotExist
+from modeltranslation import settings as modeltranslation_settings
+from modeltranslation.translator import translator, NotRegistered
+from modeltranslation.utils import build_localized_fieldname
+from rest_framework import serializers
+
+
+def _columns(model, name):
+    """Field name plus the per-language columns modeltranslation reads behind it"""
+    try:
+        options = translator.get_options_for_model(model)
+    except NotRegistered:
+        return [name]
+    if name not in options.fields:
+        return [name]
+    return [name] + [build_localized_fieldname(name, language)
+                     for language in modeltranslation_settings.AVAILABLE_LANGUAGES]
+
+
+def _collect(model, serializer, prefix, related, columns):
+    """Walk the serializer's fields; False if some field reads something only() can't know about"""
+    for field in serializer.fields.values():
+        if field.source == '*' or '.' in field.source:
+            return False
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            # A method or property on the model: it may touch any column
+            return False
+
+        if isinstance(field, serializers.ModelSerializer):
+            related.append(prefix + field.source)
+            columns.append(prefix + field.source)
+            if not _collect(model_field.related_model, field, f"{prefix}{field.source}__", related, columns):
+                return False
+        elif model_field.is_relation and not model_field.concrete:
+            return False
+        else:
+            columns.extend(prefix + column for column in _columns(model, field.source))
+    return True
+
+
+def optimize_for_serializer(queryset, serializer_class, extra=()):
+    """
+    select_related() every relation the serializer nests and only() the columns its fields read,
+    so serializing a page costs one query however many rows it holds. extra lists columns needed besides
+    the serializer's own, such as the foreign key a Prefetch matches rows on.
+    """
+    related, columns = [], list(extra)
+    if not _collect(queryset.model, serializer_class(), "", related, columns):
+        return queryset.select_related(*related)
+    return queryset.select_related(*related).only(*columns)
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for values() rows, for large pages where building model instances and running
+    DRF's per-field machinery dominates. get_fields() maps each output key to a values() lookup or an
+    expression; a key mapped to a dict becomes a nested object, or None when all of its values are.
+    Decimals are rendered as strings like DecimalField does.
+    """
+    fields = {}
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def get_fields(cls):
+        return cls.fields
+
+    @classmethod
+    def _leaves(cls, fields, path=()):
+        for key, lookup in fields.items():
+            if isinstance(lookup, Mapping):
+                yield from cls._leaves(lookup, path + (key,))
+            else:
+                key_path = path + (key,)
+                column = lookup if isinstance(lookup, str) else "_".join(key_path)
+                yield key_path, column, lookup
+
+    @classmethod
+    def values(cls, queryset):
+        lookups, expressions = [], {}
+        for _, column, lookup in cls._leaves(cls.get_fields()):
+            if isinstance(lookup, str):
+                lookups.append(lookup)
+            else:
+                expressions[column] = lookup
+        return queryset.values(*lookups, **expressions)
+
+    @staticmethod
+    def _represent(row, fields, leaves):
+        data = {}
+        for path, column, _ in leaves:
+            target = data
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            value = row[column]
+            target[path[-1]] = str(value) if isinstance(value, Decimal) else value
+        for key, lookup in fields.items():
+            if isinstance(lookup, Mapping) and all(value is None for value in data[key].values()):
+                data[key] = None
+        return data
+
+    @property
+    def data(self):
+        fields = self.get_fields()
+        leaves = list(self._leaves(fields))
+        if self.many:
+            return [self._represent(row, fields, leaves) for row in self.instance]
+        return self._represent(self.instance, fields, leaves)
@@ -1,3 +1,265 @@
-from django.test import TestCase
+import gzip
+import json
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+import brotli
+import msgpack
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from accounts.models import User
+from common.cache import ReferenceCache, reference_cache
+from common.middleware import CompressionMiddleware, accepted_encoding
+from common.models import CatalogSeed
+from common.pagination import KeysetPagination
+from common.renderers import MessagePackRenderer, ORJSONRenderer
+from common.seeding import load_fixture
+from products.management.commands.add_products import FIXTURE as PRODUCTS
+from products.models import Product, PlantedProduct
+from regions.management.commands.add_regions import FIXTURE as REGIONS
+from regions.models import Region
 
-# Create your tests here.
+
+def wait_until_listening(cache):
+    cache._ensure_listener()
+    for _ in range(100):
+        if cache._listening:
+            return
+        time.sleep(0.02)
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        # Cached entries live in Redis, which outlives the test database
+        reference_cache.invalidate_all()
+        self.region = Region.objects.create(name="Tashkent")
+        self.loads = 0
+
+    def load_names(self):
+        self.loads += 1
+        return dict(Region.objects.values_list('id', 'name'))
+
+    def test_invalidation_reaches_other_processes(self):
+        first, second = ReferenceCache(), ReferenceCache()
+        wait_until_listening(first)
+        wait_until_listening(second)
+
+        self.assertEqual(first.get(Region, "names", self.load_names), {self.region.pk: "Tashkent"})
+        self.assertEqual(second.get(Region, "names", self.load_names), {self.region.pk: "Tashkent"})
+        self.assertEqual(self.loads, 1)
+
+        Region.objects.filter(pk=self.region.pk).update(name="Toshkent")
+        first.invalidate(Region)
+        for _ in range(100):
+            if not second._local:
+                break
+            time.sleep(0.02)
+        self.assertEqual(second.get(Region, "names", self.load_names), {self.region.pk: "Toshkent"})
+        self.assertEqual(self.loads, 2)
+
+    def test_local_tier_is_bounded(self):
+        cache = ReferenceCache(max_local_entries=2)
+        wait_until_listening(cache)
+        for key in "abc":
+            cache.get(Region, key, self.load_names)
+        self.assertEqual([entry[-1] for entry in cache._local], ["b", "c"])
+
+    def test_region_list_is_served_from_cache(self):
+        wait_until_listening(reference_cache)
+        client = APIClient()
+        client.get("/api/regions/")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/regions/")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data[0]["name"], "Tashkent")
+
+
+class SeedCatalogTests(TestCase):
+    def test_regions_are_seeded_once(self):
+        call_command("add_regions", stdout=StringIO())
+        self.assertEqual(Region.objects.count(), 13)
+
+        with self.assertNumQueries(1):
+            call_command("add_regions", stdout=StringIO())
+
+        Region.objects.filter(name="Navoi").delete()
+        call_command("add_regions", force=True, stdout=StringIO())
+        self.assertEqual(sorted(Region.objects.values_list("name", flat=True)),
+                         sorted(row["name"] for row in load_fixture(REGIONS)[0]["rows"]))
+
+    def test_existing_products_are_kept(self):
+        Product.objects.create(name="Cotton")
+        call_command("add_products", stdout=StringIO())
+        self.assertEqual(Product.objects.filter(name="Cotton").count(), 1)
+        self.assertEqual(Product.objects.count(), len(load_fixture(PRODUCTS)[0]["rows"]))
+        self.assertEqual(CatalogSeed.objects.get(name="products").version, 1)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        PlantedProduct.objects.bulk_create([
+            PlantedProduct(owner=owner, planting_area=Decimal(1), expecting_weight=Decimal(i)) for i in range(11)
+        ])
+        # Several rows share a created_at, so the id has to break ties
+        for i, planted in enumerate(PlantedProduct.objects.order_by('id')):
+            PlantedProduct.objects.filter(pk=planted.pk).update(
+                created_at=datetime(2026, 1, 1 + i // 3, tzinfo=dt_timezone.utc)
+            )
+
+    def paginate(self, **params):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get("/api/products/planted-products/", params))
+        return paginator.paginate_queryset(PlantedProduct.objects.all(), request), paginator
+
+    def test_pages_follow_created_at_then_id(self):
+        expected = list(PlantedProduct.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, cursor = [], None
+        while True:
+            page, paginator = self.paginate(page_size=4, **({"cursor": cursor} if cursor else {}))
+            ids += [planted.pk for planted in page]
+            if paginator.next_instance is None:
+                break
+            self.assertEqual(len(page), 4)
+            cursor = paginator.encode_cursor(paginator.next_instance)
+        self.assertEqual(ids, expected)
+
+    def test_cursor_from_a_values_row(self):
+        row = PlantedProduct.objects.order_by('-created_at', '-id').values('id', 'created_at')[4]
+        page, _ = self.paginate(cursor=KeysetPagination().encode_cursor(row))
+        self.assertEqual([planted.pk for planted in page], list(
+            PlantedProduct.objects.order_by('-created_at', '-id').values_list('id', flat=True)[5:]
+        ))
+
+    def test_invalid_cursor(self):
+        for cursor in ("not base64!", "bm90LWEtY3Vyc29y", "MjAyNi0wMS0wMXx4"):
+            with self.subTest(cursor=cursor), self.assertRaisesMessage(NotFound, "Invalid cursor"):
+                self.paginate(cursor=cursor)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get())
+        response = client.get("/api/products/planted-products/", {"cursor": "not base64!"})
+        self.assertEqual((response.status_code, response.data["detail"]), (404, "Invalid cursor"))
+
+
+class RendererTests(TestCase):
+    payload = {
+        "decimal": Decimal("12.500"),
+        "datetimes": [
+            datetime(2026, 3, 1, 8, 30, tzinfo=dt_timezone.utc),
+            datetime(2026, 3, 1, 8, 30, 15, 123456, tzinfo=dt_timezone(timedelta(hours=5))),
+            datetime(2026, 3, 1, 8, 30),
+        ],
+        "date": date(2026, 3, 1),
+        "time": dt_time(8, 30, 15),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "duration": timedelta(hours=1, seconds=1),
+        "lazy": gettext_lazy("Invalid cursor"),
+        "nested": [{"id": 1, "weight": Decimal("0.001"), "missing": None}],
+        1: "integer key",
+    }
+
+    def test_payloads_match_json_renderer(self):
+        expected = json.loads(JSONRenderer().render(self.payload))
+        self.assertEqual(json.loads(ORJSONRenderer().render(self.payload)), expected)
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(self.payload), strict_map_key=False),
+                         {int(key) if key.isdigit() else key: value for key, value in expected.items()})
+
+    def test_api_responses_match_across_formats(self):
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        PlantedProduct.objects.create(owner=owner, product=Product.objects.create(name="Cotton"),
+                                      planting_area=Decimal("1.5"), expecting_weight=Decimal("12.25"))
+        client = APIClient()
+        client.force_authenticate(owner)
+        as_json = client.get("/api/products/planted-products/", HTTP_ACCEPT="application/json")
+        as_msgpack = client.get("/api/products/planted-products/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(as_msgpack["Content-Type"], "application/msgpack")
+        self.assertEqual(json.loads(as_json.content), json.loads(JSONRenderer().render(as_json.data)))
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200, COMPRESSION_LEVELS={})
+class CompressionMiddlewareTests(TestCase):
+    body = b'{"region": "Tashkent", "wph": 12.5}' * 50
+
+    def respond(self, response, accept_encoding="br, gzip", path="/api/products/wph/matrix/"):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_negotiation(self):
+        self.assertEqual(accepted_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(accepted_encoding("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(accepted_encoding("br;q=0, *"), "gzip")
+        self.assertEqual(accepted_encoding("identity"), None)
+        self.assertEqual(accepted_encoding("gzip;q=0, br;q=0"), None)
+
+        response = self.respond(HttpResponse(self.body))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+        response = self.respond(HttpResponse(self.body), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+        response = self.respond(HttpResponse(self.body), "identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body)
+
+    def test_small_and_compressed_bodies_are_left_alone(self):
+        response = self.respond(HttpResponse(self.body[:100]))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body[:100])
+
+        response = self.respond(HttpResponse(self.body, content_type="image/png"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body)
+
+    def test_streaming_responses_are_compressed_per_chunk(self):
+        chunks = [self.body[i:i + 64] for i in range(0, len(self.body), 64)]
+        response = self.respond(StreamingHttpResponse(iter(chunks)), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.body)
+
+    def test_breach_mitigation(self):
+        responses = [self.respond(HttpResponse(self.body), "gzip") for _ in range(20)]
+        for response in responses:
+            self.assertEqual(gzip.decompress(response.content), self.body)
+            self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertGreater(len({len(response.content) for response in responses}), 1)
+
+        chunks = [self.body[i:i + 64] for i in range(0, len(self.body), 64)]
+        response = self.respond(StreamingHttpResponse(iter(chunks)), "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.body)
+
+        with override_settings(COMPRESSION_MAX_RANDOM_BYTES=0):
+            self.assertEqual(len({len(self.respond(HttpResponse(self.body), "gzip").content) for _ in range(5)}), 1)
+
+        # Brotli has nowhere to put padding, so responses with tokens are not compressed at all
+        for encoding in ("br", "gzip"):
+            response = self.respond(HttpResponse(self.body), encoding, path="/api/accounts/login/")
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertEqual(response.content, self.body)
+
+    def test_vary_and_etag(self):
+        original = HttpResponse(self.body, headers={"ETag": '"abc"', "Vary": "Accept-Language"})
+        response = self.respond(original)
+        self.assertEqual(response["Vary"], "Accept-Language, Accept-Encoding")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+        # Not compressed for this client, but a shared cache must still tell the variants apart
+        response = self.respond(HttpResponse(self.body, headers={"ETag": '"abc"'}), "identity")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["ETag"], '"abc"')
@@ -0,0 +1,8 @@
+from django.urls import path
+from common.views import CompressionStats, ReferenceCacheStats
+
+app_name = "common"
+urlpatterns = [
+    path('compression-stats/', CompressionStats.as_view(), name='compression-stats'),
+    path('reference-cache-stats/', ReferenceCacheStats.as_view(), name='reference-cache-stats'),
+]
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from accounts.permissions import IsAdminUser
+from common.cache import reference_cache
+from common.middleware import stats
 
-# Create your views here.
+
+class CompressionStats(APIView):
+    """Bytes sent before and after response compression, per encoding, across all workers"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        stats.flush()
+        return Response(stats.totals(), status=status.HTTP_200_OK)
+
+
+class ReferenceCacheStats(APIView):
+    """Hits per tier, misses and invalidations of the reference data cache, per model"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(reference_cache.stats_summary(), status=status.HTTP_200_OK)
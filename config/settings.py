@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # local
     'accounts',
@@ -61,6 +62,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'common.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -182,11 +184,22 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.ORJSONRenderer',
+        'common.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.ORJSONParser',
+        'common.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -221,6 +234,13 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Authenticate read-only requests from the access token's claims instead of loading the user
+# (accounts.authentication); tokens issued before a user's groups or flags changed still load it
+JWT_STATELESS_AUTH = config("JWT_STATELESS_AUTH", default=False, cast=bool)
+
+# Seconds Redis caches a user's token version stamp; bounds how long a stamp Redis missed can go unnoticed
+JWT_VERSION_CACHE_TIMEOUT = config("JWT_VERSION_CACHE_TIMEOUT", default=60, cast=int)
+
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587)
@@ -275,6 +295,30 @@ CELERY_TASK_CREATE_MISSING_QUEUES = True
 # Beat scheduler (if you're using periodic tasks)
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers.DatabaseScheduler"
 
+# Periodic tasks; the database scheduler picks these up on start
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-live-stats': {
+        'task': 'products.tasks.reconcile_live_stats',
+        'schedule': config("LIVE_STATS_RECONCILE_SECONDS", default=300, cast=int),
+    },
+    'flush-activity-log': {
+        'task': 'accounts.tasks.flush_activity_log',
+        'schedule': config("ACTIVITY_FLUSH_SECONDS", default=5, cast=int),
+    },
+    'maintain-activity-partitions': {
+        'task': 'accounts.tasks.maintain_activity_partitions',
+        'schedule': config("ACTIVITY_PARTITION_SECONDS", default=86400, cast=int),
+    },
+}
+
+# Activity log (accounts.activity): events flushed from Redis per batch, the cap on events buffered while
+# no worker flushes, the monthly partitions created ahead of time and the full months kept before the
+# current one; older partitions are dropped (accounts.partitions)
+ACTIVITY_FLUSH_BATCH_SIZE = config("ACTIVITY_FLUSH_BATCH_SIZE", default=1000, cast=int)
+ACTIVITY_STREAM_MAXLEN = config("ACTIVITY_STREAM_MAXLEN", default=100000, cast=int)
+ACTIVITY_PARTITIONS_AHEAD = config("ACTIVITY_PARTITIONS_AHEAD", default=3, cast=int)
+ACTIVITY_RETENTION_MONTHS = config("ACTIVITY_RETENTION_MONTHS", default=12, cast=int)
+
 # Error handling
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 
@@ -291,3 +335,45 @@ CACHES = {
         }
     }
 }
+
+# Seconds an analytics response stays cached; writes invalidate earlier through the namespace version
+ANALYTICS_CACHE_TIMEOUT = config("ANALYTICS_CACHE_TIMEOUT", default=300, cast=int)
+
+# Default engine for the WPH analytics views: "sql" (rollup tables) or "numpy" (in-process columnar snapshot).
+# Either can be picked per request with ?engine=
+ANALYTICS_ENGINE = config("ANALYTICS_ENGINE", default="sql")
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=860, cast=int)
+
+# Gzip responses carry 1 to this many random bytes so their length cannot be used to guess secrets (BREACH)
+COMPRESSION_MAX_RANDOM_BYTES = config("COMPRESSION_MAX_RANDOM_BYTES", default=100, cast=int)
+
+# Path prefixes never compressed: their responses carry tokens, and brotli output cannot be padded
+COMPRESSION_EXCLUDED_PATHS = ("/api/accounts/",)
+
+# Compression levels per path prefix, longest prefix wins: brotli quality 0-11, gzip level 1-9.
+# Everything else uses brotli 5 / gzip 6
+COMPRESSION_LEVELS = {
+    "/api/products/wph/matrix/": {"br": 9},
+    "/api/products/export/": {"br": 4, "gzip": 5},
+}
+
+# Reference data cache (regions, products, groups): seconds an entry stays in Redis,
+# entries kept in each process's LRU, and seconds between attempts to resubscribe to invalidations
+REFERENCE_CACHE_TIMEOUT = config("REFERENCE_CACHE_TIMEOUT", default=3600, cast=int)
+REFERENCE_CACHE_LOCAL_SIZE = config("REFERENCE_CACHE_LOCAL_SIZE", default=1024, cast=int)
+REFERENCE_CACHE_RETRY_SECONDS = config("REFERENCE_CACHE_RETRY_SECONDS", default=5, cast=int)
+
+# Seconds a user's role (accounts.roles) stays cached; group membership changes forget it earlier
+ROLE_CACHE_TIMEOUT = config("ROLE_CACHE_TIMEOUT", default=3600, cast=int)
+
+# Product name auto-translation (products.service): the translator class ("products.service.StubTranslator"
+# translates offline), seconds allowed per language, and the circuit breaker that stops calling the translator
+# after THRESHOLD failures within WINDOW seconds, for COOLDOWN seconds
+PRODUCT_TRANSLATOR = config("PRODUCT_TRANSLATOR", default="products.service.GoogleTranslator")
+TRANSLATION_TIMEOUT = config("TRANSLATION_TIMEOUT", default=10, cast=int)
+TRANSLATION_RETRY_DELAY = config("TRANSLATION_RETRY_DELAY", default=30, cast=int)
+TRANSLATION_BREAKER_THRESHOLD = config("TRANSLATION_BREAKER_THRESHOLD", default=5, cast=int)
+TRANSLATION_BREAKER_WINDOW = config("TRANSLATION_BREAKER_WINDOW", default=60, cast=int)
+TRANSLATION_BREAKER_COOLDOWN = config("TRANSLATION_BREAKER_COOLDOWN", default=300, cast=int)
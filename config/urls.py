@@ -41,4 +41,5 @@ urlpatterns = [
     path('api/regions/', include('regions.urls')),
     path("api/products/", include("products.urls")),
     path('api/farmers/', include('farmers.urls')),
+    path('api/common/', include('common.urls')),
 ]
@@ -0,0 +1,4 @@
+from common.pagination import KeysetPagination
+
+class FarmerCursorPagination(KeysetPagination):
+    ordering_field = 'date_joined'
@@ -15,15 +15,13 @@ from products.serializers import ProductSerializer
 
 class PlantedProductForFarmerSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    wph = serializers.SerializerMethodField()
+    # Stored generated column (expecting_weight / planting_area), null when the area is zero
+    wph = serializers.FloatField(read_only=True)
 
     class Meta:
         model = PlantedProduct
         fields = ['product', 'planting_area', 'expecting_weight', 'wph', 'created_at', 'updated_at']
 
-    def get_wph(self, obj):
-        return obj.expecting_weight / obj.planting_area
-
 
 class FarmerSerializer(serializers.ModelSerializer):
     planted_products = PlantedProductForFarmerSerializer(many=True, read_only=True)
@@ -1,3 +1,62 @@
+from decimal import Decimal
+from django.contrib.auth.models import Group
 from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from products.models import Product, PlantedProduct
+from regions.models import Region
 
-# Create your tests here.
+
+class FarmerDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        farmers = Group.objects.create(name='Farmers')
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.other_region = Region.objects.create(name="Samarkand")
+        cls.product = Product.objects.create(name="Cotton")
+        cls.farmers = []
+        for i in range(30):
+            farmer = User.objects.create_user(email=f"farmer{i}@example.com", password="secret", first_name=f"Farmer {i}",
+                                              region="Tashkent" if i % 3 else "Samarkand")
+            farmer.groups.add(farmers)
+            cls.farmers.append(farmer)
+        User.objects.create_user(email="exporter@example.com", password="secret", first_name="Exporter")
+        PlantedProduct.objects.bulk_create([
+            PlantedProduct(product=cls.product, owner=farmer, region=cls.region if j % 2 else cls.other_region,
+                           planting_area=Decimal(j), expecting_weight=Decimal(10))
+            for farmer in cls.farmers for j in range(4)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for page_size in (5, 30):
+            with self.subTest(page_size=page_size), self.assertNumQueries(2):
+                response = self.client.get("/api/farmers/", {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+            self.assertTrue(all(len(farmer["planted_products"]) == 4 for farmer in response.data["results"]))
+
+    def test_pages_cover_every_farmer_once(self):
+        ids, url = [], "/api/farmers/?page_size=7"
+        while url:
+            response = self.client.get(url)
+            ids += [farmer["id"] for farmer in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(sorted(ids), sorted(farmer.pk for farmer in self.farmers))
+
+    def test_wph_is_computed_in_the_database(self):
+        response = self.client.get("/api/farmers/", {"page_size": 1})
+        wph = {planting["planting_area"]: planting["wph"] for planting in response.data["results"][0]["planted_products"]}
+        self.assertEqual(wph, {"0.000": None, "1.000": 10.0, "2.000": 5.0, "3.000": 3.333333})
+
+    def test_region_filters(self):
+        response = self.client.get("/api/farmers/", {"page_size": 100, "region": "samarkand"})
+        self.assertEqual(len(response.data["results"]), 10)
+
+        response = self.client.get("/api/farmers/", {"page_size": 100, "region_id": self.region.pk})
+        self.assertEqual(len(response.data["results"]), 30)
+        plantings = [planting for farmer in response.data["results"] for planting in farmer["planted_products"]]
+        self.assertEqual({planting["planting_area"] for planting in plantings}, {"1.000", "3.000"})
+
+        self.assertEqual(self.client.get("/api/farmers/", {"region_id": "x"}).status_code, 400)
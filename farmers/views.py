@@ -1,17 +1,50 @@
+from django.db.models import Exists, OuterRef, Prefetch
+from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from accounts.models import User
-from django.contrib.auth.models import Group
-from farmers.serializers import FarmerSerializer
+from accounts.roles import FARMERS
+from common.serializers import optimize_for_serializer
+from farmers.pagination import FarmerCursorPagination
+from farmers.serializers import FarmerSerializer, PlantedProductForFarmerSerializer
+from products.models import PlantedProduct
 
 
 class FarmerAPIView(APIView):
+    """
+    Farmers with their plantings, newest first, cursor paginated. Two queries per page whatever its size:
+    the farmers, then all of their plantings with products joined in.
+    ?region= matches the farmer's registered region (case-insensitive);
+    ?region_id= keeps farmers with plantings in that region, and only those plantings.
+    """
     permission_classes = (AllowAny,)
+    # What FarmerSerializer reads from the user row, plus the pagination ordering field
+    columns = ('id', 'first_name', 'last_name', 'email', 'phone_number', 'region', 'date_joined')
 
     def get(self, request):
-        groups = Group.objects.get_or_create(name='Farmers')[0]
-        print(groups)
-        farmers = User.objects.filter(groups=groups)
-        serializer = FarmerSerializer(farmers, many=True)
-        return Response(serializer.data)
+        farmers = User.objects.filter(groups__name=FARMERS)
+        plantings = PlantedProduct.objects.order_by('-created_at', '-id')
+
+        region = request.query_params.get("region")
+        if region:
+            farmers = farmers.filter(region__iexact=region)
+
+        region_id = request.query_params.get("region_id")
+        if region_id:
+            try:
+                region_id = int(region_id)
+            except ValueError:
+                return Response({"error": "region_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            plantings = plantings.filter(region_id=region_id)
+            farmers = farmers.filter(Exists(plantings.filter(owner=OuterRef('pk'))))
+
+        plantings = optimize_for_serializer(plantings, PlantedProductForFarmerSerializer, extra=('owner',))
+        farmers = farmers.only(*self.columns).prefetch_related(
+            Prefetch('planted_products', queryset=plantings)
+        )
+
+        paginator = FarmerCursorPagination()
+        page = paginator.paginate_queryset(farmers, request, view=self)
+        serializer = FarmerSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
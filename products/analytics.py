@@ -0,0 +1,205 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Sum, Count, Min
+from common.cache import reference_names
+from products.models import Product
+from regions.models import Region
+
+UNKNOWN_REGION = "Unknown Region"
+UNKNOWN_PRODUCT = "Unknown Product"
+
+
+def grouped_totals(queryset, *fields):
+    """
+    GROUP BY the given fields in SQL and return one row per group with
+    weight, area and record totals, ordered by first appearance.
+    """
+    return queryset.values(*fields).annotate(
+        weight=Sum('expecting_weight'),
+        area=Sum('planting_area'),
+        records=Count('id'),
+        first_id=Min('id'),
+    ).order_by('first_id')
+
+
+def rollup_totals(queryset, *fields):
+    """Same rows as grouped_totals, read from the RegionProductStats rollup instead of raw plantings"""
+    return queryset.filter(planting_count__gt=0).values(*fields).annotate(
+        weight=Sum('total_weight'),
+        area=Sum('total_area'),
+        records=Sum('planting_count'),
+        first_id=Min('id'),
+    ).order_by('first_id')
+
+
+def with_names(rows):
+    """
+    Copy of rows grouped by region_id and/or product_id with region__name / product__name added,
+    looked up in the reference cache in the active language (so translated product names are used)
+    """
+    names = {}
+    result = []
+    for row in rows:
+        row = dict(row)
+        for group, model in (('region', Region), ('product', Product)):
+            if f'{group}_id' in row:
+                if group not in names:
+                    names[group] = reference_names(model)
+                row[f'{group}__name'] = names[group].get(row[f'{group}_id'])
+        result.append(row)
+    return result
+
+
+def wph_leaderboard(queryset):
+    """
+    Plantings with a WPH, best first, with owner names joined in (product and region names come from with_names).
+    Ordered exactly like the descending WPH indexes, so LIMIT reads just the top of an index.
+    """
+    return queryset.filter(wph__isnull=False).order_by('-wph', 'id').values(
+        'id', 'wph', 'planting_area', 'expecting_weight',
+        'owner__first_name', 'owner__last_name', 'product_id', 'region_id',
+    )
+
+
+def leaderboard_entry(row):
+    owner = " ".join(name for name in (row['owner__first_name'], row['owner__last_name']) if name)
+    return {
+        "id": row['id'],
+        "wph": float(row['wph']),
+        "planting_area": row['planting_area'],
+        "expecting_weight": row['expecting_weight'],
+        "owner": owner or None,
+        "product": row['product__name'] or UNKNOWN_PRODUCT,
+        "region": row['region__name'] or UNKNOWN_REGION,
+    }
+
+
+def wph_entry(name_key, name, weight, area, records):
+    wph = float(weight / area) if area > 0 else 0.0
+    return {
+        name_key: name,
+        "expecting_weight": float(weight),
+        "planting_area": float(area),
+        "wph": wph,
+        "planted_records": records
+    }
+
+
+def _merge(rows, field, unknown):
+    """Merge grouped rows by name, keeping first-seen order"""
+    totals = {}
+    for row in rows:
+        name = row[field] if row[field] is not None else unknown
+        bucket = totals.setdefault(name, [0, 0, 0])
+        bucket[0] += row['weight'] or 0
+        bucket[1] += row['area'] or 0
+        bucket[2] += row['records']
+    return totals
+
+
+def wph_list(rows, field, name_key, unknown):
+    """Build WPH entries for each group, sorted by WPH descending"""
+    result = [
+        wph_entry(name_key, name, weight, area, records)
+        for name, (weight, area, records) in _merge(rows, field, unknown).items()
+    ]
+    result.sort(key=lambda x: x['wph'], reverse=True)
+    return result
+
+
+def wph_total(rows, name):
+    """One WPH entry over all rows, shaped like the WPHPerRegion response"""
+    weight = sum(row['weight'] or 0 for row in rows)
+    area = sum(row['area'] or 0 for row in rows)
+    return {
+        "region": name,
+        "expecting_weight": float(weight),
+        "planting_area": float(area),
+        "wph": float(weight / area) if area > 0 else 0.0,
+        "total_records": sum(row['records'] for row in rows)
+    }
+
+
+def top_region(rows):
+    """Region with the highest total expecting weight, shaped like the TopPerformingRegion response"""
+    totals = _merge(rows, 'region__name', UNKNOWN_REGION)
+    if not totals:
+        return {"region": "No data", "total_production": 0}
+    name, (weight, _, _) = max(totals.items(), key=lambda item: item[1][0])
+    return {"region": name, "total_production": float(weight)}
+
+
+@contextmanager
+def consistent_snapshot():
+    """
+    Transaction in which every query sees the same snapshot of the database (REPEATABLE READ on Postgres).
+    Nested in an existing transaction it simply joins it.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        yield
+
+
+def wph_matrix(rows):
+    """Build the region vs product WPH matrix from rows grouped by both names"""
+    per_region = {}
+    for row in rows:
+        region_name = row['region__name'] if row['region__name'] is not None else UNKNOWN_REGION
+        per_region.setdefault(region_name, []).append(row)
+
+    result = []
+    for region_name, region_rows in per_region.items():
+        products = wph_list(region_rows, 'product__name', 'product_name', UNKNOWN_PRODUCT)
+        result.append({
+            "region_name": region_name,
+            "products": products,
+            # Sort regions by best WPH (average of all products)
+            "avg_wph": sum(p["wph"] for p in products) / len(products) if products else 0.0
+        })
+
+    result.sort(key=lambda x: x['avg_wph'], reverse=True)
+    return result
+
+
+def periods(granularity, start, end):
+    """Start dates of every day or month bucket from start (a bucket start) to end, inclusive"""
+    if granularity == 'day':
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    first, last = month_index(start), month_index(end)
+    return [date(index // 12, index % 12 + 1, 1) for index in range(first, last + 1)]
+
+
+def month_index(day):
+    """Months since year 0 of the month containing day, so month ranges step without date overflow"""
+    return day.year * 12 + day.month - 1
+
+
+def production_series(queryset, granularity, start, end):
+    """
+    Time series of production totals from ProductionBucket rows, one entry per period
+    (empty periods included) between start and end.
+    """
+    if granularity == 'month':
+        start = start.replace(day=1)
+    buckets = {
+        row['period_start']: row
+        for row in queryset.filter(
+            granularity=granularity, period_start__gte=start, period_start__lte=end
+        ).values('period_start').annotate(
+            weight=Sum('total_weight'),
+            area=Sum('total_area'),
+            records=Sum('planting_count'),
+        ).order_by()
+    }
+
+    series = []
+    for period_start in periods(granularity, start, end):
+        row = buckets.get(period_start, {'weight': Decimal('0'), 'area': Decimal('0'), 'records': 0})
+        series.append(wph_entry('period', period_start.isoformat(), row['weight'], row['area'], row['records']))
+    return series
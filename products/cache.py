@@ -0,0 +1,74 @@
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "analytics:version"
+HITS_KEY = "analytics:stats:hits"
+MISSES_KEY = "analytics:stats:misses"
+INVALIDATIONS_KEY = "analytics:stats:invalidations"
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Retire every cached analytics response at once; old keys simply expire"""
+    _incr(VERSION_KEY)
+    _incr(INVALIDATIONS_KEY)
+
+
+def cache_key(view_name, request, params):
+    query = urlencode([(param, request.query_params.get(param, "")) for param in params])
+    return f"analytics:{get_version()}:{view_name}:{translation.get_language()}:{query}"
+
+
+def cached_analytics(*params):
+    """
+    Cache successful responses of an analytics view's get() in Redis.
+    The key covers the given query params, the active language and the namespace version.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = cache_key(type(self).__name__, request, params)
+            data = cache.get(key)
+            if data is not None:
+                _incr(HITS_KEY)
+                return Response(data, status=status.HTTP_200_OK)
+
+            _incr(MISSES_KEY)
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY, INVALIDATIONS_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "invalidations": values.get(INVALIDATIONS_KEY, 0),
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        "version": get_version(),
+    }
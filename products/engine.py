@@ -0,0 +1,206 @@
+import threading
+import time
+from datetime import timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from products.cache import get_version
+from products.models import PlantedProduct
+
+NULL_ID = -1
+# Rows committed slightly out of updated_at order are picked up by re-reading this window
+HIGH_WATER_OVERLAP = timedelta(minutes=1)
+CHUNK_SIZE = 20_000
+
+COLUMNS = ('id', 'region_id', 'product_id', 'planting_area', 'expecting_weight', 'created_at', 'updated_at')
+DTYPES = {
+    'id': np.int64,
+    'region_id': np.int64,
+    'product_id': np.int64,
+    'planting_area': np.float64,
+    'expecting_weight': np.float64,
+    'created_at': 'datetime64[us]',
+    'updated_at': 'datetime64[us]',
+}
+
+
+def engine_requested(request):
+    """Whether this request should be served by the columnar engine instead of SQL"""
+    return request.query_params.get("engine", settings.ANALYTICS_ENGINE) == "numpy"
+
+
+def _to_arrays(rows):
+    columns = list(zip(*rows)) if rows else [() for _ in COLUMNS]
+    arrays = {}
+    for name, values in zip(COLUMNS, columns):
+        if name in ('region_id', 'product_id'):
+            values = [NULL_ID if value is None else value for value in values]
+        elif name in ('created_at', 'updated_at'):
+            values = [value.replace(tzinfo=None) for value in values]
+        arrays[name] = np.array(values, dtype=DTYPES[name])
+    return arrays
+
+
+def _id(value):
+    return None if value == NULL_ID else int(value)
+
+
+def _load(queryset):
+    chunks, rows = [], []
+    for row in queryset.order_by('id').values_list(*COLUMNS).iterator(chunk_size=CHUNK_SIZE):
+        rows.append(row)
+        if len(rows) == CHUNK_SIZE:
+            chunks.append(_to_arrays(rows))
+            rows = []
+    chunks.append(_to_arrays(rows))
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+
+class Snapshot:
+    """
+    PlantedProduct as one NumPy array per column (sorted by id) plus the group codes derived from them.
+    Only ids are kept; names are resolved per request, in its language (see products.analytics.with_names).
+    WPH groupings use bincount/minimum.at; totals are float64, so they can differ from the Decimal
+    SQL path in the last digits.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.region_ids, self.region_codes = np.unique(columns['region_id'], return_inverse=True)
+        self.product_ids, self.product_codes = np.unique(columns['product_id'], return_inverse=True)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    @property
+    def high_water(self):
+        return self.columns['updated_at'].max() if len(self) else None
+
+    @property
+    def nbytes(self):
+        arrays = list(self.columns.values()) + [self.region_ids, self.region_codes,
+                                                self.product_ids, self.product_codes]
+        return sum(array.nbytes for array in arrays)
+
+    def _mask(self, region_id=None, product_id=None):
+        mask = np.ones(len(self), dtype=bool)
+        if region_id is not None:
+            mask &= self.columns['region_id'] == int(region_id)
+        if product_id is not None:
+            mask &= self.columns['product_id'] == int(product_id)
+        return mask
+
+    def overall(self, region_id=None):
+        mask = self._mask(region_id=region_id)
+        return {
+            'weight': float(self.columns['expecting_weight'][mask].sum()),
+            'area': float(self.columns['planting_area'][mask].sum()),
+            'records': int(mask.sum()),
+        }
+
+    def grouped(self, by, region_id=None, product_id=None):
+        """
+        Rows shaped like products.analytics.rollup_totals, grouped by 'region', 'product' or both,
+        in order of first appearance.
+        """
+        mask = self._mask(region_id, product_id)
+        n_products = len(self.product_ids)
+        if by == 'region':
+            codes, size = self.region_codes, len(self.region_ids)
+        elif by == 'product':
+            codes, size = self.product_codes, n_products
+        else:
+            codes, size = self.region_codes * n_products + self.product_codes, len(self.region_ids) * n_products
+
+        codes = codes[mask]
+        weight = np.bincount(codes, weights=self.columns['expecting_weight'][mask], minlength=size)
+        area = np.bincount(codes, weights=self.columns['planting_area'][mask], minlength=size)
+        records = np.bincount(codes, minlength=size)
+        first = np.full(size, len(codes))
+        np.minimum.at(first, codes, np.arange(len(codes)))
+
+        rows = []
+        for code in np.argsort(first, kind='stable'):
+            if not records[code]:
+                continue
+            region_code, product_code = divmod(int(code), n_products) if by == 'both' else (code, code)
+            row = {'weight': float(weight[code]), 'area': float(area[code]), 'records': int(records[code])}
+            if by in ('region', 'both'):
+                row['region_id'] = _id(self.region_ids[region_code])
+            if by in ('product', 'both'):
+                row['product_id'] = _id(self.product_ids[product_code])
+            rows.append(row)
+        return rows
+
+
+class ColumnarEngine:
+    """
+    Process-wide holder of the current snapshot.
+    Refreshes only after the analytics cache version moved, i.e. after a write. New and updated rows are
+    merged in from the updated_at high-water mark; a row count mismatch means deletes and forces a reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self.refreshed_at = None
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def snapshot(self):
+        version = get_version()
+        if self._snapshot is None or version != self._version:
+            with self._lock:
+                if self._snapshot is None or version != self._version:
+                    self._refresh()
+                    self._version = version
+        return self._snapshot
+
+    def _refresh(self):
+        current = self._snapshot
+
+        if current is None or current.high_water is None:
+            columns = _load(PlantedProduct.objects.all())
+            self.full_loads += 1
+        else:
+            since = current.high_water.astype(object).replace(tzinfo=dt_timezone.utc) - HIGH_WATER_OVERLAP
+            changed = _load(PlantedProduct.objects.filter(updated_at__gt=since))
+            columns = self._merge(current.columns, changed)
+            if len(columns['id']) != PlantedProduct.objects.count():
+                columns = _load(PlantedProduct.objects.all())
+                self.full_loads += 1
+            else:
+                self.incremental_loads += 1
+
+        self._snapshot = Snapshot(columns)
+        self.refreshed_at = time.time()
+
+    @staticmethod
+    def _merge(columns, changed):
+        if not len(changed['id']):
+            return columns
+        ids = columns['id']
+        positions = np.searchsorted(ids, changed['id'])
+        existing = positions < len(ids)
+        existing[existing] = ids[positions[existing]] == changed['id'][existing]
+
+        merged = {name: array.copy() for name, array in columns.items()}
+        for name in COLUMNS:
+            merged[name][positions[existing]] = changed[name][existing]
+            merged[name] = np.concatenate([merged[name], changed[name][~existing]])
+        order = np.argsort(merged['id'], kind='stable')
+        return {name: array[order] for name, array in merged.items()}
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "rows": len(snapshot) if snapshot else 0,
+            "memory_bytes": snapshot.nbytes if snapshot else 0,
+            "high_water": str(snapshot.high_water) if snapshot and snapshot.high_water is not None else None,
+            "refreshed_at": self.refreshed_at,
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+        }
+
+
+engine = ColumnarEngine()
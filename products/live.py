@@ -0,0 +1,248 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone, translation
+from django_redis import get_redis_connection
+from modeltranslation.utils import get_language
+from redis.exceptions import RedisError
+from common.cache import reference_names
+from products.models import Product, ProductionBucket, RegionProductStats
+from products.rollups import bucket_periods
+from regions.models import Region
+
+logger = logging.getLogger(__name__)
+
+# Live production totals kept in Redis next to the rollup tables, for the endpoints polled by the landing page.
+# Writes update them after commit with HINCRBYFLOAT/ZINCRBY; reconcile() rewrites them from Postgres periodically,
+# which also fixes float drift and any increment lost while Redis was unreachable.
+READY_KEY = "live:ready"
+DAILY_KEY = "live:daily"
+WINDOW_DAYS = 30
+WEIGHT_PRECISION = Decimal('0.001')
+GROUPS = {
+    'region': Region,
+    'product': Product,
+}
+
+# Add one planting's delta to a region or product. A member whose last planting went away leaves the ranking
+# altogether, like a zero rollup row, so a late decrement after a cascade cannot bring it back either.
+MOVE_SCRIPT = """
+local pk = ARGV[1]
+if redis.call('HINCRBY', KEYS[1], pk .. ':plantings', ARGV[4]) <= 0 then
+    redis.call('HDEL', KEYS[1], pk .. ':weight', pk .. ':area', pk .. ':plantings')
+    redis.call('ZREM', KEYS[2], pk)
+else
+    redis.call('HINCRBYFLOAT', KEYS[1], pk .. ':weight', ARGV[2])
+    redis.call('HINCRBYFLOAT', KEYS[1], pk .. ':area', ARGV[3])
+    redis.call('ZINCRBY', KEYS[2], ARGV[2], pk)
+end
+"""
+
+
+def totals_key(group):
+    """Hash of '<id>:weight', '<id>:area' and '<id>:plantings' per region or product"""
+    return f"live:totals:{group}"
+
+
+def ranking_key(group):
+    """Sorted set of region or product ids scored by total expecting weight"""
+    return f"live:ranking:{group}"
+
+
+def names_key(group, language):
+    return f"live:names:{group}:{language}"
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def _languages():
+    return [code for code, _ in settings.LANGUAGES]
+
+
+def _names(instance):
+    names = {}
+    for language in _languages():
+        with translation.override(language):
+            names[language] = instance.name
+    return names
+
+
+def apply_planting(old, new):
+    """Move one planted product write (rollup values before and after) into the live totals"""
+    conn = _redis()
+    move = conn.register_script(MOVE_SCRIPT)
+    pipe = conn.pipeline(transaction=True)
+    for values, sign in ((old, -1), (new, 1)):
+        if not values:
+            continue
+        weight = float(values['expecting_weight']) * sign
+        area = float(values['planting_area']) * sign
+        for group in GROUPS:
+            pk = values[f'{group}_id']
+            if pk is not None:
+                move(keys=[totals_key(group), ranking_key(group)], args=[pk, weight, area, sign], client=pipe)
+        if values['created_at']:
+            day = bucket_periods(values['created_at'])[ProductionBucket.DAY]
+            pipe.hincrbyfloat(DAILY_KEY, day.isoformat(), weight)
+    pipe.execute()
+
+
+def set_names(group, pk, names):
+    pipe = _redis().pipeline(transaction=True)
+    for language, name in names.items():
+        pipe.hset(names_key(group, language), pk, name)
+    pipe.execute()
+
+
+def forget(group, pk):
+    pipe = _redis().pipeline(transaction=True)
+    pipe.hdel(totals_key(group), f"{pk}:weight", f"{pk}:area", f"{pk}:plantings")
+    pipe.zrem(ranking_key(group), pk)
+    for language in _languages():
+        pipe.hdel(names_key(group, language), pk)
+    pipe.execute()
+
+
+def _after_commit(function, *args):
+    def run():
+        try:
+            function(*args)
+        except RedisError:
+            logger.warning("Live stats update failed; the next reconcile will repair it", exc_info=True)
+    transaction.on_commit(run)
+
+
+def record_planting(old, new):
+    if old != new:
+        _after_commit(apply_planting, old, new)
+
+
+def record_names(group, instance):
+    _after_commit(set_names, group, instance.pk, _names(instance))
+
+
+def record_delete(group, pk):
+    _after_commit(forget, group, pk)
+
+
+def _database_totals(group):
+    return RegionProductStats.objects.filter(planting_count__gt=0, **{f'{group}__isnull': False}).values(
+        f'{group}_id'
+    ).annotate(
+        weight=Sum('total_weight'),
+        area=Sum('total_area'),
+        plantings=Sum('planting_count'),
+    ).order_by()
+
+
+def _window_start():
+    return timezone.localdate() - timedelta(days=WINDOW_DAYS - 1)
+
+
+def reconcile():
+    """
+    Rewrite every live key from the rollup tables in one MULTI/EXEC and mark the store ready.
+    Returns how many ranking members and days had drifted from the database.
+    """
+    conn = _redis()
+    pipe = conn.pipeline(transaction=True)
+    drift = {}
+
+    for group, model in GROUPS.items():
+        scores = {int(pk): score for pk, score in conn.zrange(ranking_key(group), 0, -1, withscores=True)}
+        totals, ranking = {}, {}
+        for row in _database_totals(group):
+            pk = row[f'{group}_id']
+            totals.update({f"{pk}:weight": float(row['weight']), f"{pk}:area": float(row['area']),
+                           f"{pk}:plantings": row['plantings']})
+            ranking[pk] = float(row['weight'])
+        drift[group] = sum(abs(scores.pop(pk, 0.0) - weight) > 1e-6 * max(1.0, weight)
+                           for pk, weight in ranking.items()) + sum(1 for score in scores.values() if score)
+
+        pipe.delete(totals_key(group), ranking_key(group))
+        if totals:
+            pipe.hset(totals_key(group), mapping=totals)
+            pipe.zadd(ranking_key(group), ranking)
+
+        instances = list(model.objects.all())
+        for language in _languages():
+            pipe.delete(names_key(group, language))
+            with translation.override(language):
+                names = {instance.pk: instance.name for instance in instances}
+            if names:
+                pipe.hset(names_key(group, language), mapping=names)
+
+    daily = {
+        row['period_start'].isoformat(): float(row['weight'])
+        for row in ProductionBucket.objects.filter(
+            granularity=ProductionBucket.DAY, period_start__gte=_window_start()
+        ).values('period_start').annotate(weight=Sum('total_weight')).order_by()
+    }
+    cached = {day.decode(): float(weight) for day, weight in conn.hgetall(DAILY_KEY).items()}
+    drift['daily'] = sum(abs(cached.get(day, 0.0) - weight) > 1e-6 * max(1.0, weight)
+                         for day, weight in daily.items())
+    pipe.delete(DAILY_KEY)
+    if daily:
+        pipe.hset(DAILY_KEY, mapping=daily)
+    pipe.set(READY_KEY, timezone.now().isoformat())
+    pipe.execute()
+    return drift
+
+
+def _live_top(group, limit):
+    conn = _redis()
+    if not conn.exists(READY_KEY):
+        return None
+    ranking = conn.zrevrange(ranking_key(group), 0, limit - 1, withscores=True)
+    ids = [pk for pk, _ in ranking]
+    names = conn.hmget(names_key(group, get_language()), ids) if ids else []
+    return [
+        {"id": int(pk), group: name.decode() if name else None, "total_production": score}
+        for (pk, score), name in zip(ranking, names)
+    ]
+
+
+def _database_top(group, limit):
+    rows = RegionProductStats.objects.filter(planting_count__gt=0, **{f'{group}__isnull': False}).values(
+        f'{group}_id'
+    ).annotate(
+        total_production=Sum('total_weight')
+    ).order_by('-total_production')[:limit]
+    names = reference_names(GROUPS[group])
+    return [
+        {"id": row[f'{group}_id'], group: names.get(row[f'{group}_id']),
+         "total_production": float(row['total_production'])}
+        for row in rows
+    ]
+
+
+def top(group, limit):
+    """Top regions or products by total production: Redis when the store is ready, the rollup table otherwise"""
+    try:
+        rows = _live_top(group, limit)
+    except RedisError:
+        logger.warning("Live stats unavailable, reading the rollup table", exc_info=True)
+        rows = None
+    return _database_top(group, limit) if rows is None else rows
+
+
+def recent_production():
+    """Total expecting weight planted in the last WINDOW_DAYS days (including today), or None if nothing was"""
+    days = [(_window_start() + timedelta(days=offset)).isoformat() for offset in range(WINDOW_DAYS)]
+    try:
+        conn = _redis()
+        if conn.exists(READY_KEY):
+            # Rounded to the bucket precision, which also drops the float drift of HINCRBYFLOAT
+            weights = [Decimal(weight.decode()).quantize(WEIGHT_PRECISION)
+                       for weight in conn.hmget(DAILY_KEY, days) if weight is not None]
+            return sum(weights) if weights else None
+    except RedisError:
+        logger.warning("Live stats unavailable, reading the production buckets", exc_info=True)
+    return ProductionBucket.objects.filter(
+        granularity=ProductionBucket.DAY, period_start__gte=_window_start()
+    ).aggregate(total_weight=Sum('total_weight'))['total_weight']
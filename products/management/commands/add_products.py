@@ -1,54 +1,36 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from kombu.exceptions import OperationalError
+from common.cache import reference_cache
+from common.seeding import seed_catalog
+from products import live
 from products.models import Product
+from products.tasks import queue_translation_backfill
 
+FIXTURE = settings.BASE_DIR / 'products' / 'data' / 'products.json'
 
-class Command(BaseCommand):
-    help = 'Add 100 harvesting products to the database'
-
-    def handle(self, *args, **options):
-        products = [
-            # Fruits
-            "Apple", "Orange", "Banana", "Grape", "Strawberry", "Blueberry", "Raspberry", "Blackberry",
-            "Peach", "Pear", "Plum", "Cherry", "Apricot", "Mango", "Pineapple", "Watermelon",
-            "Cantaloupe", "Honeydew", "Kiwi", "Papaya", "Avocado", "Coconut", "Pomegranate", "Fig",
-            "Date", "Cranberry", "Gooseberry", "Elderberry", "Currant", "Lemon", "Lime", "Grapefruit",
-
-            # Vegetables
-            "Potato", "Tomato", "Carrot", "Onion", "Garlic", "Broccoli", "Cauliflower", "Cabbage",
-            "Lettuce", "Spinach", "Kale", "Cucumber", "Zucchini", "Squash", "Pumpkin", "Bell Pepper",
-            "Hot Pepper", "Eggplant", "Radish", "Turnip", "Beet", "Sweet Potato", "Corn", "Green Bean",
-            "Pea", "Lima Bean", "Okra", "Asparagus", "Artichoke", "Brussels Sprout", "Celery", "Parsnip",
-
-            # Grains & Cereals
-            "Wheat", "Rice", "Corn", "Barley", "Oats", "Rye", "Quinoa", "Buckwheat", "Millet", "Sorghum",
-
-            # Legumes
-            "Soybean", "Black Bean", "Kidney Bean", "Navy Bean", "Pinto Bean", "Chickpea", "Lentil", "Black-eyed Pea",
 
-            # Nuts & Seeds
-            "Almond", "Walnut", "Pecan", "Hazelnut", "Cashew", "Pistachio", "Macadamia", "Sunflower Seed",
-            "Pumpkin Seed", "Flax Seed", "Chia Seed", "Sesame Seed",
-
-            # Herbs & Spices
-            "Basil", "Oregano", "Thyme", "Rosemary", "Sage", "Parsley", "Cilantro", "Dill",
-            "Mint", "Chives", "Tarragon", "Lavender",
-
-            # Root Vegetables
-            "Ginger", "Turmeric", "Horseradish", "Rutabaga", "Jicama", "Yam",
-
-            # Specialty Crops
-            "Cotton", "Tobacco", "Sugar Beet", "Sugar Cane", "Tea Leaf", "Coffee Bean", "Vanilla Bean", "Hops"
-        ]
+class Command(BaseCommand):
+    help = 'Add the harvesting products listed in products/data/products.json to the database'
 
-        created_count = 0
-        for product_name in products:
-            product, created = Product.objects.get_or_create(name=product_name)
-            if created:
-                created_count += 1
-                self.stdout.write(f"Created: {product_name}")
-            else:
-                self.stdout.write(f"Already exists: {product_name}")
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Compare with the database even if this fixture version was applied already')
 
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully added {created_count} new products out of {len(products)} total products')
-        )
\ No newline at end of file
+    def handle(self, *args, **options):
+        created = seed_catalog('products', FIXTURE, Product, lambda row: Product(name=row['name']),
+                               force=options['force'])
+        if created is None:
+            self.stdout.write("Products are up to date")
+            return
+
+        # bulk_create sends no post_save signals: translate the new names in one background run
+        if created:
+            reference_cache.invalidate(Product)
+            for product in created:
+                live.record_names('product', product)
+            try:
+                queue_translation_backfill()
+            except OperationalError:
+                self.stdout.write(self.style.WARNING("Could not queue translations; run backfill_translations"))
+        self.stdout.write(self.style.SUCCESS(f"Successfully added {len(created)} new products"))
@@ -0,0 +1,31 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from products.rollups import rebuild_production_buckets
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily and monthly production buckets and reconcile them against planted products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild buckets from this date (YYYY-MM-DD) onwards')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report buckets that drifted from the raw data, without fixing them')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        report = rebuild_production_buckets(dry_run=options['check'], since=since)
+        drifted = report['created'] + report['updated'] + report['deleted']
+
+        prefix = "Would fix" if options['check'] else "Fixed"
+        summary = (f"{prefix} {drifted} buckets: {report['created']} missing, "
+                   f"{report['updated']} out of date, {report['deleted']} stale")
+        if drifted:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS("Production buckets are in sync with planted products"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from products.service import backfill_missing_names
+
+
+class Command(BaseCommand):
+    help = 'Fill every empty name_<lang> of the product catalog, from the translation memory or the translator'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products translated and saved together')
+        parser.add_argument('--concurrency', type=int, default=8, help='Translator calls in flight at once')
+        parser.add_argument('--rate', type=float, default=5.0,
+                            help='Translator calls started per second at most (0 for no limit)')
+
+    def handle(self, *args, **options):
+        updated, failed = backfill_missing_names(options['batch_size'], options['concurrency'], options['rate'],
+                                                 progress=self.stdout.write)
+        summary = f"Updated {updated} products, {failed} translations failed"
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
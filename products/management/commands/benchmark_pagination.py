@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User, RecentActivity, ActivityCount
+from accounts.pagination import RecentActivityCursorPagination
+from accounts.views import RecentActivities
+from products.models import PlantedProduct
+from products.pagination import PlantedProductCursorPagination
+from products.views import PlantedProductModelViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark page 1 against a deep page for OFFSET pagination and the keyset cursors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000, help='Planted products and activities to seed')
+        parser.add_argument('--page', type=int, default=1000, help='Deep page to compare with page 1')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        page, page_size = options['page'], options['page_size']
+        if options['rows'] < page * page_size:
+            self.stderr.write(f"--rows must be at least {page * page_size} to reach page {page}")
+            return
+
+        factory = APIRequestFactory()
+        list_planted = PlantedProductModelViewSet.as_view({'get': 'list'})
+        list_activities = RecentActivities.as_view()
+
+        try:
+            with transaction.atomic():
+                user = self.seed(options['rows'])
+                cases = [
+                    ("planted-products", PlantedProduct.objects.filter(owner=user), PlantedProductCursorPagination(),
+                     list_planted, '/api/products/planted-products/'),
+                    ("recent-activities", RecentActivity.objects.filter(user=user), RecentActivityCursorPagination(),
+                     list_activities, '/api/accounts/recent-activities/'),
+                ]
+
+                self.stdout.write(f"{'endpoint':<18} {'pagination':<8} {'page 1 ms':>10} {f'page {page} ms':>14}")
+                for name, queryset, paginator, view, url in cases:
+                    def offset(number):
+                        rows = Paginator(queryset.order_by(f'-{paginator.ordering_field}', '-id'), page_size)
+                        return rows.count, list(rows.page(number))
+
+                    # The cursor a client would hold after walking to the deep page
+                    last = queryset.order_by(f'-{paginator.ordering_field}', '-id')[(page - 1) * page_size - 1]
+                    cursor = paginator.encode_cursor(last)
+
+                    def keyset(params):
+                        request = factory.get(url, dict(params, page_size=page_size))
+                        force_authenticate(request, user=user)
+                        return view(request)
+
+                    timings = [
+                        self.measure(lambda: offset(1), options['repeat']),
+                        self.measure(lambda: offset(page), options['repeat']),
+                    ]
+                    self.stdout.write(f"{name:<18} {'offset':<8} {timings[0]:>10.2f} {timings[1]:>14.2f}")
+                    timings = [
+                        self.measure(lambda: keyset({}), options['repeat']),
+                        self.measure(lambda: keyset({'cursor': cursor}), options['repeat']),
+                    ]
+                    self.stdout.write(f"{name:<18} {'keyset':<8} {timings[0]:>10.2f} {timings[1]:>14.2f}")
+                # Never keep the benchmark rows
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        user = User.objects.create_user(email="pagination-benchmark@example.com", first_name="Benchmark")
+        now = timezone.now()
+        PlantedProduct.objects.bulk_create([
+            PlantedProduct(owner=user, planting_area=Decimal(1), expecting_weight=Decimal(i % 1000))
+            for i in range(rows)
+        ], batch_size=10_000)
+        RecentActivity.objects.bulk_create([
+            RecentActivity(user=user, action='CREATE', model_name='PlantedProduct', object_id=i,
+                           object_name=f"Benchmark planting {i}", timestamp=now - timedelta(seconds=i))
+            for i in range(rows)
+        ], batch_size=10_000)
+        ActivityCount.objects.create(user=user, count=rows)
+        # Fresh rows have no planner statistics yet; production tables are analyzed by autovacuum
+        with connection.cursor() as cursor:
+            for model in (PlantedProduct, RecentActivity):
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+        return user
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,65 @@
+import io
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from common.parsers import ORJSONParser, MessagePackParser
+from common.renderers import ORJSONRenderer, MessagePackRenderer
+from common.serializers import optimize_for_serializer
+from products.management.commands.benchmark_wph import Command as WPHBenchmark, Rollback
+from products.analytics import rollup_totals, with_names, wph_matrix
+from products.models import PlantedProduct, RegionProductStats
+from products.serializers import PlantedProductSerializerListAndRetrieve
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the stock JSON renderer/parser against orjson and MessagePack on real API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Planted products to seed for the matrix')
+        parser.add_argument('--list-size', type=int, default=1_000, help='Planted products in the list payload')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        formats = [
+            ("json (stdlib)", JSONRenderer(), JSONParser()),
+            ("json (orjson)", ORJSONRenderer(), ORJSONParser()),
+            ("msgpack", MessagePackRenderer(), MessagePackParser()),
+        ]
+        try:
+            with transaction.atomic():
+                WPHBenchmark().seed(options['rows'])
+                queryset = optimize_for_serializer(PlantedProduct.objects.order_by('-created_at', '-id'),
+                                                   PlantedProductSerializerListAndRetrieve)
+                payloads = [
+                    # What WPHMatrix returns, built directly so the analytics cache is neither read nor filled
+                    ("wph/matrix", {"matrix": wph_matrix(
+                        with_names(rollup_totals(RegionProductStats.objects.all(), 'region_id', 'product_id'))
+                    )}),
+                    ("planted-products", {"next": None, "results": PlantedProductSerializerListAndRetrieve(
+                        queryset[:options['list_size']], many=True
+                    ).data}),
+                ]
+                # Never keep the benchmark rows
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{'payload':<18} {'format':<15} {'render ms':>10} {'parse ms':>10} {'KiB':>9}")
+        for name, data in payloads:
+            for label, renderer, parser in formats:
+                body = renderer.render(data, renderer.media_type)
+                render_ms = self.measure(lambda: renderer.render(data, renderer.media_type), options['repeat'])
+                parse_ms = self.measure(lambda: parser.parse(io.BytesIO(body)), options['repeat'])
+                self.stdout.write(f"{name:<18} {label:<15} {render_ms:>10.2f} {parse_ms:>10.2f} "
+                                  f"{len(body) / 1024:>9.1f}")
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,132 @@
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from products.models import Product, PlantedProduct
+from products.rollups import rebuild_region_product_stats
+from products.views import WPHPerRegionPerProduct, WPHComparison, WPHMatrix
+from regions.models import Region
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_group(queryset, key):
+    """The per-row Python grouping the WPH views used before aggregating in SQL"""
+    data = defaultdict(lambda: {
+        'expecting_weight': Decimal('0'),
+        'planting_area': Decimal('0'),
+        'count': 0
+    })
+    for planted_product in queryset:
+        name = key(planted_product)
+        data[name]['expecting_weight'] += planted_product.expecting_weight
+        data[name]['planting_area'] += planted_product.planting_area
+        data[name]['count'] += 1
+
+    result = []
+    for name, totals in data.items():
+        wph = float(totals['expecting_weight'] / totals['planting_area']) if totals['planting_area'] > 0 else 0.0
+        result.append({"name": name, "wph": wph, "planted_records": totals['count']})
+    result.sort(key=lambda x: x['wph'], reverse=True)
+    return result
+
+
+def legacy_per_product():
+    queryset = PlantedProduct.objects.select_related('product', 'region')
+    return legacy_group(queryset, lambda p: p.product.name if p.product else "Unknown Product")
+
+
+def legacy_comparison():
+    queryset = PlantedProduct.objects.select_related('product', 'region')
+    return legacy_group(queryset, lambda p: p.region.name if p.region else "Unknown Region")
+
+
+def legacy_matrix():
+    queryset = PlantedProduct.objects.select_related('product', 'region')
+    return legacy_group(queryset, lambda p: (
+        p.region.name if p.region else "Unknown Region",
+        p.product.name if p.product else "Unknown Product",
+    ))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark response time and peak memory of the WPH views before and after SQL grouping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000],
+                            help='Numbers of planted products to benchmark with')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        cases = [
+            ("wph/region-product", legacy_per_product, WPHPerRegionPerProduct, '/wph/region-product/'),
+            ("wph/comparison", legacy_comparison, WPHComparison, '/wph/comparison/'),
+            ("wph/matrix", legacy_matrix, WPHMatrix, '/wph/matrix/'),
+        ]
+
+        self.stdout.write(f"{'rows':>9}  {'endpoint':<20} {'before ms':>10} {'after ms':>10} "
+                          f"{'before MiB':>11} {'after MiB':>10}")
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self.seed(size)
+                    for name, legacy, view_class, url in cases:
+                        def after():
+                            # Skip the analytics cache: it would serve every run but the first, and keep
+                            # responses built from the rolled-back rows
+                            return view_class.get.__wrapped__(view_class(), Request(factory.get(url)))
+
+                        before_ms, before_mib = self.measure(legacy, options['repeat'])
+                        after_ms, after_mib = self.measure(after, options['repeat'])
+                        self.stdout.write(f"{size:>9}  {name:<20} {before_ms:>10.1f} {after_ms:>10.1f} "
+                                          f"{before_mib:>11.2f} {after_mib:>10.2f}")
+                    # Never keep the benchmark rows
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, size):
+        regions = list(Region.objects.all()[:13]) or [
+            Region.objects.create(name=f"Benchmark Region {i}") for i in range(13)
+        ]
+        products = list(Product.objects.all()[:120]) or Product.objects.bulk_create(
+            [Product(name=f"Benchmark Product {i}") for i in range(120)]
+        )
+        rng = random.Random(size)
+        batch = []
+        for _ in range(size):
+            batch.append(PlantedProduct(
+                product=rng.choice(products),
+                region=rng.choice(regions),
+                planting_area=Decimal(rng.randint(100, 100_000)) / 1000,
+                expecting_weight=Decimal(rng.randint(1_000, 10_000_000)) / 1000,
+            ))
+            if len(batch) == 10_000:
+                PlantedProduct.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            PlantedProduct.objects.bulk_create(batch)
+        # bulk_create skips the signals that keep the rollups in sync
+        rebuild_region_product_stats()
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return min(timings), peak / (1024 * 1024)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from products.rollups import rebuild_region_product_stats, rebuild_wph_sketches
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the region x product WPH rollup and sketch tables and reconcile them against planted products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report rows that drifted from the raw data, without fixing them')
+
+    def handle(self, *args, **options):
+        report = rebuild_region_product_stats(dry_run=options['check'])
+        for key, count in rebuild_wph_sketches(dry_run=options['check']).items():
+            report[key] += count
+        drifted = report['created'] + report['updated'] + report['deleted']
+
+        prefix = "Would fix" if options['check'] else "Fixed"
+        summary = (f"{prefix} {drifted} rows: {report['created']} missing, "
+                   f"{report['updated']} out of date, {report['deleted']} stale")
+        if drifted:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS("Rollup tables are in sync with planted products"))
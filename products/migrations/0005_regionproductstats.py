@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_stats(apps, schema_editor):
+    PlantedProduct = apps.get_model('products', 'PlantedProduct')
+    RegionProductStats = apps.get_model('products', 'RegionProductStats')
+    rows = PlantedProduct.objects.values('region_id', 'product_id').annotate(
+        total_weight=Sum('expecting_weight'),
+        total_area=Sum('planting_area'),
+        planting_count=Count('id'),
+    ).order_by()
+    RegionProductStats.objects.bulk_create([RegionProductStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_name_en_product_name_ru_product_name_uz_and_more'),
+        ('regions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_weight', models.DecimalField(decimal_places=3, default=0, max_digits=20)),
+                ('total_area', models.DecimalField(decimal_places=3, default=0, max_digits=20)),
+                ('planting_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='region_stats', to='products.product')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='product_stats', to='regions.region')),
+            ],
+            options={
+                'db_table': 'Region Product Stats',
+                'constraints': [models.UniqueConstraint(fields=('region', 'product'), name='unique_region_product_stats', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def populate_buckets(apps, schema_editor):
+    PlantedProduct = apps.get_model('products', 'PlantedProduct')
+    ProductionBucket = apps.get_model('products', 'ProductionBucket')
+    truncations = {
+        'day': TruncDate('created_at'),
+        'month': TruncMonth('created_at', output_field=DateField()),
+    }
+    for granularity, truncation in truncations.items():
+        rows = PlantedProduct.objects.annotate(period_start=truncation).values(
+            'period_start', 'region_id', 'product_id'
+        ).annotate(
+            total_weight=Sum('expecting_weight'),
+            total_area=Sum('planting_area'),
+            planting_count=Count('id'),
+        ).order_by()
+        ProductionBucket.objects.bulk_create(
+            [ProductionBucket(granularity=granularity, **row) for row in rows], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_regionproductstats'),
+        ('regions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('total_weight', models.DecimalField(decimal_places=3, default=0, max_digits=20)),
+                ('total_area', models.DecimalField(decimal_places=3, default=0, max_digits=20)),
+                ('planting_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='production_buckets', to='products.product')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='production_buckets', to='regions.region')),
+            ],
+            options={
+                'db_table': 'Production Buckets',
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'period_start', 'region', 'product'), name='unique_production_bucket', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(populate_buckets, migrations.RunPython.noop),
+    ]
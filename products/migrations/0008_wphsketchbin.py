@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:48
+
+import math
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of products.sketches.wph_bin at the time of this migration
+GAMMA = 1.01 / 0.99
+ZERO_BIN = -(2 ** 31)
+
+
+def populate_sketch_bins(apps, schema_editor):
+    PlantedProduct = apps.get_model('products', 'PlantedProduct')
+    WPHSketchBin = apps.get_model('products', 'WPHSketchBin')
+    counts = {}
+    rows = PlantedProduct.objects.values_list('region_id', 'product_id', 'expecting_weight', 'planting_area')
+    for region_id, product_id, weight, area in rows.iterator(chunk_size=2000):
+        if area <= 0 or weight <= 0:
+            bin_index = ZERO_BIN
+        else:
+            bin_index = math.ceil(math.log(float(weight) / float(area)) / math.log(GAMMA))
+        key = (region_id, product_id, bin_index)
+        counts[key] = counts.get(key, 0) + 1
+    WPHSketchBin.objects.bulk_create([
+        WPHSketchBin(region_id=region_id, product_id=product_id, bin_index=bin_index, planting_count=count)
+        for (region_id, product_id, bin_index), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_plantedproduct_updated_at_index'),
+        ('regions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WPHSketchBin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bin_index', models.IntegerField()),
+                ('planting_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='wph_sketch_bins', to='products.product')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='wph_sketch_bins', to='regions.region')),
+            ],
+            options={
+                'db_table': 'WPH Sketch Bins',
+                'constraints': [models.UniqueConstraint(fields=('region', 'product', 'bin_index'), name='unique_wph_sketch_bin', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(populate_sketch_bins, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:51
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_wphsketchbin'),
+        ('regions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantedproduct',
+            name='wph',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(planting_area__gt=0, then=django.db.models.expressions.CombinedExpression(models.F('expecting_weight'), '/', models.F('planting_area'))), default=None), output_field=models.DecimalField(decimal_places=6, max_digits=24, null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='plantedproduct',
+            index=models.Index(fields=['-wph', 'id'], name='planted_wph_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantedproduct',
+            index=models.Index(fields=['region', '-wph', 'id'], name='planted_region_wph_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantedproduct',
+            index=models.Index(fields=['product', '-wph', 'id'], name='planted_product_wph_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_plantedproduct_wph'),
+        ('regions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plantedproduct',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='planted_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:11
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+INDEXES = {
+    'product_name_en_trgm_idx': 'name_en',
+    'product_name_uz_trgm_idx': 'name_uz',
+    'product_name_ru_trgm_idx': 'name_ru',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm ships with Postgres contrib, but not every server has contrib installed; without it the indexes
+    # are skipped and products.search falls back to matching near-misses in memory
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "Products" USING gin ("{column}" gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_plantedproduct_owner_created_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='product',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['name_en'], name='product_name_en_trgm_idx', opclasses=['gin_trgm_ops']),
+                ),
+                migrations.AddIndex(
+                    model_name='product',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['name_uz'], name='product_name_uz_trgm_idx', opclasses=['gin_trgm_ops']),
+                ),
+                migrations.AddIndex(
+                    model_name='product',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['name_ru'], name='product_name_ru_trgm_idx', opclasses=['gin_trgm_ops']),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source_language', models.CharField(max_length=10)),
+                ('target_language', models.CharField(max_length=10)),
+                ('source_text', models.CharField(max_length=255)),
+                ('translated_text', models.CharField(max_length=255)),
+            ],
+            options={
+                'db_table': 'Translation Memory',
+                'constraints': [models.UniqueConstraint(fields=('source_text', 'source_language', 'target_language'), name='unique_translation_memory')],
+            },
+        ),
+    ]
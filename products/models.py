@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from accounts.models import User
 from common.models import BaseModel
@@ -9,6 +10,12 @@ class Product(BaseModel):
 
     class Meta:
         db_table = "Products"
+        # Trigram indexes for near-miss search on every translation of the name (see products.search)
+        indexes = [
+            GinIndex(fields=['name_en'], opclasses=['gin_trgm_ops'], name='product_name_en_trgm_idx'),
+            GinIndex(fields=['name_uz'], opclasses=['gin_trgm_ops'], name='product_name_uz_trgm_idx'),
+            GinIndex(fields=['name_ru'], opclasses=['gin_trgm_ops'], name='product_name_ru_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -22,9 +29,114 @@ class PlantedProduct(BaseModel):
                                related_name='planted_products')
     planting_area = models.DecimalField(max_digits=15, decimal_places=3)
     expecting_weight = models.DecimalField(max_digits=15, decimal_places=3)
+    wph = models.GeneratedField(
+        expression=models.Case(
+            models.When(planting_area__gt=0, then=models.F('expecting_weight') / models.F('planting_area')),
+            default=None,
+        ),
+        output_field=models.DecimalField(max_digits=24, decimal_places=6, null=True),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = "Planted Products"
+        indexes = [
+            models.Index(fields=['updated_at'], name='planted_product_updated_idx'),
+            models.Index(fields=['-wph', 'id'], name='planted_wph_idx'),
+            models.Index(fields=['region', '-wph', 'id'], name='planted_region_wph_idx'),
+            models.Index(fields=['product', '-wph', 'id'], name='planted_product_wph_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='planted_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f"Product name: {self.product.name}, Product owner: {self.owner.first_name}, Region: {self.region.name}"
+
+
+class RegionProductStats(models.Model):
+    """Running totals of planted products per (region, product), kept in sync on every write"""
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='product_stats')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='region_stats')
+    total_weight = models.DecimalField(max_digits=20, decimal_places=3, default=0)
+    total_area = models.DecimalField(max_digits=20, decimal_places=3, default=0)
+    planting_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "Region Product Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'product'], name='unique_region_product_stats',
+                                    nulls_distinct=False),
+        ]
+
+    def __str__(self):
+        return f"Region: {self.region_id}, Product: {self.product_id}, Plantings: {self.planting_count}"
+
+
+class ProductionBucket(models.Model):
+    """Planted product totals per (region, product) for one day or one month, kept in sync on every write"""
+    DAY = 'day'
+    MONTH = 'month'
+    GRANULARITY_CHOICES = [
+        (DAY, 'Day'),
+        (MONTH, 'Month'),
+    ]
+
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='production_buckets')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='production_buckets')
+    total_weight = models.DecimalField(max_digits=20, decimal_places=3, default=0)
+    total_area = models.DecimalField(max_digits=20, decimal_places=3, default=0)
+    planting_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "Production Buckets"
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'period_start', 'region', 'product'],
+                                    name='unique_production_bucket', nulls_distinct=False),
+        ]
+
+    def __str__(self):
+        return f"{self.get_granularity_display()} {self.period_start}, Region: {self.region_id}, Product: {self.product_id}"
+
+
+class WPHSketchBin(models.Model):
+    """One log-scale bucket of the WPH distribution of a (region, product), see products.sketches"""
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='wph_sketch_bins')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='wph_sketch_bins')
+    bin_index = models.IntegerField()
+    planting_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "WPH Sketch Bins"
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'product', 'bin_index'], name='unique_wph_sketch_bin',
+                                    nulls_distinct=False),
+        ]
+
+    def __str__(self):
+        return f"Region: {self.region_id}, Product: {self.product_id}, Bin: {self.bin_index} ({self.planting_count})"
+
+
+class TranslationMemory(BaseModel):
+    """A translation already obtained from the translator, reused instead of asking again (see products.service)"""
+    source_language = models.CharField(max_length=10)
+    target_language = models.CharField(max_length=10)
+    # Whitespace-collapsed, case-folded source text
+    source_text = models.CharField(max_length=255)
+    translated_text = models.CharField(max_length=255)
+
+    class Meta:
+        db_table = "Translation Memory"
+        constraints = [
+            models.UniqueConstraint(fields=['source_text', 'source_language', 'target_language'],
+                                    name='unique_translation_memory'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_language}->{self.target_language}: {self.source_text} = {self.translated_text}"
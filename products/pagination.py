@@ -1,7 +1,11 @@
 from rest_framework.pagination import PageNumberPagination
+from common.pagination import KeysetPagination
 
 class ProductPageNumberPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
-    page_query_param = 'page'
\ No newline at end of file
+    page_query_param = 'page'
+
+class PlantedProductCursorPagination(KeysetPagination):
+    ordering_field = 'created_at'
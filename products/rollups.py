@@ -0,0 +1,153 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, DateField
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from products.analytics import grouped_totals
+from products.models import PlantedProduct, RegionProductStats, ProductionBucket, WPHSketchBin
+from products.sketches import wph_bin
+
+ROLLUP_FIELDS = ('region_id', 'product_id', 'planting_area', 'expecting_weight', 'created_at')
+TOTAL_FIELDS = ['total_weight', 'total_area', 'planting_count']
+
+
+def rollup_values(instance):
+    """The part of a planted product the rollups depend on"""
+    return {field: getattr(instance, field) for field in ROLLUP_FIELDS}
+
+
+def bucket_periods(created_at):
+    """Start of the day and month buckets a planting created at this moment belongs to"""
+    day = timezone.localtime(created_at).date()
+    return {ProductionBucket.DAY: day, ProductionBucket.MONTH: day.replace(day=1)}
+
+
+def _add(model, keys, changes, sign):
+    rows = model.objects.filter(**keys)
+    if rows.update(**changes) or sign < 0:
+        # Nothing to remove from a missing row; it was cascaded away with its region or product
+        return
+    model.objects.get_or_create(**keys)
+    rows.update(**changes)
+
+
+def apply_planting(values, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one planting from its (region, product) totals,
+    its day and month production buckets and its WPH sketch bin.
+    Uses F() expressions so concurrent writers never overwrite each other.
+    """
+    weight = Decimal(values['expecting_weight']) * sign
+    area = Decimal(values['planting_area']) * sign
+    changes = dict(
+        total_weight=F('total_weight') + weight,
+        total_area=F('total_area') + area,
+        planting_count=F('planting_count') + sign,
+    )
+    keys = dict(region_id=values['region_id'], product_id=values['product_id'])
+
+    _add(RegionProductStats, keys, changes, sign)
+    _add(WPHSketchBin, dict(keys, bin_index=wph_bin(values['expecting_weight'], values['planting_area'])),
+         dict(planting_count=F('planting_count') + sign), sign)
+    if values['created_at']:
+        for granularity, period_start in bucket_periods(values['created_at']).items():
+            _add(ProductionBucket, dict(keys, granularity=granularity, period_start=period_start), changes, sign)
+
+
+def move_planting(old, new):
+    """Apply a planted product write: old values out, new values in"""
+    if old == new:
+        return
+    with transaction.atomic():
+        if old:
+            apply_planting(old, -1)
+        if new:
+            apply_planting(new, 1)
+
+
+def _totals(row):
+    return {'total_weight': row['weight'], 'total_area': row['area'], 'planting_count': row['records']}
+
+
+def _reconcile(queryset, key_fields, fields, expected, dry_run, **defaults):
+    """
+    Make the rollup rows in queryset match the expected values of fields (a dict of dicts keyed by key_fields).
+    Returns the number of rows created, updated and deleted (or that would be, with dry_run).
+    """
+    existing = {tuple(getattr(row, field) for field in key_fields): row for row in queryset.select_for_update()}
+
+    to_create, to_update = [], []
+    for key, values in expected.items():
+        stats = existing.pop(key, None)
+        if stats is None:
+            stats = queryset.model(**dict(zip(key_fields, key)), **defaults)
+            to_create.append(stats)
+        elif all(getattr(stats, field) == value for field, value in values.items()):
+            continue
+        else:
+            to_update.append(stats)
+        for field, value in values.items():
+            setattr(stats, field, value)
+
+    # Rows left over have no plantings behind them any more; only non-empty ones count as drift
+    stale = [stats for stats in existing.values() if any(getattr(stats, field) for field in fields)]
+
+    if not dry_run:
+        queryset.model.objects.bulk_create(to_create, batch_size=1000)
+        queryset.model.objects.bulk_update(to_update, fields, batch_size=1000)
+        queryset.model.objects.filter(pk__in=[stats.pk for stats in existing.values()]).delete()
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(stale)}
+
+
+def rebuild_region_product_stats(dry_run=False):
+    """Recompute every (region, product) row from PlantedProduct and fix the ones that drifted"""
+    with transaction.atomic():
+        expected = {
+            (row['region_id'], row['product_id']): _totals(row)
+            for row in grouped_totals(PlantedProduct.objects.all(), 'region_id', 'product_id')
+        }
+        return _reconcile(RegionProductStats.objects.all(), ('region_id', 'product_id'), TOTAL_FIELDS, expected,
+                          dry_run)
+
+
+def rebuild_production_buckets(dry_run=False, since=None):
+    """
+    Recompute the day and month production buckets from PlantedProduct and fix the ones that drifted.
+    With since, only buckets from the start of that month onwards are touched.
+    """
+    planted = PlantedProduct.objects.all()
+    buckets = ProductionBucket.objects.all()
+    if since:
+        since = since.replace(day=1)
+        planted = planted.filter(created_at__date__gte=since)
+        buckets = buckets.filter(period_start__gte=since)
+
+    report = {'created': 0, 'updated': 0, 'deleted': 0}
+    truncations = {
+        ProductionBucket.DAY: TruncDate('created_at'),
+        ProductionBucket.MONTH: TruncMonth('created_at', output_field=DateField()),
+    }
+    with transaction.atomic():
+        for granularity, truncation in truncations.items():
+            rows = grouped_totals(planted.annotate(period=truncation), 'period', 'region_id', 'product_id')
+            expected = {(row['period'], row['region_id'], row['product_id']): _totals(row) for row in rows}
+            result = _reconcile(buckets.filter(granularity=granularity), ('period_start', 'region_id', 'product_id'),
+                                TOTAL_FIELDS, expected, dry_run, granularity=granularity)
+            for key, count in result.items():
+                report[key] += count
+    return report
+
+
+def rebuild_wph_sketches(dry_run=False):
+    """
+    Recount every WPH sketch bin from PlantedProduct and fix the ones that drifted.
+    Bins are computed in Python, exactly like on write, so both paths agree on bin boundaries.
+    """
+    with transaction.atomic():
+        expected = {}
+        rows = PlantedProduct.objects.values_list('region_id', 'product_id', 'expecting_weight', 'planting_area')
+        for region_id, product_id, weight, area in rows.iterator(chunk_size=2000):
+            key = (region_id, product_id, wph_bin(weight, area))
+            expected.setdefault(key, {'planting_count': 0})['planting_count'] += 1
+        return _reconcile(WPHSketchBin.objects.all(), ('region_id', 'product_id', 'bin_index'), ['planting_count'],
+                          expected, dry_run)
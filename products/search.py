@@ -0,0 +1,178 @@
+import difflib
+import unicodedata
+from bisect import bisect_left
+from functools import reduce
+from operator import or_
+from django.db import connection, transaction
+from django.db.models import Q
+from django.contrib.postgres.search import TrigramWordSimilarity
+from modeltranslation import settings as modeltranslation_settings
+from modeltranslation.utils import build_localized_fieldname, get_language
+from common.cache import reference_cache
+from products.models import Product
+
+# Product search for autocomplete. Prefixes of a name or of any word in it, in every language, are matched
+# from an in-process index built through the reference cache, so it is rebuilt whenever a product changes.
+# Near-misses ("cotten", "пшеница" typed as "пшениц") come from the pg_trgm GIN indexes on name_<lang>.
+PREFIX_SCORE = 1.0
+WORD_PREFIX_SCORE = 0.8
+EXACT_BONUS = 0.1
+LANGUAGE_BONUS = 0.25
+FUZZY_WEIGHT = 0.7
+MIN_FUZZY_LENGTH = 3
+# word_similarity() cut-off for a near-miss; pg_trgm's default of 0.6 already misses "cotten" for "cotton"
+WORD_SIMILARITY_THRESHOLD = 0.3
+
+
+def normalize(text):
+    """Case-folded, accent-free text with the Uzbek o‘/g‘ apostrophe variants unified"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    for apostrophe in "‘’ʻʼ`´":
+        text = text.replace(apostrophe, "'")
+    return ' '.join(text.casefold().split())
+
+
+def _languages():
+    return list(modeltranslation_settings.AVAILABLE_LANGUAGES)
+
+
+class ProductSearchIndex:
+    """Sorted suffixes of every product name starting at a word boundary, for bisect prefix lookups"""
+
+    def __init__(self, rows):
+        self.names = {}
+        self.entries = []
+        for row in rows:
+            names = {language: row[build_localized_fieldname('name', language)] for language in _languages()}
+            self.names[row['id']] = names
+            for language, name in names.items():
+                key = normalize(name)
+                if not key:
+                    continue
+                starts = [0] + [position + 1 for position, char in enumerate(key) if char == ' ']
+                for start in starts:
+                    self.entries.append((key[start:], row['id'], language, start == 0))
+        self.entries.sort()
+        self.keys = [entry[0] for entry in self.entries]
+        self.words = sorted({word for entry in self.entries for word in entry[0].split()})
+
+    def name(self, pk, language):
+        """Name in the language, falling back to the default language like modeltranslation"""
+        names = self.names[pk]
+        return names.get(language) or names.get(modeltranslation_settings.DEFAULT_LANGUAGE) or ''
+
+    def prefix(self, query, language):
+        """{product id: (score, matched language)} for names or words starting with the query"""
+        matches = {}
+        for position in range(bisect_left(self.keys, query), len(self.keys)):
+            key, pk, matched_language, whole_name = self.entries[position]
+            if not key.startswith(query):
+                break
+            score = PREFIX_SCORE if whole_name else WORD_PREFIX_SCORE
+            if key == query or key.split(' ', 1)[0] == query:
+                score += EXACT_BONUS
+            if matched_language == language:
+                score += LANGUAGE_BONUS
+            if score > matches.get(pk, (0, None))[0]:
+                matches[pk] = (score, matched_language)
+        return matches
+
+    def close_words(self, query, limit):
+        """Words of the index that are near-misses of the query, for databases without pg_trgm"""
+        return difflib.get_close_matches(query, self.words, n=limit, cutoff=0.75)
+
+
+def build_index():
+    fields = ['id'] + [build_localized_fieldname('name', language) for language in _languages()]
+    return ProductSearchIndex(Product.objects.values(*fields).order_by('id'))
+
+
+def search_index():
+    return reference_cache.get(Product, "search-index", build_index, localized=False)
+
+
+_trigram_available = None
+
+
+def trigram_available():
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+def _fuzzy_database(query, language, exclude, limit):
+    """Near-misses by trigram word similarity; the <% conditions are served by the GIN indexes"""
+    columns = {lang: build_localized_fieldname('name', lang) for lang in _languages()}
+    condition = reduce(or_, (Q(**{f"{column}__trigram_word_similar": query}) for column in columns.values()))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                           [str(WORD_SIMILARITY_THRESHOLD)])
+        rows = list(Product.objects.filter(condition).exclude(pk__in=exclude).annotate(**{
+            f"similarity_{lang}": TrigramWordSimilarity(query, column) for lang, column in columns.items()
+        }).values('id', *(f"similarity_{lang}" for lang in columns))[:limit * 3])
+
+    matches = {}
+    for row in rows:
+        for lang in columns:
+            similarity = row[f"similarity_{lang}"] or 0.0
+            if similarity < WORD_SIMILARITY_THRESHOLD:
+                continue
+            score = similarity * FUZZY_WEIGHT + (LANGUAGE_BONUS if lang == language else 0.0)
+            if score > matches.get(row['id'], (0, None))[0]:
+                matches[row['id']] = (score, lang)
+    return matches
+
+
+def _fuzzy_memory(index, query, language, exclude, limit):
+    matches = {}
+    for word in index.close_words(query, limit):
+        similarity = difflib.SequenceMatcher(None, query, word).ratio()
+        for pk, (_, lang) in index.prefix(word, language).items():
+            if pk in exclude:
+                continue
+            score = similarity * FUZZY_WEIGHT + (LANGUAGE_BONUS if lang == language else 0.0)
+            if score > matches.get(pk, (0, None))[0]:
+                matches[pk] = (score, lang)
+    return matches
+
+
+def search(query, limit, language=None):
+    """
+    Products matching the query in any language, best first: name prefixes, then word prefixes, then
+    near-misses, each ranked higher when the match is in the active language.
+    """
+    language = language or get_language()
+    query = normalize(query)
+    if not query:
+        # Every name starts with the empty string
+        return []
+    index = search_index()
+    matches = index.prefix(query, language)
+
+    if len(matches) < limit and len(query) >= MIN_FUZZY_LENGTH:
+        if trigram_available():
+            fuzzy = _fuzzy_database(query, language, set(matches), limit)
+        else:
+            fuzzy = _fuzzy_memory(index, query, language, set(matches), limit)
+        matches.update(fuzzy)
+
+    # A product created after the index was built is left out until the index is rebuilt
+    ranked = sorted(
+        ((pk, match) for pk, match in matches.items() if pk in index.names),
+        key=lambda item: (-item[1][0], index.name(item[0], language), item[0])
+    )
+    return [
+        {
+            "id": pk,
+            "name": index.name(pk, language),
+            "matched": index.names[pk][matched_language],
+            "matched_language": matched_language,
+            "score": round(score, 3),
+        }
+        for pk, (score, matched_language) in ranked[:limit]
+    ]
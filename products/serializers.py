@@ -1,4 +1,9 @@
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, NullIf
+from modeltranslation import settings as modeltranslation_settings
+from modeltranslation.utils import build_localized_fieldname, get_language
 from rest_framework import serializers
+from common.serializers import ValuesSerializer
 from products.models import Product, PlantedProduct
 
 
@@ -39,3 +44,29 @@ class PlantedProductSerializerListAndRetrieve(serializers.ModelSerializer):
         }
 
 
+class PlantedProductLiteSerializer(ValuesSerializer):
+    """Same output as PlantedProductSerializerListAndRetrieve, built straight from values() rows"""
+
+    @classmethod
+    def get_fields(cls):
+        # The translated product name, falling back to the default language like modeltranslation does
+        name = Coalesce(
+            NullIf(F(build_localized_fieldname('product__name', get_language())), Value('')),
+            F(build_localized_fieldname('product__name', modeltranslation_settings.DEFAULT_LANGUAGE)),
+            output_field=CharField(),
+        )
+        return {
+            "id": "id",
+            "product": {
+                "id": "product__id",
+                "name": name,
+                "created_at": "product__created_at",
+                "updated_at": "product__updated_at",
+            },
+            "owner": "owner_id",
+            "region": "region_id",
+            "planting_area": "planting_area",
+            "expecting_weight": "expecting_weight",
+            "created_at": "created_at",
+            "updated_at": "updated_at",
+        }
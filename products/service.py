@@ -1,52 +1,306 @@
 import asyncio
+import logging
+import threading
+from functools import lru_cache, reduce
+from operator import or_
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from googletrans import Translator
+from common.cache import reference_cache
+from products import live
+from products.cache import bump_version
+from products.models import Product, TranslationMemory
 
-async def async_translate(text: str, dest: str) -> str:
-    translator = Translator()
-    result = await translator.translate(text, dest=dest)
-    return result.text
-
-def translate_product_name(product):
-    """
-    Auto-translate Product.name_<lang> fields based on whichever one the user provided.
-    - If user supplied name_en, translate to ru & uz.
-    - Else if name_ru supplied, translate to en & uz.
-    - Else if name_uz supplied, translate to en & ru.
-    - Skip if none provided.
-    """
-    # Map of our fields
-    langs = ['en', 'ru', 'uz']
-
-    # 1️⃣ Find the first language the user actually entered
-    source_lang = None
-    for lang in langs:
-        val = getattr(product, f'name_{lang}', None)
-        if val and val.strip():
-            source_lang = lang
-            source_text = val.strip()
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ['en', 'ru', 'uz']
+BREAKER_FAILURES_KEY = "translation:breaker:failures"
+BREAKER_OPEN_KEY = "translation:breaker:open"
+
+
+class TranslationUnavailable(Exception):
+    """Translation failed or was skipped; retry_after says when trying again makes sense"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GoogleTranslator:
+    """googletrans client shared by every translation of the worker process"""
+
+    def __init__(self):
+        self.client = Translator(timeout=settings.TRANSLATION_TIMEOUT)
+
+    async def translate(self, text, source, dest):
+        result = await self.client.translate(text, src=source, dest=dest)
+        return result.text
+
+
+class StubTranslator:
+    """Offline translator for tests and local development: tags the text with the target language"""
+
+    async def translate(self, text, source, dest):
+        return f"{text} [{dest}]"
+
+
+class CircuitBreaker:
+    """
+    Shared by all workers through the cache: after `threshold` failures within `window` seconds calls are
+    refused for `cooldown` seconds, then let through again; a success resets the failure count.
+    """
+
+    def __init__(self, threshold, window, cooldown):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+
+    def is_open(self):
+        return cache.get(BREAKER_OPEN_KEY) is not None
+
+    def record_success(self):
+        cache.delete(BREAKER_FAILURES_KEY)
+
+    def record_failure(self):
+        cache.add(BREAKER_FAILURES_KEY, 0, timeout=self.window)
+        if cache.incr(BREAKER_FAILURES_KEY) >= self.threshold:
+            cache.set(BREAKER_OPEN_KEY, 1, timeout=self.cooldown)
+            cache.delete(BREAKER_FAILURES_KEY)
+            logger.warning("Translation circuit opened for %s seconds", self.cooldown)
+
+
+def breaker():
+    return CircuitBreaker(settings.TRANSLATION_BREAKER_THRESHOLD, settings.TRANSLATION_BREAKER_WINDOW,
+                          settings.TRANSLATION_BREAKER_COOLDOWN)
+
+
+# One event loop per process, running in its own thread, so the translator's HTTP connections are created
+# once and reused by every task instead of being torn down with a fresh asyncio.run() loop each time
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="translation-loop", daemon=True).start()
+        return _loop
+
+
+@lru_cache
+def _translator(path):
+    return import_string(path)()
+
+
+def _run(coroutine_function, *args):
+    """Run an async function on the shared loop, creating the translator there so its client binds to it"""
+    async def call():
+        return await coroutine_function(_translator(settings.PRODUCT_TRANSLATOR), *args)
+    return asyncio.run_coroutine_threadsafe(call(), _event_loop()).result()
+
+
+class RateLimiter:
+    """Spaces calls at least 1/per_second apart; no limit when per_second is falsy"""
+
+    def __init__(self, per_second=None):
+        self.interval = 1 / per_second if per_second else 0
+        self.next_at = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        at = max(now, self.next_at)
+        self.next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+async def _translate_jobs(translator, jobs, concurrency, per_second):
+    """{(source, text, dest): translation or exception}, at most `concurrency` calls in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(per_second)
+
+    async def one(source, text, dest):
+        async with semaphore:
+            await limiter.wait()
+            return await asyncio.wait_for(translator.translate(text, source, dest), settings.TRANSLATION_TIMEOUT)
+    results = await asyncio.gather(*(one(*job) for job in jobs), return_exceptions=True)
+    return dict(zip(jobs, results))
+
+
+def memory_text(text):
+    """Translation memory key of a source text"""
+    return ' '.join(text.split()).casefold()
+
+
+def recall(jobs, chunk_size=1000):
+    """{(source, text, dest): translation} for the jobs the translation memory already answers"""
+    wanted = {(source, memory_text(text), dest): (source, text, dest) for source, text, dest in jobs}
+    texts = sorted({text for _, text, _ in wanted})
+    found = {}
+    for offset in range(0, len(texts), chunk_size):
+        rows = TranslationMemory.objects.filter(source_text__in=texts[offset:offset + chunk_size]).values_list(
+            'source_language', 'source_text', 'target_language', 'translated_text'
+        )
+        for source, text, dest, translated in rows:
+            job = wanted.get((source, text, dest))
+            if job is not None:
+                found[job] = translated
+    return found
+
+
+def remember(translations):
+    TranslationMemory.objects.bulk_create([
+        TranslationMemory(source_language=source, source_text=memory_text(text), target_language=dest,
+                          translated_text=translated)
+        for (source, text, dest), translated in translations.items()
+    ], ignore_conflicts=True)
+
+
+def translate_jobs(jobs, concurrency=None, per_second=None):
+    """
+    Translate (source language, text, target language) jobs: from the translation memory where possible,
+    the rest concurrently through the translator, whose answers are remembered.
+    Returns {job: translation or exception}; while the circuit is open the translator is not called and its
+    jobs map to TranslationUnavailable.
+    """
+    jobs = list(dict.fromkeys(jobs))
+    results = dict(recall(jobs))
+    pending = [job for job in jobs if job not in results]
+    if not pending:
+        return results
+
+    circuit = breaker()
+    if circuit.is_open():
+        unavailable = TranslationUnavailable("Translation circuit is open", retry_after=circuit.cooldown)
+        results.update(dict.fromkeys(pending, unavailable))
+        return results
+
+    fetched = _run(_translate_jobs, pending, concurrency or len(pending), per_second)
+    translated = {job: text for job, text in fetched.items() if isinstance(text, str) and text.strip()}
+    remember(translated)
+    for job, result in fetched.items():
+        if job not in translated:
+            logger.warning("Could not translate %r from %s to %s: %r", job[1], job[0], job[2], result)
+    if len(translated) < len(pending):
+        circuit.record_failure()
+    else:
+        circuit.record_success()
+    results.update(fetched)
+    return results
+
+
+def missing_translations(product):
+    """(source language, source text, languages still without a name), or None when nothing is to be done"""
+    source_lang = source_text = None
+    for lang in LANGUAGES:
+        value = getattr(product, f'name_{lang}', None)
+        if value and value.strip():
+            source_lang, source_text = lang, value.strip()
             break
+    if source_lang is None:
+        return None
+
+    targets = [lang for lang in LANGUAGES
+               if lang != source_lang and not (getattr(product, f'name_{lang}', None) or '').strip()]
+    return (source_lang, source_text, targets) if targets else None
+
+
+def apply_translations(product, translations):
+    """Set the still-empty name_<lang> fields a translation is available for; returns the fields set"""
+    fields = []
+    for lang, text in translations.items():
+        field = f'name_{lang}'
+        if isinstance(text, str) and text.strip() and not (getattr(product, field, None) or '').strip():
+            setattr(product, field, text)
+            fields.append(field)
+    return fields
 
-    # Nothing to translate
-    if not source_lang:
+
+def translate_product_name(product_id):
+    """
+    Fill the empty name_<lang> fields of a product from the first language that has a name.
+    Raises TranslationUnavailable when some language could not be translated; languages that were
+    translated are saved either way.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    work = product and missing_translations(product)
+    if not work:
         return
+    source_lang, source_text, targets = work
+
+    results = translate_jobs([(source_lang, source_text, lang) for lang in targets])
+    translations = {lang: results[source_lang, source_text, lang] for lang in targets}
+
+    with transaction.atomic():
+        product = Product.objects.select_for_update().filter(pk=product_id).first()
+        # Someone may have filled a name by hand while we were translating
+        fields = apply_translations(product, translations) if product is not None else []
+        if fields:
+            product.save(update_fields=fields + ['updated_at'])
+
+    failed = {lang: result for lang, result in translations.items()
+              if not (isinstance(result, str) and result.strip())}
+    if failed:
+        retry_after = max(getattr(result, 'retry_after', settings.TRANSLATION_RETRY_DELAY)
+                          for result in failed.values())
+        raise TranslationUnavailable(f"Could not translate to {', '.join(failed)}", retry_after=retry_after)
+
+
+def backfill_missing_names(batch_size=500, concurrency=8, per_second=None, progress=None):
+    """
+    Fill every empty name_<lang> of the catalog, batch by batch, saving each batch with bulk_update.
+    Stops early when the translation circuit opens. Returns (products updated, translations failed).
+    """
+    untranslated = reduce(or_, (Q(**{f'name_{lang}': ''}) | Q(**{f'name_{lang}__isnull': True})
+                                for lang in LANGUAGES))
+    fields = [f'name_{lang}' for lang in LANGUAGES]
+    last_pk, updated, failed = 0, 0, 0
+
+    while True:
+        batch = list(Product.objects.filter(untranslated, pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        work = {product.pk: missing_translations(product) for product in batch}
+        jobs = [(source, text, lang) for source, text, targets in filter(None, work.values()) for lang in targets]
+        results = translate_jobs(jobs, concurrency, per_second)
+
+        changed = []
+        now = timezone.now()
+        for product in batch:
+            if not work[product.pk]:
+                continue
+            source, text, targets = work[product.pk]
+            translations = {lang: results[source, text, lang] for lang in targets}
+            failed += sum(not isinstance(result, str) for result in translations.values())
+            if apply_translations(product, translations):
+                product.updated_at = now
+                changed.append(product)
+
+        Product.objects.bulk_update(changed, fields + ['updated_at'])
+        updated += len(changed)
+        # bulk_update sends no signals: refresh what the post_save handlers would have
+        for product in changed:
+            live.record_names('product', product)
+        if progress:
+            progress(f"Translated {len(changed)} products up to id {last_pk}")
+
+        if any(isinstance(result, TranslationUnavailable) for result in results.values()):
+            if progress:
+                progress("Translation circuit is open; stopping early")
+            break
 
-    # 2️⃣ Translate into any missing languages
-    updated_fields = []
-    for target_lang in langs:
-        if target_lang == source_lang:
-            continue
-        target_field = f'name_{target_lang}'
-        current = getattr(product, target_field, None) or ''
-        if not current.strip():
-            try:
-                translated = asyncio.run(
-                    async_translate(source_text, dest=target_lang)
-                )
-                setattr(product, target_field, translated)
-                updated_fields.append(target_field)
-            except Exception as e:
-                print(f"[Translation Error] could not fill {target_field}: {e}")
-
-    # 3️⃣ Persist only the newly filled fields
-    if updated_fields:
-        product.save(update_fields=updated_fields)
+    if updated:
+        reference_cache.invalidate(Product)
+        bump_version()
+    return updated, failed
@@ -1,9 +1,100 @@
-from django.db.models.signals import post_save
+import logging
+from functools import partial
+from kombu.exceptions import OperationalError
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from products.models import Product
-from products.service import translate_product_name
+from common.cache import reference_cache
+from products import live
+from products.cache import bump_version
+from products.models import Product, PlantedProduct
+from products.rollups import ROLLUP_FIELDS, rollup_values, move_planting
+from products.service import missing_translations
+from products.tasks import queue_product_translation
+from regions.models import Region
+
+logger = logging.getLogger(__name__)
+
+
+def queue_translation(product_id):
+    # The product is already committed; a broker outage must not turn its create into an error
+    try:
+        queue_product_translation(product_id)
+    except OperationalError:
+        logger.warning("Could not queue the translation of product %s", product_id, exc_info=True)
+
+
+@receiver(post_save, sender=Product)
+def auto_translate_name(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and missing_translations(instance):
+        transaction.on_commit(partial(queue_translation, instance.pk))
+
+
+@receiver(pre_save, sender=PlantedProduct)
+def remember_rollup_values(sender, instance, raw=False, **kwargs):
+    """Keep the values stored before this save so the rollups can move them"""
+    instance._rollup_old = None
+    if raw or instance.pk is None:
+        return
+    queryset = PlantedProduct.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        queryset = queryset.select_for_update()
+    instance._rollup_old = queryset.values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=PlantedProduct)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    move_planting(getattr(instance, '_rollup_old', None), rollup_values(instance))
+
+
+@receiver(post_delete, sender=PlantedProduct)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    move_planting(rollup_values(instance), None)
+
+
+@receiver(post_save, sender=PlantedProduct)
+def update_live_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    live.record_planting(getattr(instance, '_rollup_old', None), rollup_values(instance))
+
+
+@receiver(post_delete, sender=PlantedProduct)
+def update_live_stats_on_delete(sender, instance, **kwargs):
+    live.record_planting(rollup_values(instance), None)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Region)
+def update_live_names(sender, instance, raw=False, **kwargs):
+    if not raw:
+        live.record_names(sender._meta.model_name, instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Region)
+def remove_live_stats(sender, instance, **kwargs):
+    live.record_delete(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=PlantedProduct)
+@receiver(post_delete, sender=PlantedProduct)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_analytics_cache(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+reference_cache.register(Product, Region)
+
 
 @receiver(post_save, sender=Product)
-def auto_translate_name(sender, instance, created, **kwargs):
-    if created:
-        translate_product_name(instance)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_reference_cache(sender, **kwargs):
+    reference_cache.invalidate_on_commit(sender)
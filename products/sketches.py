@@ -0,0 +1,85 @@
+import math
+
+# DDSketch-style log buckets: every WPH value lands in the bin (GAMMA**(i-1), GAMMA**i], so any quantile read from
+# the bins is within RELATIVE_ACCURACY of the true value. Bins are plain counters, which makes sketches mergeable
+# (add the counts) and lets deletes be exact (subtract them).
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+# Plantings with no area or no weight have a WPH of 0, which has no log bucket
+ZERO_BIN = -(2 ** 31)
+
+
+def wph_bin(expecting_weight, planting_area):
+    if planting_area <= 0 or expecting_weight <= 0:
+        return ZERO_BIN
+    return math.ceil(math.log(float(expecting_weight) / float(planting_area)) / LOG_GAMMA)
+
+
+def bin_value(index):
+    """Representative WPH of a bin, chosen to minimise the relative error"""
+    if index == ZERO_BIN:
+        return 0.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def bin_bounds(index):
+    if index == ZERO_BIN:
+        return 0.0, 0.0
+    return GAMMA ** (index - 1), GAMMA ** index
+
+
+def quantile(bins, q):
+    """q-quantile of a sketch given as (bin_index, count) pairs sorted by bin_index"""
+    total = sum(count for _, count in bins)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for index, count in bins:
+        seen += count
+        if seen > rank:
+            return bin_value(index)
+    return bin_value(bins[-1][0])
+
+
+def histogram(bins, buckets):
+    """
+    Coarsen the sketch into at most `buckets` buckets of consecutive bins, plus one bucket for WPH 0 if any.
+    """
+    result = []
+    zero = sum(count for index, count in bins if index == ZERO_BIN)
+    if zero:
+        result.append({"lower": 0.0, "upper": 0.0, "count": zero})
+
+    bins = [(index, count) for index, count in bins if index != ZERO_BIN]
+    if not bins:
+        return result
+
+    low, high = bins[0][0], bins[-1][0]
+    width = math.ceil((high - low + 1) / buckets)
+    counts = {}
+    for index, count in bins:
+        start = low + (index - low) // width * width
+        counts[start] = counts.get(start, 0) + count
+
+    for start, count in sorted(counts.items()):
+        result.append({
+            "lower": bin_bounds(start)[0],
+            "upper": bin_bounds(start + width - 1)[1],
+            "count": count
+        })
+    return result
+
+
+def summarize(bins, buckets):
+    bins = sorted(bins)
+    return {
+        "count": sum(count for _, count in bins),
+        "min": bin_value(bins[0][0]) if bins else None,
+        "median": quantile(bins, 0.5),
+        "p90": quantile(bins, 0.9),
+        "p99": quantile(bins, 0.99),
+        "max": bin_value(bins[-1][0]) if bins else None,
+        "histogram": histogram(bins, buckets),
+    }
@@ -0,0 +1,45 @@
+import logging
+from celery import shared_task
+from products import live
+from products.service import TranslationUnavailable, backfill_missing_names, translate_product_name
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def reconcile_live_stats():
+    """Rewrite the live Redis production totals from the rollup tables"""
+    drift = live.reconcile()
+    if any(drift.values()):
+        logger.warning("Live stats drifted from the database and were corrected: %s", drift)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=5)
+def translate_product_name_task(self, product_id):
+    """Fill the missing translations of a product's name, retrying while the translator is unavailable"""
+    try:
+        translate_product_name(product_id)
+    except TranslationUnavailable as exc:
+        raise self.retry(exc=exc, countdown=exc.retry_after * (2 ** self.request.retries))
+
+
+@shared_task(ignore_result=True)
+def backfill_translations_task():
+    """Translate every product that still misses a name, at the backfill command's default pace"""
+    updated, failed = backfill_missing_names(per_second=5.0)
+    if failed:
+        logger.warning("Backfilled %s product names, %s translations failed", updated, failed)
+
+
+def queue_product_translation(product_id):
+    """
+    Queue translate_product_name_task
+    """
+    return translate_product_name_task.delay(product_id)
+
+
+def queue_translation_backfill():
+    """
+    Queue backfill_translations_task
+    """
+    return backfill_translations_task.delay()
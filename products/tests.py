@@ -1,3 +1,813 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone, translation
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient
+from accounts import roles
+from accounts.models import User
+from products import live, views
+from products.analytics import rollup_totals, wph_leaderboard, UNKNOWN_PRODUCT, UNKNOWN_REGION
+from common.cache import reference_cache
+from products.cache import bump_version, cache_stats, get_version
+from products.engine import ColumnarEngine
+from products.models import Product, PlantedProduct, ProductionBucket, RegionProductStats, TranslationMemory, \
+    WPHSketchBin
+from products.rollups import rebuild_production_buckets, rebuild_wph_sketches
+from products.search import search
+from products.service import BREAKER_FAILURES_KEY, BREAKER_OPEN_KEY, TranslationUnavailable, translate_product_name
+from products.signals import queue_translation
+from regions.models import Region
 
-# Create your tests here.
+
+class WPHLeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.other_region = Region.objects.create(name="Samarkand")
+        cls.product = Product.objects.create(name="Cotton")
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret", first_name="Ali",
+                                             last_name="Valiyev")
+        PlantedProduct.objects.bulk_create([
+            PlantedProduct(product=cls.product, owner=cls.owner, region=cls.region if i % 2 else cls.other_region,
+                           planting_area=Decimal(i % 50 + 1), expecting_weight=Decimal(i * 7 % 1000))
+            for i in range(2000)
+        ] + [PlantedProduct(product=cls.product, owner=cls.owner, region=cls.region,
+                            planting_area=Decimal(0), expecting_weight=Decimal(10))])
+
+    def setUp(self):
+        # Analytics responses are cached in Redis, which outlives the test database
+        bump_version()
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def test_top_plantings_are_sorted_by_stored_wph(self):
+        response = self.client.get("/api/products/wph/top/", {"region_id": self.region.pk, "limit": 5})
+        self.assertEqual(response.status_code, 200)
+
+        expected = sorted(
+            (planted.expecting_weight / planted.planting_area, -planted.pk)
+            for planted in PlantedProduct.objects.filter(region=self.region, planting_area__gt=0)
+        )[::-1][:5]
+        self.assertEqual([row["id"] for row in response.data["leaderboard"]], [-pk for _, pk in expected])
+        self.assertEqual(response.data["leaderboard"][0]["owner"], "Ali Valiyev")
+        self.assertEqual(response.data["leaderboard"][0]["region"], "Tashkent")
+
+    def test_zero_area_plantings_have_no_wph(self):
+        self.assertEqual(PlantedProduct.objects.filter(wph__isnull=True).count(), 1)
+
+    def test_limit_is_validated(self):
+        self.assertEqual(self.client.get("/api/products/wph/top/", {"limit": 1000}).status_code, 400)
+
+    def test_filters_are_validated(self):
+        for params in ({"region_id": "abc"}, {"product_id": "abc"}, {"region_id": 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/products/wph/top/", params).status_code, 404)
+
+    def test_leaderboard_is_one_query(self):
+        with self.assertNumQueries(1):
+            list(wph_leaderboard(PlantedProduct.objects.filter(product=self.product))[:10])
+
+    def test_leaderboard_reads_the_wph_indexes(self):
+        # The test table is tiny, so make sequential scans look expensive instead of relying on statistics;
+        # if no index can serve the ordering the planner still falls back to a scan and a sort.
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE \"Planted Products\"")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        querysets = {
+            "planted_wph_idx": PlantedProduct.objects.all(),
+            "planted_region_wph_idx": PlantedProduct.objects.filter(region=self.region),
+            "planted_product_wph_idx": PlantedProduct.objects.filter(product=self.product),
+        }
+        for index, queryset in querysets.items():
+            with self.subTest(index=index):
+                plan = wph_leaderboard(queryset)[:10].explain()
+                self.assertIn(index, plan)
+                self.assertNotIn("Seq Scan on \"Planted Products\"", plan)
+                self.assertNotIn("Sort", plan)
+
+
+def baseline_wph(plantings, name_of):
+    """WPH per name computed the way the views did before the rollups: one pass over the plantings"""
+    totals = {}
+    for planted in plantings:
+        bucket = totals.setdefault(name_of(planted), [0, 0, 0])
+        bucket[0] += planted.expecting_weight
+        bucket[1] += planted.planting_area
+        bucket[2] += 1
+    result = [(name, float(weight / area) if area > 0 else 0.0, records)
+              for name, (weight, area, records) in totals.items()]
+    result.sort(key=lambda x: x[1], reverse=True)
+    return result
+
+
+def product_name(planted):
+    return planted.product.name if planted.product else UNKNOWN_PRODUCT
+
+
+def region_name(planted):
+    return planted.region.name if planted.region else UNKNOWN_REGION
+
+
+class TranslatedWPHTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.regions = [Region.objects.create(name="Tashkent"), Region.objects.create(name="Samarkand")]
+        cls.products = [Product.objects.create(name_en="Wheat", name_ru="Пшеница"),
+                        Product.objects.create(name_en="Cotton", name_ru="Хлопок"),
+                        Product.objects.create(name_en="Barley")]
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        for i in range(12):
+            PlantedProduct.objects.create(
+                product=cls.products[i % 3] if i % 5 else None, region=cls.regions[i % 2] if i % 7 else None,
+                owner=owner, planting_area=Decimal(i % 4 + 1), expecting_weight=Decimal(i * 13 + 5)
+            )
+
+    def setUp(self):
+        bump_version()
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def get(self, path, language):
+        response = self.client.get(path, HTTP_ACCEPT_LANGUAGE=language)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_grouped_views_match_per_planting_names(self):
+        for language in ("en", "ru"):
+            with self.subTest(language=language), translation.override(language):
+                plantings = list(PlantedProduct.objects.select_related('product', 'region').order_by('id'))
+                per_product = self.get("/api/products/wph/region-product/", language)["products"]
+                self.assertEqual([(row["product_name"], row["wph"], row["planted_records"]) for row in per_product],
+                                 baseline_wph(plantings, product_name))
+                per_region = self.get("/api/products/wph/comparison/", language)["regions"]
+                self.assertEqual([(row["region_name"], row["wph"], row["planted_records"]) for row in per_region],
+                                 baseline_wph(plantings, region_name))
+
+                matrix = self.get("/api/products/wph/matrix/", language)["matrix"]
+                expected = {}
+                for planted in plantings:
+                    expected.setdefault(region_name(planted), []).append(planted)
+                self.assertEqual(
+                    {row["region_name"]: [(p["product_name"], p["wph"], p["planted_records"]) for p in row["products"]]
+                     for row in matrix},
+                    {name: baseline_wph(rows, product_name) for name, rows in expected.items()}
+                )
+                self.assertEqual(self.get("/api/products/dashboard/?sections=wph_matrix", language)["wph_matrix"],
+                                 matrix)
+
+        self.assertIn("Пшеница", [row["product_name"] for row in per_product])
+
+    def test_engine_names_follow_the_request_language(self):
+        for language in ("en", "ru", "en"):
+            with self.subTest(language=language):
+                names = [
+                    [(row["region_name"], [p["product_name"] for p in row["products"]])
+                     for row in self.get(f"/api/products/wph/matrix/?engine={engine}", language)["matrix"]]
+                    for engine in ("sql", "numpy")
+                ]
+                self.assertEqual(names[1], names[0])
+
+
+class ColumnarEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.regions = [Region.objects.create(name="Tashkent"), Region.objects.create(name="Samarkand")]
+        cls.product = Product.objects.create(name="Cotton")
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        cls.old, cls.recent = [
+            PlantedProduct.objects.create(region=region, product=cls.product, owner=cls.owner,
+                                          planting_area=Decimal(2), expecting_weight=Decimal(weight))
+            for region, weight in zip(cls.regions, (10, 20))
+        ]
+        # Outside the high-water overlap, so an incremental refresh does not re-read it
+        PlantedProduct.objects.filter(pk=cls.old.pk).update(updated_at=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        self.engine = ColumnarEngine()
+        self.engine.snapshot()
+
+    def refreshed(self):
+        bump_version()
+        return self.engine.snapshot()
+
+    def assertMatchesDatabase(self, snapshot):
+        rows = list(PlantedProduct.objects.order_by('id').values_list('id', 'region_id', 'expecting_weight'))
+        self.assertEqual([(int(pk), int(region_id), Decimal(weight)) for pk, region_id, weight in zip(
+            snapshot.columns['id'], snapshot.columns['region_id'], snapshot.columns['expecting_weight']
+        )], rows)
+
+    def test_refresh_merges_new_and_updated_rows(self):
+        PlantedProduct.objects.filter(pk=self.recent.pk).update(expecting_weight=Decimal(25),
+                                                                updated_at=timezone.now())
+        PlantedProduct.objects.create(region=self.regions[0], product=self.product, owner=self.owner,
+                                      planting_area=Decimal(1), expecting_weight=Decimal(5))
+
+        snapshot = self.refreshed()
+        self.assertEqual((self.engine.full_loads, self.engine.incremental_loads), (1, 1))
+        self.assertMatchesDatabase(snapshot)
+        self.assertEqual(snapshot.overall(), {'weight': 40.0, 'area': 5.0, 'records': 3})
+
+    def test_delete_forces_a_full_reload(self):
+        PlantedProduct.objects.filter(pk=self.old.pk).delete()
+
+        snapshot = self.refreshed()
+        self.assertEqual((self.engine.full_loads, self.engine.incremental_loads), (2, 0))
+        self.assertMatchesDatabase(snapshot)
+        self.assertEqual([row['region_id'] for row in snapshot.grouped('region')], [self.regions[1].pk])
+
+    def test_stats_describe_the_loaded_arrays(self):
+        stats = self.engine.stats()
+        self.assertEqual(stats["rows"], 2)
+        # Seven 8-byte columns and two group codes per row, plus one unique region and product id per group
+        self.assertEqual(stats["memory_bytes"], 8 * (9 * 2 + len(self.regions) + 1))
+        self.assertEqual((stats["full_loads"], stats["incremental_loads"]), (1, 0))
+
+
+class ProductListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create([Product(name=name) for name in ("Cotton", "Wheat", "Rice")])
+
+    def setUp(self):
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def next_link(self, query, **extra):
+        response = self.client.get(f"/api/products/products/?{query}", **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.data["next"]
+
+    def test_page_links_follow_the_request_url(self):
+        self.assertEqual(self.next_link("page_size=2"), "http://testserver/api/products/products/?page=2&page_size=2")
+        self.assertEqual(self.next_link("page_size=2", secure=True),
+                         "https://testserver/api/products/products/?page=2&page_size=2")
+        self.assertEqual(self.next_link("page_size=2&ref=home"),
+                         "http://testserver/api/products/products/?page=2&page_size=2&ref=home")
+        self.assertEqual(self.next_link("ref=home&page_size=2"),
+                         "http://testserver/api/products/products/?page=2&page_size=2&ref=home")
+
+
+class PlantedProductExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.product = Product.objects.create(name_en="Wheat", name_ru="Пшеница")
+        cls.farmer = User.objects.create_user(email="farmer@example.com", password="secret")
+        cls.admin = User.objects.create_user(email="admin@example.com", password="secret")
+        cls.admin.groups.set([Group.objects.create(name="Admins")])
+        PlantedProduct.objects.create(product=cls.product, region=cls.region, owner=cls.farmer,
+                                      planting_area=Decimal(2), expecting_weight=Decimal(10))
+
+    def setUp(self):
+        reference_cache.invalidate_all()
+        cache.delete_pattern(roles.ROLE_KEY.format(user_id="*"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_only_admins_export(self):
+        self.client.force_authenticate(self.farmer)
+        self.assertEqual(self.client.get("/api/products/export/planted-products/").status_code, 403)
+
+    def test_names_are_translated(self):
+        response = self.client.get("/api/products/export/planted-products/", {"export_format": "ndjson"},
+                                   HTTP_ACCEPT_LANGUAGE="ru")
+        self.assertEqual(response.status_code, 200)
+        row = json.loads(b"".join(response.streaming_content))
+        self.assertEqual((row["product_name"], row["region_name"]), ("Пшеница", "Tashkent"))
+
+    def test_filters_are_validated(self):
+        for params in ({"region_id": "abc"}, {"product_id": "abc"}, {"region_id": 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/products/export/planted-products/", params).status_code, 404)
+
+    def test_wph_matrix_export_is_public(self):
+        samarkand = Region.objects.create(name="Samarkand")
+        cotton = Product.objects.create(name="Cotton")
+        for region, product, area, weight in ((samarkand, cotton, 4, 10), (self.region, cotton, 1, 3)):
+            PlantedProduct.objects.create(product=product, region=region, owner=self.farmer,
+                                          planting_area=Decimal(area), expecting_weight=Decimal(weight))
+
+        response = APIClient().get("/api/products/export/wph-matrix/", HTTP_ACCEPT_LANGUAGE="ru")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="wph_matrix.csv"')
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ["region_name", "product_name", "expecting_weight", "planting_area", "wph",
+                                   "planted_records"])
+        self.assertEqual(rows[1:], [
+            ["Tashkent", "Пшеница", "10.0", "2.0", "5.0", "1"],
+            ["Tashkent", "Cotton", "3.0", "1.0", "3.0", "1"],
+            ["Samarkand", "Cotton", "10.0", "4.0", "2.5", "1"],
+        ])
+
+
+class RegionProductRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.regions = [Region.objects.create(name="Tashkent"), Region.objects.create(name="Samarkand")]
+        cls.products = [Product.objects.create(name="Cotton"), Product.objects.create(name="Wheat")]
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret")
+
+    def plant(self, region, product, area, weight):
+        return PlantedProduct.objects.create(region=region, product=product, owner=self.owner,
+                                             planting_area=Decimal(area), expecting_weight=Decimal(weight))
+
+    def totals(self):
+        return {
+            (row['region_id'], row['product_id']): (row['weight'], row['area'], row['records'])
+            for row in rollup_totals(RegionProductStats.objects.all(), 'region_id', 'product_id')
+        }
+
+    def test_rows_move_with_the_planting(self):
+        cotton, wheat = self.products
+        tashkent, samarkand = self.regions
+        planted = self.plant(tashkent, cotton, 2, 10)
+        self.plant(tashkent, cotton, 1, 5)
+
+        planted.region = samarkand
+        planted.save()
+        self.assertEqual(self.totals(), {(tashkent.pk, cotton.pk): (5, 1, 1), (samarkand.pk, cotton.pk): (10, 2, 1)})
+
+        planted.product = wheat
+        planted.expecting_weight = Decimal(30)
+        planted.save()
+        self.assertEqual(self.totals(), {(tashkent.pk, cotton.pk): (5, 1, 1), (samarkand.pk, wheat.pk): (30, 2, 1)})
+
+    def test_delete_removes_the_planting(self):
+        cotton, wheat = self.products
+        planted = self.plant(self.regions[0], cotton, 2, 10)
+        self.plant(self.regions[0], wheat, 1, 5)
+
+        planted.delete()
+        self.assertEqual(self.totals(), {(self.regions[0].pk, wheat.pk): (5, 1, 1)})
+        self.assertEqual(RegionProductStats.objects.get(product=cotton).planting_count, 0)
+
+    def test_rebuild_check_reports_drift_without_fixing_it(self):
+        self.plant(self.regions[0], self.products[0], 2, 10)
+        self.plant(self.regions[1], self.products[1], 1, 5)
+        RegionProductStats.objects.filter(product=self.products[0]).update(total_weight=Decimal(99))
+        RegionProductStats.objects.create(region=self.regions[1], product=self.products[0], total_weight=Decimal(1),
+                                          total_area=Decimal(1), planting_count=1)
+
+        out = StringIO()
+        call_command("rebuild_wph_stats", check=True, stdout=out)
+        self.assertIn("Would fix 2 rows: 0 missing, 1 out of date, 1 stale", out.getvalue())
+        self.assertEqual(RegionProductStats.objects.get(product=self.products[0], region=self.regions[0]).total_weight,
+                         99)
+
+        call_command("rebuild_wph_stats", stdout=StringIO())
+        out = StringIO()
+        call_command("rebuild_wph_stats", check=True, stdout=out)
+        self.assertIn("in sync", out.getvalue())
+        self.assertEqual(self.totals(), {(self.regions[0].pk, self.products[0].pk): (10, 2, 1),
+                                         (self.regions[1].pk, self.products[1].pk): (5, 1, 1)})
+
+
+class AnalyticsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.product = Product.objects.create(name="Cotton")
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret")
+
+    def setUp(self):
+        bump_version()
+        self.client = APIClient()
+
+    def assertBumps(self, write):
+        version = get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(get_version(), version + 1)
+
+    def test_every_write_bumps_the_version(self):
+        planted = PlantedProduct(region=self.region, product=self.product, owner=self.owner,
+                                 planting_area=Decimal(1), expecting_weight=Decimal(5))
+        self.assertBumps(planted.save)
+        planted.expecting_weight = Decimal(6)
+        self.assertBumps(planted.save)
+        self.assertBumps(planted.delete)
+        self.assertBumps(lambda: Product.objects.create(name_en="Wheat", name_ru="Пшеница", name_uz="Bug‘doy"))
+        self.assertBumps(self.region.save)
+        self.assertBumps(self.region.delete)
+
+    def test_hits_and_misses_are_counted(self):
+        before = cache_stats()
+        first = self.client.get("/api/products/wph/comparison/", {"product_id": self.product.pk})
+        second = self.client.get("/api/products/wph/comparison/", {"product_id": self.product.pk})
+        self.client.get("/api/products/wph/comparison/", {"product_id": self.product.pk}, HTTP_ACCEPT_LANGUAGE="ru")
+        after = cache_stats()
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual((after["hits"] - before["hits"], after["misses"] - before["misses"]), (1, 2))
+
+        bump_version()
+        self.client.get("/api/products/wph/comparison/", {"product_id": self.product.pk})
+        self.assertEqual(cache_stats()["misses"] - after["misses"], 1)
+
+
+class ProductionTimeSeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.product = Product.objects.create(name="Cotton")
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        for day, weight in ((2, 10), (2, 20), (4, 5)):
+            planted = PlantedProduct.objects.create(region=cls.region, product=cls.product, owner=owner,
+                                                    planting_area=Decimal(1), expecting_weight=Decimal(weight))
+            PlantedProduct.objects.filter(pk=planted.pk).update(
+                created_at=datetime(2026, 3, day, 8, tzinfo=dt_timezone.utc)
+            )
+        rebuild_production_buckets()
+
+    def setUp(self):
+        bump_version()
+        self.client = APIClient()
+
+    def series(self, **params):
+        response = self.client.get("/api/products/production/timeseries/", params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["period"], row["expecting_weight"], row["planted_records"]) for row in response.data["series"]]
+
+    def test_days_without_plantings_are_zero(self):
+        self.assertEqual(self.series(granularity="day", start="2026-03-01", end="2026-03-05"), [
+            ("2026-03-01", 0.0, 0), ("2026-03-02", 30.0, 2), ("2026-03-03", 0.0, 0),
+            ("2026-03-04", 5.0, 1), ("2026-03-05", 0.0, 0),
+        ])
+
+    def test_months_start_on_the_first_and_are_zero_filled(self):
+        self.assertEqual(self.series(granularity="month", start="2026-01-15", end="2026-04-10"), [
+            ("2026-01-01", 0.0, 0), ("2026-02-01", 0.0, 0), ("2026-03-01", 35.0, 3), ("2026-04-01", 0.0, 0),
+        ])
+        self.assertEqual(self.series(granularity="month", start="2026-12-01", end="2027-01-31",
+                                     product_id=self.product.pk),
+                         [("2026-12-01", 0.0, 0), ("2027-01-01", 0.0, 0)])
+
+    def test_ranges_at_the_calendar_edges(self):
+        self.assertEqual(self.series(granularity="month", start="9999-11-15", end="9999-12-31"),
+                         [("9999-11-01", 0.0, 0), ("9999-12-01", 0.0, 0)])
+        self.assertEqual(self.series(granularity="day", start="0001-01-01", end="0001-01-02"),
+                         [("0001-01-01", 0.0, 0), ("0001-01-02", 0.0, 0)])
+        response = self.client.get("/api/products/production/timeseries/", {"end": "0001-01-05"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_long_ranges_are_rejected(self):
+        url = "/api/products/production/timeseries/"
+        self.assertEqual(self.client.get(url, {"granularity": "month", "start": "1927-01-01",
+                                               "end": "2026-12-31"}).status_code, 200)
+        for params in ({"granularity": "month", "start": "0001-01-01", "end": "9999-12-31"},
+                       {"granularity": "month", "start": "1926-12-01", "end": "2026-12-31"},
+                       {"granularity": "day", "start": "2016-01-01", "end": "2026-12-31"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+
+class LiveStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.regions = [Region.objects.create(name="Tashkent"), Region.objects.create(name="Samarkand")]
+        cls.product = Product.objects.create(name_en="Wheat", name_ru="Пшеница")
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret")
+
+    def setUp(self):
+        # The live keys are in Redis, which outlives the test database
+        live._redis().delete(live.READY_KEY, live.DAILY_KEY, *[
+            key for group in live.GROUPS for key in (live.totals_key(group), live.ranking_key(group))
+        ])
+        reference_cache.invalidate_all()
+
+    def plant(self, region, weight):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PlantedProduct.objects.create(region=region, product=self.product, owner=self.owner,
+                                                 planting_area=Decimal(1), expecting_weight=Decimal(weight))
+
+    def test_live_counters_match_the_database(self):
+        tashkent, samarkand = self.regions
+        live.reconcile()
+        planted = self.plant(tashkent, 10)
+        self.plant(samarkand, 25)
+        with self.captureOnCommitCallbacks(execute=True):
+            planted.expecting_weight = Decimal(40)
+            planted.save()
+
+        self.assertEqual(live.top('region', 5), live._database_top('region', 5))
+        self.assertEqual([row["region"] for row in live.top('region', 5)], ["Tashkent", "Samarkand"])
+        self.assertEqual(live.recent_production(), Decimal(65))
+        self.assertEqual(live.reconcile(), {'region': 0, 'product': 0, 'daily': 0})
+
+        live._redis().zincrby(live.ranking_key('region'), 100, samarkand.pk)
+        self.assertEqual(live.reconcile()['region'], 1)
+        self.assertEqual(live.top('region', 5), live._database_top('region', 5))
+
+    def test_database_fallback_when_redis_is_unavailable(self):
+        self.plant(self.regions[0], 10)
+        with translation.override("ru"):
+            expected = [{"id": self.product.pk, "product": "Пшеница", "total_production": 10.0}]
+            # Not reconciled yet: the live store is not ready
+            self.assertEqual(live.top('product', 5), expected)
+            live.reconcile()
+            with mock.patch.object(live, "_redis", side_effect=RedisConnectionError("down")), \
+                    self.assertLogs("products.live", "WARNING"):
+                self.assertEqual(live.top('product', 5), expected)
+                self.assertEqual(live.recent_production(), Decimal(10))
+
+    def test_recent_production_is_the_same_decimal_on_both_paths(self):
+        for weight in ("10.1", "0.2", "7.123"):
+            self.plant(self.regions[0], Decimal(weight))
+        live.reconcile()
+        self.plant(self.regions[1], Decimal("0.7"))
+
+        from_redis = live.recent_production()
+        with mock.patch.object(live, "_redis", side_effect=RedisConnectionError("down")), \
+                self.assertLogs("products.live", "WARNING"):
+            from_database = live.recent_production()
+        self.assertEqual(from_redis, Decimal("18.123"))
+        self.assertEqual(from_database, Decimal("18.123"))
+        self.assertIsInstance(from_redis, Decimal)
+        self.assertIsInstance(from_database, Decimal)
+
+
+class DashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        region = Region.objects.create(name="Tashkent")
+        product = Product.objects.create(name="Cotton")
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        for area, weight in ((1, 10), (4, 10)):
+            PlantedProduct.objects.create(region=region, product=product, owner=owner,
+                                          planting_area=Decimal(area), expecting_weight=Decimal(weight))
+
+    def setUp(self):
+        bump_version()
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def test_all_sections_by_default(self):
+        response = self.client.get("/api/products/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), set(views.Dashboard.sections))
+        self.assertEqual(response.data["total_production"], 20)
+        self.assertEqual(response.data["highest_wph"], 10)
+        self.assertEqual(response.data["top_region"], {"region": "Tashkent", "total_production": 20.0})
+        self.assertEqual(response.data["wph_region"]["wph"], 4.0)
+
+    def test_selected_sections_only(self):
+        # The snapshot's savepoint and its release, then one query per requested section
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/products/dashboard/", {"sections": "highest_wph, total_production"})
+        self.assertEqual(set(response.data), {"highest_wph", "total_production"})
+
+    def test_unknown_section(self):
+        response = self.client.get("/api/products/dashboard/", {"sections": "highest_wph,weather"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("weather", response.data["error"])
+
+
+class DashboardSnapshotTests(TransactionTestCase):
+    def setUp(self):
+        bump_version()
+        region = Region.objects.create(name="Tashkent")
+        PlantedProduct.objects.create(region=region, product=Product.objects.create(name="Cotton"),
+                                      owner=User.objects.create_user(email="farmer@example.com", password="secret"),
+                                      planting_area=Decimal(1), expecting_weight=Decimal(10))
+
+    @staticmethod
+    def commit_elsewhere():
+        # Its own connection, so the row is committed while the dashboard's transaction is still open
+        ProductionBucket.objects.create(granularity=ProductionBucket.DAY, period_start=timezone.localdate(),
+                                        total_weight=Decimal(1000), total_area=Decimal(1), planting_count=1)
+        connection.close()
+
+    def test_sections_read_one_snapshot(self):
+        wph_total = views.wph_total
+
+        def concurrent_write(*args):
+            thread = threading.Thread(target=self.commit_elsewhere)
+            thread.start()
+            thread.join()
+            return wph_total(*args)
+
+        with mock.patch.object(views, "wph_total", concurrent_write):
+            response = APIClient().get("/api/products/dashboard/")
+        self.assertEqual(response.data["total_production"], 10)
+
+        bump_version()
+        self.assertEqual(APIClient().get("/api/products/dashboard/").data["total_production"], 1010)
+
+
+class WPHDistributionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.product = Product.objects.create(name_en="Wheat", name_ru="Пшеница")
+        owner = User.objects.create_user(email="farmer@example.com", password="secret")
+        for i in range(1, 6):
+            PlantedProduct.objects.create(product=cls.product, region=cls.region, owner=owner,
+                                          planting_area=Decimal(i), expecting_weight=Decimal(10))
+
+    def setUp(self):
+        bump_version()
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def test_groups_use_translated_names(self):
+        response = self.client.get("/api/products/wph/distribution/", {"group_by": "product"},
+                                   HTTP_ACCEPT_LANGUAGE="ru")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["product"] for row in response.data["distribution"]], ["Пшеница"])
+        self.assertEqual(response.data["distribution"][0]["count"], 5)
+
+    def test_filters_are_validated(self):
+        for params in ({"region_id": "abc"}, {"product_id": "abc"}, {"product_id": 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/products/wph/distribution/", params).status_code, 404)
+
+    def test_rebuild_removes_bins_without_plantings(self):
+        PlantedProduct.objects.all().delete()
+        WPHSketchBin.objects.create(region=self.region, product=self.product, bin_index=10_000, planting_count=2)
+
+        self.assertEqual(rebuild_wph_sketches(dry_run=True), {'created': 0, 'updated': 0, 'deleted': 1})
+        self.assertEqual(rebuild_wph_sketches(), {'created': 0, 'updated': 0, 'deleted': 1})
+        self.assertFalse(WPHSketchBin.objects.exists())
+
+
+class HighestWPHTests(TestCase):
+    def setUp(self):
+        bump_version()
+
+    def test_empty_table(self):
+        response = APIClient().get("/api/products/highest-wph/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["whp"])
+
+
+class PlantedProductReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Tashkent")
+        cls.products = [Product.objects.create(name_en=f"Crop {i}", name_ru=f"Культура {i}") for i in range(30)]
+        cls.owner = User.objects.create_user(email="farmer@example.com", password="secret", first_name="Ali")
+        PlantedProduct.objects.bulk_create([
+            PlantedProduct(product=product, owner=cls.owner, region=cls.region,
+                           planting_area=Decimal("1.5"), expecting_weight=Decimal(i))
+            for i, product in enumerate(cls.products * 2)
+        ] + [PlantedProduct(owner=cls.owner, region=cls.region, planting_area=Decimal(1), expecting_weight=Decimal(1))])
+        cls.planted = PlantedProduct.objects.filter(product__isnull=False).first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_list_is_one_query_per_page(self):
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(1):
+                response = self.client.get("/api/products/planted-products/", {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+
+    def test_retrieve_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/products/planted-products/{self.planted.pk}/")
+        self.assertEqual(response.data["product"]["id"], self.planted.product_id)
+
+    def test_lite_list_matches_full_list(self):
+        for language in ("en", "ru"):
+            with self.subTest(language=language):
+                full = self.client.get("/api/products/planted-products/", {"page_size": 100},
+                                       HTTP_ACCEPT_LANGUAGE=language)
+                with self.assertNumQueries(1):
+                    lite = self.client.get("/api/products/planted-products/", {"page_size": 100, "lite": "true"},
+                                           HTTP_ACCEPT_LANGUAGE=language)
+                self.assertEqual(lite.content, full.content)
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cotton = Product.objects.create(name_en="Cotton", name_ru="Хлопок", name_uz="Paxta")
+        cls.wheat = Product.objects.create(name_en="Winter wheat", name_ru="Озимая пшеница", name_uz="Kuzgi bug‘doy")
+        cls.sorghum = Product.objects.create(name_en="Sorghum", name_ru="Сорго", name_uz="Jo‘xori")
+        cls.carrot = Product.objects.create(name_en="Carrot", name_ru="Морковь", name_uz="Sabzi")
+
+    def setUp(self):
+        reference_cache.invalidate_all()
+        self.client = APIClient()
+
+    def ids(self, query, language="en"):
+        response = self.client.get("/api/products/search/", {"q": query}, HTTP_ACCEPT_LANGUAGE=language)
+        self.assertEqual(response.status_code, 200)
+        return [result["id"] for result in response.data["results"]]
+
+    def test_prefix_in_any_language(self):
+        self.assertEqual(self.ids("cot"), [self.cotton.pk])
+        self.assertEqual(self.ids("хло"), [self.cotton.pk])
+        self.assertEqual(self.ids("pax"), [self.cotton.pk])
+
+    def test_word_prefix_and_apostrophes(self):
+        self.assertEqual(self.ids("пшен"), [self.wheat.pk])
+        self.assertEqual(self.ids("bug'd", "uz"), [self.wheat.pk])
+
+    def test_near_miss(self):
+        self.assertEqual(self.ids("cotten")[:1], [self.cotton.pk])
+
+    def test_active_language_ranks_first(self):
+        # "s" starts the English name of sorghum and the Uzbek name of the carrot
+        self.assertEqual(self.ids("s", "en"), [self.sorghum.pk, self.carrot.pk])
+        self.assertEqual(self.ids("s", "uz"), [self.carrot.pk, self.sorghum.pk])
+
+        response = self.client.get("/api/products/search/", {"q": "s"}, HTTP_ACCEPT_LANGUAGE="uz")
+        self.assertEqual(response.data["results"][0]["name"], "Sabzi")
+        self.assertEqual(response.data["results"][1]["matched_language"], "en")
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get("/api/products/search/").status_code, 400)
+        # Only combining marks and whitespace: nothing left to match after normalization
+        self.assertEqual(self.client.get("/api/products/search/", {"q": " \u0301 "}).status_code, 400)
+        self.assertEqual(search("\u0301\u0308", 10), [])
+
+
+class FlakyTranslator:
+    """Reaches every language but Uzbek"""
+
+    async def translate(self, text, source, dest):
+        if dest == "uz":
+            raise ConnectionError("translator unreachable")
+        return f"{text} ({dest})"
+
+
+class SlowTranslator:
+    async def translate(self, text, source, dest):
+        await asyncio.sleep(5)
+
+
+@override_settings(PRODUCT_TRANSLATOR="products.service.StubTranslator", TRANSLATION_BREAKER_THRESHOLD=2)
+class ProductTranslationTests(TestCase):
+    def setUp(self):
+        cache.delete_many([BREAKER_FAILURES_KEY, BREAKER_OPEN_KEY])
+
+    def test_create_queues_translation_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            product = Product.objects.create(name_en="Cotton")
+        self.assertTrue(any(getattr(callback, "func", None) is queue_translation for callback in callbacks))
+        product.refresh_from_db()
+        self.assertFalse(product.name_ru)
+
+        translate_product_name(product.pk)
+        product.refresh_from_db()
+        self.assertEqual((product.name_ru, product.name_uz), ("Cotton [ru]", "Cotton [uz]"))
+
+    def test_existing_names_are_kept(self):
+        product = Product.objects.create(name_ru="Хлопок", name_uz="Paxta")
+        translate_product_name(product.pk)
+        product.refresh_from_db()
+        self.assertEqual((product.name_en, product.name_uz), ("Хлопок [en]", "Paxta"))
+
+    @override_settings(PRODUCT_TRANSLATOR="products.tests.FlakyTranslator")
+    def test_failures_keep_successes_and_open_the_circuit(self):
+        product = Product.objects.create(name_en="Wheat")
+        for _ in range(2):
+            with self.assertRaises(TranslationUnavailable):
+                translate_product_name(product.pk)
+        product.refresh_from_db()
+        self.assertEqual((product.name_ru, product.name_uz), ("Wheat (ru)", None))
+
+        with self.assertRaises(TranslationUnavailable) as raised:
+            translate_product_name(product.pk)
+        self.assertEqual(raised.exception.retry_after, settings.TRANSLATION_BREAKER_COOLDOWN)
+
+    def test_translation_memory_answers_without_the_translator(self):
+        translate_product_name(Product.objects.create(name_en="Barley").pk)
+        self.assertEqual(TranslationMemory.objects.filter(source_text="barley").count(), 2)
+
+        with override_settings(PRODUCT_TRANSLATOR="products.tests.FlakyTranslator"):
+            product = Product.objects.create(name_en="  barley ")
+            translate_product_name(product.pk)
+        product.refresh_from_db()
+        self.assertEqual((product.name_ru, product.name_uz), ("Barley [ru]", "Barley [uz]"))
+
+    def test_backfill_command(self):
+        products = [Product.objects.create(name_en=f"Crop {i}") for i in range(5)]
+        Product.objects.create(name_en="Done", name_ru="Готово", name_uz="Tayyor")
+        call_command("backfill_translations", batch_size=2, concurrency=3, stdout=StringIO())
+        names = Product.objects.filter(pk__in=[product.pk for product in products]).order_by('pk')
+        self.assertEqual(list(names.values_list('name_uz', flat=True)), [f"Crop {i} [uz]" for i in range(5)])
+
+    @override_settings(PRODUCT_TRANSLATOR="products.tests.SlowTranslator", TRANSLATION_TIMEOUT=0.1)
+    def test_translation_times_out(self):
+        product = Product.objects.create(name_en="Rice")
+        started = time.monotonic()
+        with self.assertRaises(TranslationUnavailable):
+            translate_product_name(product.pk)
+        self.assertLess(time.monotonic() - started, 1)
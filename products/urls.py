@@ -1,6 +1,8 @@
 from django.urls import path
 from products.views import ProductModelViewSet, PlantedProductModelViewSet, WPHPerRegion, WPHPerRegionPerProduct, \
-    WPHComparison, WPHMatrix, TotalProductionThisMonth, HighestWPH, TopPerformingRegion
+    WPHComparison, WPHMatrix, TotalProductionThisMonth, HighestWPH, TopPerformingRegion, AnalyticsCacheStats, \
+    ProductionTimeSeries, AnalyticsEngineStats, PlantedProductExport, WPHMatrixExport, \
+    WPHDistribution, WPHLeaderboard, TopProduction, Dashboard, ProductSearch
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -15,7 +17,18 @@ urlpatterns = [
                   path('wph/comparison/', WPHComparison.as_view(), name='wph-comparison'),
                   path('wph/matrix/', WPHMatrix.as_view(), name='wph-matrix'),
                   path('total-production/', TotalProductionThisMonth.as_view(), name='total-production-this-month'),
+                  path('production/timeseries/', ProductionTimeSeries.as_view(), name='production-timeseries'),
+                  path('wph/distribution/', WPHDistribution.as_view(), name='wph-distribution'),
+                  path('wph/top/', WPHLeaderboard.as_view(), name='wph-top'),
                   path('highest-wph/', HighestWPH.as_view(), name='highest-wph'),
                   path('top-performing-region/', TopPerformingRegion.as_view(), name='top_performing_region'),
+                  path('live/top-regions/', TopProduction.as_view(group='region'), name='live-top-regions'),
+                  path('live/top-products/', TopProduction.as_view(group='product'), name='live-top-products'),
+                  path('export/planted-products/', PlantedProductExport.as_view(), name='export-planted-products'),
+                  path('export/wph-matrix/', WPHMatrixExport.as_view(), name='export-wph-matrix'),
+                  path('dashboard/', Dashboard.as_view(), name='dashboard'),
+                  path('search/', ProductSearch.as_view(), name='product-search'),
+                  path('analytics/cache-stats/', AnalyticsCacheStats.as_view(), name='analytics-cache-stats'),
+                  path('analytics/engine-stats/', AnalyticsEngineStats.as_view(), name='analytics-engine-stats'),
 
               ] + router.urls
@@ -1,18 +1,31 @@
-from datetime import timedelta
+from datetime import date, timedelta
+from urllib.parse import urlencode
 from django.utils import timezone
 from accounts.utils import log_activity
-from products.models import Product, PlantedProduct
-from products.serializers import ProductSerializer, PlantedProductSerializer, PlantedProductSerializerListAndRetrieve
+from django.db import transaction
+from products.models import Product, PlantedProduct, RegionProductStats, ProductionBucket, WPHSketchBin
+from products.serializers import ProductSerializer, PlantedProductSerializer, PlantedProductSerializerListAndRetrieve, \
+    PlantedProductLiteSerializer
+from common.cache import reference_cache, reference_name, reference_names
+from common.serializers import ValuesSerializer, optimize_for_serializer
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
 from accounts.permissions import IsAdminUser
-from products.pagination import ProductPageNumberPagination
+from products.pagination import ProductPageNumberPagination, PlantedProductCursorPagination
 from rest_framework.views import APIView
-from django.db.models import Sum, F, Max
+from django.db.models import Sum
 from decimal import Decimal
-from collections import defaultdict
+from products.cache import cached_analytics, cache_stats
+from products.engine import engine, engine_requested
+from products import live
+from products.exports import EXPORT_FORMATS, streaming_export
+from products.search import normalize, search
+from products.sketches import RELATIVE_ACCURACY, summarize
+from products.analytics import rollup_totals, with_names, wph_list, wph_matrix, production_series, \
+    wph_leaderboard, leaderboard_entry, wph_total, top_region, consistent_snapshot, month_index, UNKNOWN_PRODUCT, \
+    UNKNOWN_REGION
 from regions.models import Region
 
 
@@ -28,30 +41,51 @@ class ProductModelViewSet(ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        # Page links are the absolute request URL with the page replaced, so the key is that URL with the query sorted
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = f"list:{request.build_absolute_uri(request.path)}?{query}"
+        return Response(reference_cache.get(Product, key, lambda: super(ProductModelViewSet, self).list(
+            request, *args, **kwargs).data))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(reference_cache.get(Product, f"detail:{kwargs['pk']}", lambda: super(
+            ProductModelViewSet, self).retrieve(request, *args, **kwargs).data))
+
 
 class PlantedProductModelViewSet(ModelViewSet):
     serializer_class = PlantedProductSerializer
     queryset = PlantedProduct.objects.all()
+    pagination_class = PlantedProductCursorPagination
 
     def get_queryset(self):
         queryset = self.queryset
         if self.action in ['retrieve', 'list']:
-            return queryset.filter(owner=self.request.user.pk)
+            queryset = queryset.filter(owner=self.request.user.pk)
+            serializer_class = self.get_serializer_class()
+            if issubclass(serializer_class, ValuesSerializer):
+                return serializer_class.values(queryset)
+            return optimize_for_serializer(queryset, serializer_class)
         return queryset
 
     def get_serializer_class(self):
+        if self.action == 'list' and self.request.query_params.get('lite') in ('1', 'true'):
+            return PlantedProductLiteSerializer
         if self.action in ['list', 'retrieve']:
             return PlantedProductSerializerListAndRetrieve
         return self.serializer_class
 
+    @transaction.atomic
     def perform_create(self, serializer):
         instance = serializer.save(owner=self.request.user)
         log_activity(instance.owner, "CREATE", instance)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         instance = serializer.save()
         log_activity(instance.owner, "UPDATE", instance)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         log_activity(instance.owner, "DELETE", instance)
         instance.delete()
@@ -61,32 +95,35 @@ class WPHPerRegion(APIView):
     """Calculate Weight Per Hectare for a specific region or all regions"""
     permission_classes = [AllowAny]
 
+    @cached_analytics('region_id', 'engine')
     def get(self, request):
         region_id = request.query_params.get("region_id")
 
         # Filter by region if provided
-        queryset = PlantedProduct.objects.all()
+        queryset = RegionProductStats.objects.filter(planting_count__gt=0)
         if region_id:
-            try:
-                region = Region.objects.get(pk=region_id)
-                queryset = queryset.filter(region=region)
-                region_name = region.name
-            except Region.DoesNotExist:
+            region_name = reference_name(Region, region_id)
+            if region_name is None:
                 return Response(
                     {"error": "Region not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            queryset = queryset.filter(region_id=region_id)
         else:
             region_name = "All Regions"
 
         # Calculate aggregated values
-        aggregated = queryset.aggregate(
-            total_expecting_weight=Sum('expecting_weight'),
-            total_planting_area=Sum('planting_area')
-        )
+        if engine_requested(request):
+            aggregated = engine.snapshot().overall(region_id=region_id)
+        else:
+            aggregated = queryset.aggregate(
+                weight=Sum('total_weight'),
+                area=Sum('total_area'),
+                records=Sum('planting_count')
+            )
 
-        total_weight = aggregated['total_expecting_weight'] or Decimal('0')
-        total_area = aggregated['total_planting_area'] or Decimal('0')
+        total_weight = aggregated['weight'] or Decimal('0')
+        total_area = aggregated['area'] or Decimal('0')
 
         # Calculate WPH (avoid division by zero)
         wph = float(total_weight / total_area) if total_area > 0 else 0.0
@@ -96,7 +133,7 @@ class WPHPerRegion(APIView):
             "expecting_weight": float(total_weight),
             "planting_area": float(total_area),
             "wph": wph,
-            "total_records": queryset.count()
+            "total_records": aggregated['records'] or 0
         }
 
         return Response(data, status=status.HTTP_200_OK)
@@ -106,65 +143,41 @@ class WPHPerRegionPerProduct(APIView):
     """Calculate Weight Per Hectare grouped by product for a specific region"""
     permission_classes = [AllowAny]
 
+    @cached_analytics('region_id', 'product_id', 'engine')
     def get(self, request):
         region_id = request.query_params.get("region_id")
         product_id = request.query_params.get("product_id")
 
-        # Start with all planted products
-        queryset = PlantedProduct.objects.select_related('product', 'region')
+        # Start with the totals of every (region, product) pair
+        queryset = RegionProductStats.objects.all()
 
         # Filter by region if provided
         if region_id:
-            try:
-                region = Region.objects.get(pk=region_id)
-                queryset = queryset.filter(region=region)
-                region_name = region.name
-            except Region.DoesNotExist:
+            region_name = reference_name(Region, region_id)
+            if region_name is None:
                 return Response(
                     {"error": "Region not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            queryset = queryset.filter(region_id=region_id)
         else:
             region_name = "All Regions"
 
         # Filter by product if provided
         if product_id:
-            try:
-                product = Product.objects.get(pk=product_id)
-                queryset = queryset.filter(product=product)
-            except Product.DoesNotExist:
+            if reference_name(Product, product_id) is None:
                 return Response(
                     {"error": "Product not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            queryset = queryset.filter(product_id=product_id)
 
-        # Group by product and calculate WPH for each
-        product_data = defaultdict(lambda: {
-            'expecting_weight': Decimal('0'),
-            'planting_area': Decimal('0'),
-            'count': 0
-        })
-
-        for planted_product in queryset:
-            product_name = planted_product.product.name if planted_product.product else "Unknown Product"
-            product_data[product_name]['expecting_weight'] += planted_product.expecting_weight
-            product_data[product_name]['planting_area'] += planted_product.planting_area
-            product_data[product_name]['count'] += 1
-
-        # Calculate WPH for each product
-        result = []
-        for product_name, data in product_data.items():
-            wph = float(data['expecting_weight'] / data['planting_area']) if data['planting_area'] > 0 else 0.0
-            result.append({
-                "product_name": product_name,
-                "expecting_weight": float(data['expecting_weight']),
-                "planting_area": float(data['planting_area']),
-                "wph": wph,
-                "planted_records": data['count']
-            })
-
-        # Sort by WPH descending
-        result.sort(key=lambda x: x['wph'], reverse=True)
+        # Group by product in the database and calculate WPH for each
+        if engine_requested(request):
+            rows = engine.snapshot().grouped('product', region_id=region_id, product_id=product_id)
+        else:
+            rows = rollup_totals(queryset, 'product_id')
+        result = wph_list(with_names(rows), 'product__name', 'product_name', UNKNOWN_PRODUCT)
 
         response_data = {
             "region": region_name,
@@ -179,52 +192,30 @@ class WPHComparison(APIView):
     """Compare WPH across different regions for all products or specific product"""
     permission_classes = [AllowAny]
 
+    @cached_analytics('product_id', 'engine')
     def get(self, request):
         product_id = request.query_params.get("product_id")
 
-        queryset = PlantedProduct.objects.select_related('product', 'region')
+        queryset = RegionProductStats.objects.all()
 
         # Filter by product if provided
         if product_id:
-            try:
-                product = Product.objects.get(pk=product_id)
-                queryset = queryset.filter(product=product)
-                product_name = product.name
-            except Product.DoesNotExist:
+            product_name = reference_name(Product, product_id)
+            if product_name is None:
                 return Response(
                     {"error": "Product not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            queryset = queryset.filter(product_id=product_id)
         else:
             product_name = "All Products"
 
-        # Group by region
-        region_data = defaultdict(lambda: {
-            'expecting_weight': Decimal('0'),
-            'planting_area': Decimal('0'),
-            'count': 0
-        })
-
-        for planted_product in queryset:
-            region_name = planted_product.region.name if planted_product.region else "Unknown Region"
-            region_data[region_name]['expecting_weight'] += planted_product.expecting_weight
-            region_data[region_name]['planting_area'] += planted_product.planting_area
-            region_data[region_name]['count'] += 1
-
-        # Calculate WPH for each region
-        result = []
-        for region_name, data in region_data.items():
-            wph = float(data['expecting_weight'] / data['planting_area']) if data['planting_area'] > 0 else 0.0
-            result.append({
-                "region_name": region_name,
-                "expecting_weight": float(data['expecting_weight']),
-                "planting_area": float(data['planting_area']),
-                "wph": wph,
-                "planted_records": data['count']
-            })
-
-        # Sort by WPH descending
-        result.sort(key=lambda x: x['wph'], reverse=True)
+        # Group by region in the database and calculate WPH for each
+        if engine_requested(request):
+            rows = engine.snapshot().grouped('region', product_id=product_id)
+        else:
+            rows = rollup_totals(queryset, 'region_id')
+        result = wph_list(with_names(rows), 'region__name', 'region_name', UNKNOWN_REGION)
 
         response_data = {
             "product": product_name,
@@ -239,92 +230,408 @@ class WPHMatrix(APIView):
     """Get a matrix of WPH values: regions vs products"""
     permission_classes = [AllowAny]
 
+    @cached_analytics('engine')
+    def get(self, request):
+        if engine_requested(request):
+            rows = engine.snapshot().grouped('both')
+        else:
+            rows = rollup_totals(RegionProductStats.objects.all(), 'region_id', 'product_id')
+        return Response({"matrix": wph_matrix(with_names(rows))}, status=status.HTTP_200_OK)
+
+
+class Dashboard(APIView):
+    """
+    Headline stats of the dashboard in one response, all read from one database snapshot.
+    The region and matrix sections share a single pass over the region x product rollup.
+    """
+    permission_classes = [AllowAny]
+    sections = ('total_production', 'highest_wph', 'top_region', 'wph_region', 'wph_matrix')
+
+    @cached_analytics('sections', 'engine')
     def get(self, request):
-        queryset = PlantedProduct.objects.select_related('product', 'region')
-
-        # Group by region and product
-        matrix_data = defaultdict(lambda: defaultdict(lambda: {
-            'expecting_weight': Decimal('0'),
-            'planting_area': Decimal('0'),
-            'count': 0
-        }))
-
-        for planted_product in queryset:
-            region_name = planted_product.region.name if planted_product.region else "Unknown Region"
-            product_name = planted_product.product.name if planted_product.product else "Unknown Product"
-
-            matrix_data[region_name][product_name]['expecting_weight'] += planted_product.expecting_weight
-            matrix_data[region_name][product_name]['planting_area'] += planted_product.planting_area
-            matrix_data[region_name][product_name]['count'] += 1
-
-        # Build the response matrix
-        result = []
-        for region_name, products in matrix_data.items():
-            region_row = {
-                "region_name": region_name,
-                "products": []
-            }
-
-            for product_name, data in products.items():
-                wph = float(data['expecting_weight'] / data['planting_area']) if data['planting_area'] > 0 else 0.0
-                region_row["products"].append({
-                    "product_name": product_name,
-                    "expecting_weight": float(data['expecting_weight']),
-                    "planting_area": float(data['planting_area']),
-                    "wph": wph,
-                    "planted_records": data['count']
-                })
-
-            # Sort products by WPH descending
-            region_row["products"].sort(key=lambda x: x['wph'], reverse=True)
-            result.append(region_row)
-
-        # Sort regions by best WPH (average of all products)
-        for region in result:
-            if region["products"]:
-                region["avg_wph"] = sum(p["wph"] for p in region["products"]) / len(region["products"])
-            else:
-                region["avg_wph"] = 0.0
-
-        result.sort(key=lambda x: x['avg_wph'], reverse=True)
-
-        return Response({"matrix": result}, status=status.HTTP_200_OK)
+        sections_param = request.query_params.get("sections")
+        if sections_param:
+            sections = [section.strip() for section in sections_param.split(",") if section.strip()]
+        else:
+            sections = list(self.sections)
+        unknown_sections = [section for section in sections if section not in self.sections]
+        if unknown_sections:
+            return Response(
+                {"error": f"Unknown sections: {', '.join(unknown_sections)}. "
+                          f"Choose from: {', '.join(self.sections)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = {}
+        with consistent_snapshot():
+            if {'top_region', 'wph_region', 'wph_matrix'} & set(sections):
+                if engine_requested(request):
+                    rows = engine.snapshot().grouped('both')
+                else:
+                    rows = rollup_totals(RegionProductStats.objects.all(), 'region_id', 'product_id')
+                rows = with_names(rows)
+                if 'top_region' in sections:
+                    data['top_region'] = top_region(rows)
+                if 'wph_region' in sections:
+                    data['wph_region'] = wph_total(rows, "All Regions")
+                if 'wph_matrix' in sections:
+                    data['wph_matrix'] = wph_matrix(rows)
+
+            if 'total_production' in sections:
+                data['total_production'] = ProductionBucket.objects.filter(
+                    granularity=ProductionBucket.DAY,
+                    period_start__gt=timezone.localdate() - timedelta(days=30)
+                ).aggregate(total_weight=Sum('total_weight'))['total_weight']
+
+            if 'highest_wph' in sections:
+                data['highest_wph'] = PlantedProduct.objects.filter(wph__isnull=False).order_by(
+                    '-wph', 'id'
+                ).values_list('wph', flat=True).first()
+
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class TotalProductionThisMonth(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        planted_products = PlantedProduct.objects.filter(created_at__gt=timezone.now() - timedelta(days=30))
-        total_weight = planted_products.aggregate(total_weight=Sum('planting_area'))['total_weight']
-        return Response({"total_weight": total_weight}, status=status.HTTP_200_OK)
+        return Response({"total_weight": live.recent_production()}, status=status.HTTP_200_OK)
+
+
+class ProductionTimeSeries(APIView):
+    """Production totals per day or month for a date range, optionally for one region and/or product"""
+    permission_classes = [AllowAny]
+    max_periods = 3660
+    max_months = 1200
+
+    @cached_analytics('start', 'end', 'granularity', 'region_id', 'product_id')
+    def get(self, request):
+        granularity = request.query_params.get("granularity", ProductionBucket.MONTH)
+        if granularity not in (ProductionBucket.DAY, ProductionBucket.MONTH):
+            return Response(
+                {"error": "granularity must be 'day' or 'month'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        start_param = request.query_params.get("start")
+        end_param = request.query_params.get("end")
+        try:
+            end = date.fromisoformat(end_param) if end_param else timezone.localdate()
+            start = date.fromisoformat(start_param) if start_param else end - timedelta(days=365)
+        except ValueError:
+            return Response(
+                {"error": "start and end must be dates in YYYY-MM-DD format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except OverflowError:
+            return Response(
+                {"error": "start is required when end is within a year of 0001-01-01"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {"error": "start must not be after end"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if granularity == ProductionBucket.DAY and (end - start).days >= self.max_periods:
+            return Response(
+                {"error": f"Daily series are limited to {self.max_periods} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if granularity == ProductionBucket.MONTH and month_index(end) - month_index(start) >= self.max_months:
+            return Response(
+                {"error": f"Monthly series are limited to {self.max_months} months"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = ProductionBucket.objects.all()
+        region_name = "All Regions"
+        product_name = "All Products"
+
+        region_id = request.query_params.get("region_id")
+        if region_id:
+            region_name = reference_name(Region, region_id)
+            if region_name is None:
+                return Response(
+                    {"error": "Region not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            queryset = queryset.filter(region_id=region_id)
+
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            product_name = reference_name(Product, product_id)
+            if product_name is None:
+                return Response(
+                    {"error": "Product not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            queryset = queryset.filter(product_id=product_id)
+
+        return Response({
+            "region": region_name,
+            "product": product_name,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "series": production_series(queryset, granularity, start, end)
+        }, status=status.HTTP_200_OK)
 
 
 class HighestWPH(APIView):
     permission_classes = [AllowAny]
 
+    @cached_analytics()
     def get(self, request):
-        planted_products = PlantedProduct.objects.values('expecting_weight', 'planting_area')
-        wph = planted_products.annotate(wph=F("expecting_weight") / F("planting_area"))
-        max_whp = wph.order_by('-wph')[0]['wph']
+        max_whp = PlantedProduct.objects.filter(wph__isnull=False).order_by('-wph', 'id').values_list(
+            'wph', flat=True
+        ).first()
         return Response({"whp": max_whp}, status=status.HTTP_200_OK)
 
 
+class WPHLeaderboard(APIView):
+    """Top plantings by WPH, optionally within one region and/or product; served by the descending WPH indexes"""
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 100
+
+    @cached_analytics('region_id', 'product_id', 'limit')
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {"error": f"limit must be a number between 1 and {self.max_limit}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = PlantedProduct.objects.all()
+        region_id = request.query_params.get("region_id")
+        if region_id:
+            if reference_name(Region, region_id) is None:
+                return Response({"error": "Region not found"}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(region_id=region_id)
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            if reference_name(Product, product_id) is None:
+                return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(product_id=product_id)
+
+        rows = with_names(wph_leaderboard(queryset)[:limit])
+        return Response({"leaderboard": [leaderboard_entry(row) for row in rows]}, status=status.HTTP_200_OK)
+
+
+class WPHDistribution(APIView):
+    """Approximate WPH median, p90, p99 and histogram per region or product, read from the sketch bins"""
+    permission_classes = [AllowAny]
+    default_buckets = 10
+    max_buckets = 50
+
+    @cached_analytics('group_by', 'region_id', 'product_id', 'buckets')
+    def get(self, request):
+        group_by = request.query_params.get("group_by", "region")
+        if group_by not in ("region", "product"):
+            return Response(
+                {"error": "group_by must be 'region' or 'product'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            buckets = int(request.query_params.get("buckets", self.default_buckets))
+        except ValueError:
+            buckets = 0
+        if not 1 <= buckets <= self.max_buckets:
+            return Response(
+                {"error": f"buckets must be a number between 1 and {self.max_buckets}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sketch_bins = WPHSketchBin.objects.filter(planting_count__gt=0)
+        region_id = request.query_params.get("region_id")
+        if region_id:
+            if reference_name(Region, region_id) is None:
+                return Response({"error": "Region not found"}, status=status.HTTP_404_NOT_FOUND)
+            sketch_bins = sketch_bins.filter(region_id=region_id)
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            if reference_name(Product, product_id) is None:
+                return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+            sketch_bins = sketch_bins.filter(product_id=product_id)
+
+        id_field = f"{group_by}_id"
+        names = reference_names(Region if group_by == "region" else Product)
+        unknown = UNKNOWN_REGION if group_by == "region" else UNKNOWN_PRODUCT
+        groups, overall = {}, {}
+        rows = sketch_bins.values(id_field, 'bin_index').annotate(records=Sum('planting_count')).order_by()
+        for row in rows:
+            name = names.get(row[id_field]) or unknown
+            groups.setdefault(name, []).append((row['bin_index'], row['records']))
+            overall[row['bin_index']] = overall.get(row['bin_index'], 0) + row['records']
+
+        return Response({
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "overall": summarize(overall.items(), buckets),
+            "distribution": [
+                {group_by: name, **summarize(bins, buckets)}
+                for name, bins in sorted(groups.items())
+            ]
+        }, status=status.HTTP_200_OK)
+
+
 class TopPerformingRegion(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        top_region = PlantedProduct.objects.values('region__name').annotate(
-            total_production=Sum('expecting_weight')
-        ).order_by('-total_production').first()
+        top_region = live.top('region', 1)
 
         if top_region:
             return Response({
-                "region": top_region['region__name'],
-                "total_production": top_region['total_production']
+                "region": top_region[0]['region'],
+                "total_production": top_region[0]['total_production']
             })
         else:
             return Response({
                 "region": "No data",
                 "total_production": 0
             })
+
+
+class TopProduction(APIView):
+    """Top N regions or products by total expecting weight, served from the live Redis rankings"""
+    permission_classes = [AllowAny]
+    group = 'region'
+    default_limit = 10
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {"error": f"limit must be a number between 1 and {self.max_limit}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"top": live.top(self.group, limit)}, status=status.HTTP_200_OK)
+
+
+class ProductSearch(APIView):
+    """
+    Product autocomplete: ?q= matched against the name in every language, by prefix and then by near-miss,
+    with matches in the request's language ranked first
+    """
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        if not normalize(query):
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {"error": f"limit must be a number between 1 and {self.max_limit}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"results": search(query, limit)}, status=status.HTTP_200_OK)
+
+
+class PlantedProductExport(APIView):
+    """Stream planted products as CSV or NDJSON, optionally filtered by region, product and creation date"""
+    permission_classes = [IsAdminUser]
+    chunk_size = 2000
+    columns = ['id', 'product_id', 'owner_id', 'region_id', 'planting_area', 'expecting_weight', 'created_at',
+               'updated_at']
+    header = ['id', 'product_id', 'product_name', 'owner_id', 'region_id', 'region_name', 'planting_area',
+              'expecting_weight', 'created_at', 'updated_at']
+
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = PlantedProduct.objects.all()
+        region_id = request.query_params.get("region_id")
+        if region_id:
+            if reference_name(Region, region_id) is None:
+                return Response({"error": "Region not found"}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(region_id=region_id)
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            if reference_name(Product, product_id) is None:
+                return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(product_id=product_id)
+
+        try:
+            date_from = request.query_params.get("date_from")
+            if date_from:
+                queryset = queryset.filter(created_at__date__gte=date.fromisoformat(date_from))
+            date_to = request.query_params.get("date_to")
+            if date_to:
+                queryset = queryset.filter(created_at__date__lte=date.fromisoformat(date_to))
+        except ValueError:
+            return Response(
+                {"error": "date_from and date_to must be dates in YYYY-MM-DD format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Looked up once, in the request's language
+        region_names, product_names = reference_names(Region), reference_names(Product)
+        # Server-side cursor: rows are fetched chunk by chunk while the response streams
+        values = queryset.order_by('id').values_list(*self.columns).iterator(chunk_size=self.chunk_size)
+        rows = (
+            (pk, product_id, product_names.get(product_id), owner_id, region_id, region_names.get(region_id), *rest)
+            for pk, product_id, owner_id, region_id, *rest in values
+        )
+        return streaming_export(export_format, "planted_products", self.header, rows)
+
+
+class WPHMatrixExport(APIView):
+    """
+    Stream the region vs product WPH matrix as CSV or NDJSON, one row per (region, product).
+    Public like WPHMatrix, whose data it is: only per region and product aggregates, unlike the
+    per-planting (and per-owner) rows of PlantedProductExport, which is for admins.
+    """
+    permission_classes = [AllowAny]
+    header = ['region_name', 'product_name', 'expecting_weight', 'planting_area', 'wph', 'planted_records']
+
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        matrix = wph_matrix(with_names(rollup_totals(RegionProductStats.objects.all(), 'region_id', 'product_id')))
+        rows = (
+            (region["region_name"], product["product_name"], product["expecting_weight"],
+             product["planting_area"], product["wph"], product["planted_records"])
+            for region in matrix for product in region["products"]
+        )
+        return streaming_export(export_format, "wph_matrix", self.header, rows)
+
+
+class AnalyticsCacheStats(APIView):
+    """Hit, miss and invalidation counters of the analytics response cache"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+class AnalyticsEngineStats(APIView):
+    """Size and refresh counters of this worker's columnar analytics snapshot"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(engine.stats(), status=status.HTTP_200_OK)
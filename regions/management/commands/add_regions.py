@@ -1,25 +1,29 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from common.cache import reference_cache
+from common.seeding import seed_catalog
+from products import live
 from regions.models import Region
 
+FIXTURE = settings.BASE_DIR / 'regions' / 'data' / 'regions.json'
+
 
 class Command(BaseCommand):
-    help = 'Adds 13 administrative regions of Uzbekistan'
+    help = 'Adds the administrative regions of Uzbekistan listed in regions/data/regions.json'
 
-    def handle(self, *args, **kwargs):
-        regions = [
-            "Tashkent", "Samarkand", "Bukhara", "Khorezm", "Surkhandarya", "Kashkadarya", "Andijan",
-            "Fergana", "Namangan", "Jizzakh", "Sirdaryo", "Navoi", "Karakalpakstan"
-        ]
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Compare with the database even if this fixture version was applied already')
 
-        created_count = 0
-        for region_name in regions:
-            region, created = Region.objects.get_or_create(name=region_name)
-            if created:
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Created: {region_name}"))
-            else:
-                self.stdout.write(self.style.WARNING(f"Already exists: {region_name}"))
+    def handle(self, *args, **options):
+        created = seed_catalog('regions', FIXTURE, Region, lambda row: Region(**row), force=options['force'])
+        if created is None:
+            self.stdout.write("Regions are up to date")
+            return
 
-        self.stdout.write(
-            self.style.SUCCESS(f"\nSuccessfully added {created_count} new regions out of {len(regions)} total")
-        )
+        # bulk_create sends no post_save signals
+        if created:
+            reference_cache.invalidate(Region)
+            for region in created:
+                live.record_names('region', region)
+        self.stdout.write(self.style.SUCCESS(f"Successfully added {len(created)} new regions"))
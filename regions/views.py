@@ -3,12 +3,11 @@ from regions.serializers import RegionSerializer
 from rest_framework.permissions import AllowAny
 from regions.models import Region
 from rest_framework.response import Response
+from common.cache import reference_cache
 
 class RegionAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        regions = Region.objects.all()
-        serializer = RegionSerializer(regions, many=True)
-        return Response(serializer.data)
-
+        data = reference_cache.get(Region, "list", lambda: RegionSerializer(Region.objects.all(), many=True).data)
+        return Response(data)